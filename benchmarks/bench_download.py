@@ -0,0 +1,62 @@
+"""Compare the throughput of the download engines against a local server.
+
+A stand-in for the NOAA server (see :mod:`bmi_wavewatch3.testing`) is run
+on localhost. To mimic the cost of connecting to a remote host over TLS, the
+server sleeps for ``--latency`` seconds whenever a new connection is opened.
+
+    $ python benchmarks/bench_download.py --files=64 --size=1MB --latency=0.1
+"""
+
+import os
+import tempfile
+import time
+from functools import partial
+from multiprocessing.pool import ThreadPool
+
+import click
+
+from bmi_wavewatch3 import HttpEngine, UrllibEngine, WaveWatch3Downloader
+from bmi_wavewatch3.cache import parse_size
+from bmi_wavewatch3.testing import StandInServer
+from bmi_wavewatch3.wavewatch3 import as_cwd
+
+
+def run(engine, urls, workers):
+    with tempfile.TemporaryDirectory() as folder, as_cwd(folder):
+        start = time.perf_counter()
+        with ThreadPool(workers) as pool:
+            pool.map(partial(WaveWatch3Downloader.retreive, engine=engine), urls)
+        return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--files", default=32, help="number of files to download")
+@click.option("--size", default="1MB", help="size of each file")
+@click.option("--latency", default=0.05, help="delay for each new connection [s]")
+@click.option("--workers", default=os.cpu_count(), help="number of download threads")
+def main(files, size, latency, workers):
+    nbytes = parse_size(size)
+
+    with StandInServer(connect_latency=latency) as server:
+        urls = [
+            server.mirror(f"/multi_1.glo_30m.hs.{2005 + i // 12}{i % 12 + 1:02d}.grb2")
+            for i in range(files)
+        ]
+        for url in urls:
+            server.add(url, os.urandom(nbytes))
+
+        print(f"{'engine':<14} {'files/s':>10} {'MB/s':>10} {'connections':>12}")
+        for engine in (UrllibEngine(), HttpEngine(maxsize=workers)):
+            server.reset()
+            elapsed = run(engine, urls, workers)
+            engine.close()
+            print(
+                f"{type(engine).__name__:<14}"
+                f" {files / elapsed:>10.1f}"
+                f" {files * nbytes / elapsed / 2**20:>10.1f}"
+                f" {server.connections:>12d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
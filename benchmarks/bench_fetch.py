@@ -0,0 +1,110 @@
+"""Measure end-to-end download throughput against a stand-in NOAA server.
+
+Synthetic WAVEWATCH III files are served, from the same paths as on the
+NOAA servers, by a local server (see :mod:`bmi_wavewatch3.testing`) that can
+be made to answer slowly, send slowly or drop connections. Each month is
+downloaded with ``WaveWatch3.fetch`` and with ``ww3 fetch`` for a range of
+``--max-concurrency`` values, and the throughput and the latency of the
+server's responses are reported.
+
+    $ python benchmarks/bench_fetch.py --months=12 --latency=0.05 -c 1 -c 4 -c 16
+"""
+
+import datetime
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+import numpy as np
+
+from bmi_wavewatch3 import HttpEngine, WaveWatch3
+from bmi_wavewatch3.testing import StandInServer
+
+
+def fetch_with_api(server, dates, folder, concurrency):
+    engine = HttpEngine(maxsize=concurrency)
+    try:
+        WaveWatch3.fetch(
+            dates, folder=folder, engine=engine, max_concurrency=concurrency
+        )
+    finally:
+        engine.close()
+
+
+def fetch_with_cli(server, dates, folder, concurrency):
+    subprocess.run(
+        [sys.executable, "-c", "from bmi_wavewatch3.cli import ww3; ww3()"]
+        + [f"--cd={folder}", f"--mirror={server.url}", "-s", "fetch"]
+        + [f"--max-concurrency={concurrency}"]
+        + dates,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def run(fetch, server, dates, concurrency):
+    server.reset()
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        fetch(server, dates, folder, concurrency)
+        elapsed = time.perf_counter() - start
+
+        nbytes = sum(
+            os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder)
+        )
+        nfiles = len(os.listdir(folder))
+    latencies = [seconds for _, seconds in server.timings] or [0.0]
+    return nfiles, nbytes, elapsed, np.percentile(latencies, [50, 95, 99])
+
+
+@click.command()
+@click.option("--months", default=12, help="number of months to download")
+@click.option("--shape", default=(90, 180), nargs=2, help="rows and columns of grid")
+@click.option("--latency", default=0.05, help="delay before each response [s]")
+@click.option(
+    "--connect-latency", default=0.1, help="delay for each new connection [s]"
+)
+@click.option("--bandwidth", default=None, type=float, help="per-response [B/s]")
+@click.option("--faults", default=0, help="number of responses to cut off")
+@click.option(
+    "-c",
+    "--concurrency",
+    multiple=True,
+    type=click.IntRange(min=1),
+    default=(1, 2, 4, 8, 16),
+    help="maximum number of simultaneous downloads",
+)
+def main(months, shape, latency, connect_latency, bandwidth, faults, concurrency):
+    dates = [
+        datetime.date(2006 + month // 12, month % 12 + 1, 1).isoformat()
+        for month in range(months)
+    ]
+
+    with StandInServer(
+        latency=latency, connect_latency=connect_latency, bandwidth=bandwidth
+    ) as server, server.mirrored():
+        server.populate(dates, shape=shape)
+
+        print(
+            f"{'client':<6} {'max':>4} {'files/s':>9} {'MB/s':>9}"
+            f" {'p50 [ms]':>9} {'p95 [ms]':>9} {'p99 [ms]':>9}"
+        )
+        for name, fetch in (("api", fetch_with_api), ("cli", fetch_with_cli)):
+            for max_concurrency in concurrency:
+                server.faults = faults
+                nfiles, nbytes, elapsed, (p50, p95, p99) = run(
+                    fetch, server, dates, max_concurrency
+                )
+                print(
+                    f"{name:<6} {max_concurrency:>4d}"
+                    f" {nfiles / elapsed:>9.1f}"
+                    f" {nbytes / elapsed / 2**20:>9.1f}"
+                    f" {p50 * 1000:>9.1f} {p95 * 1000:>9.1f} {p99 * 1000:>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+Downloads are now scheduled by an `AdaptiveScheduler` that, rather than using
+one thread per CPU, adjusts the number of simultaneous downloads based on the
+observed throughput and failures, and can cap the combined download rate.
+Use the `max_concurrency` and `rate_limit` keywords of `WaveWatch3.fetch`, or
+the `--max-concurrency` and `--rate-limit` options of `ww3 fetch`.
@@ -0,0 +1,4 @@
+Added `WaveWatch3.afetch`, an asynchronous version of `WaveWatch3.fetch`, and
+an `--async` option to `ww3 fetch`. Both schedule downloads from a single
+process with asyncio and limit the number of requests in flight to each host
+(`max_per_host`, `--max-per-host`).
@@ -0,0 +1,4 @@
+Added a `bbox` keyword to `WaveWatch3` (and a *bbox* key to the BMI
+configuration) that restricts the loaded data to the grid points within a
+bounding box. The BMI grid shape, origin and spacing are now taken from the
+data's coordinates so that they describe the subset.
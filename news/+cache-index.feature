@@ -0,0 +1,6 @@
+Added a persistent index of the data files in a cache folder, an SQLite database
+(*.wavewatch3-index.sqlite*) that records the source, grid, quantity, month,
+size, checksum and time of last access of each file. Downloads update the index,
+`WaveWatch3.fetch` and `ww3 fetch` use it to find files that are already cached,
+and `ww3 clean` uses it rather than globbing and stat-ing every file. Added a
+`ww3 cache` command to list (`ls`), summarize (`du`) and `sync` the index.
@@ -0,0 +1,9 @@
+Added a size quota, with least-recently-used eviction, for the data cache. Set it
+with the `cache_quota` keyword of `WaveWatch3` (or the *cache_quota* key of the
+BMI configuration, or the `WAVEWATCH3_CACHE_QUOTA` environment variable) and
+with the `quota` keyword of `WaveWatch3.fetch`. The quota counts the *cfgrib*
+indexes, saved validators and decompressed and decoded copies of the data
+files as well as the files themselves. Files that are in use by a
+running `WaveWatch3` or `BmiWaveWatch3` instance are never evicted. Added a
+`--max-size` option to `ww3 clean` that removes only the least recently used
+files.
@@ -0,0 +1,5 @@
+Added `chunks` and `parallel` keywords to `WaveWatch3` (and *chunks* and
+*parallel* keys to the BMI configuration). Data can be read one GRIB message
+(a single time step of a variable), or a spatial tile of one, at a time
+with `chunks="messages"` or a dict of chunk sizes, and the files of a month
+can be opened in parallel.
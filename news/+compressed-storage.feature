@@ -0,0 +1,7 @@
+Added a `storage` keyword to `WaveWatch3`, `WaveWatch3.fetch` and
+`WaveWatch3.afetch` (and a `--storage` option to `ww3 fetch`, the *storage* key
+of the BMI configuration and the `WAVEWATCH3_STORAGE` environment variable)
+that keeps downloaded files compressed, either gzipped, as served, or
+recompressed with *zstandard*. Compressed files are read from decompressed
+copies, kept in a hidden folder only while they are in use, whose *cfgrib*
+indexes remain valid across reopens.
@@ -0,0 +1,4 @@
+Changing the date, or step, of `WaveWatch3` within a month no longer reopens
+the month's data files. Opened months are kept in a least-recently-used cache
+shared by the instances of a process, whose size is set with the
+`WAVEWATCH3_DATASET_CACHE_SIZE` environment variable.
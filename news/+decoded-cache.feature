@@ -0,0 +1,7 @@
+Added an opt-in cache of decoded data. With the `decoded_cache` keyword of
+`WaveWatch3` (or the *decoded_cache* key of the BMI configuration, or the
+`WAVEWATCH3_DECODED_CACHE` environment variable) set to *zarr* or *netcdf*, the
+first load of a month, for each set of quantities, writes the decoded data to a
+chunked, compressed Zarr store or NetCDF4 file next to the GRIB files, and
+later loads read it directly.
+Added a `--decoded` option to `ww3 plot`.
@@ -0,0 +1,7 @@
+Added an `Executor` that runs downloads in a reusable pool of threads or
+processes (or, with the *none* backend, in the calling thread) and is shut down
+with `close`. `WaveWatch3`, `WaveWatch3.fetch` and `BmiWaveWatch3` accept an
+`executor` keyword; otherwise `WaveWatch3` shares a default, per-process
+executor rather than creating a new pool for every month. The BMI creates its
+executor from the optional *executor* and *workers* configuration keys and
+closes it in `finalize`.
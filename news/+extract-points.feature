@@ -0,0 +1,5 @@
+Added `WaveWatch3.extract_points` and a `ww3 extract` command that extract time
+series at points, using either the nearest grid cell or bilinear interpolation.
+Points are located on the grid once, with points on land moved to the nearest
+wet cell, and are sampled from each GRIB message at once. The results are
+written, a month at a time, to CSV or Parquet files.
@@ -0,0 +1,9 @@
+Added the `index` and `index_dir` keywords to `WaveWatch3.fetch`, and the
+`--index` and `--index-dir` options to `ww3 fetch`, that build the *cfgrib*
+index files of the downloaded data, in parallel, right after they are
+downloaded. Added an `index_dir` keyword to `WaveWatch3` (or the
+`WAVEWATCH3_INDEX_DIR` environment variable, or the *index_dir* key of the BMI
+configuration) to keep the index files outside of the cache folder so that the
+cache can be read-only.
+Index files kept in an `index_dir` are removed along with their data files,
+by cache eviction and by `ww3 clean` (which takes an `--index-dir` option).
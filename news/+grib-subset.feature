@@ -0,0 +1,3 @@
+Added `time_range` and `variables` keywords to `WaveWatch3.fetch` that
+download only the GRIB messages that are needed, using byte-range requests
+built from the remote file's inventory, rather than whole monthly files.
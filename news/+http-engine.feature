@@ -0,0 +1,6 @@
+Added a download engine, `HttpEngine`, that keeps connections to the data
+servers alive and shares them between downloads. `WaveWatch3.fetch`,
+`WaveWatch3` and `ww3 fetch` now download through this engine using a pool of
+threads rather than opening a new connection (and forking a new process) for
+every file. A throughput benchmark that runs against a local stand-in server
+is in *benchmarks/bench_download.py*.
@@ -0,0 +1,3 @@
+Added `WaveWatch3.open_range`, which opens a range of months of data as a
+single dataset with a continuous time axis. Only the first month is read up
+front, the others are downloaded and read, with *dask*, as they are needed.
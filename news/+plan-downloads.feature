@@ -0,0 +1,4 @@
+Dates are now mapped to the monthly files that hold their data before anything
+is downloaded, so `WaveWatch3.fetch`, `WaveWatch3.afetch` and `ww3 fetch`
+download each file just once no matter how many of the requested dates fall in
+its month. With `--verbose`, `ww3 fetch` reports which dates each file holds.
@@ -0,0 +1,5 @@
+Added a `ww3 prefetch` command, and a `WaveWatch3.prefetch` method, that
+download all of the data files for a range of months (e.g.
+`ww3 prefetch --start=2005-02 --end=2019-05`). The files are planned month by
+month, checked against the cache index in chunks and streamed to the
+downloaders so that long ranges do not build large lists of dates or urls.
@@ -0,0 +1,5 @@
+Added a `prefetch` keyword to `WaveWatch3` that downloads the months following
+the current month in a background thread, so that stepping across a month
+boundary no longer waits for new data to download. Use `prefetch_index=True`
+to also build the *cfgrib* index of the prefetched files. The BMI reads the
+number of months to prefetch from an optional `prefetch` configuration key.
@@ -0,0 +1,7 @@
+Downloads are now written to a temporary *.part* file that is moved into
+place only once the download is complete, so an interrupted transfer is no
+longer mistaken for a cached file. Failed downloads are retried with a capped
+exponential backoff and, if the server supports it, resumed from where they
+left off using HTTP `Range` requests (with `If-Range`, so that a file that
+has changed on the server is downloaded again from the start). `ww3 clean`
+also removes any leftover *.part* files.
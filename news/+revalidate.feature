@@ -0,0 +1,6 @@
+Added a revalidation mode (`revalidate=True` for `WaveWatch3Downloader.retreive`
+and `WaveWatch3.fetch`, `--revalidate` for `ww3 fetch`). The `ETag` and
+`Last-Modified` headers of each download are saved in a *.validators.json*
+file next to the data file and are sent back with a conditional request, so a
+file that hasn't changed on the server costs a single *304 Not Modified*
+response rather than a new download.
@@ -0,0 +1,5 @@
+Added `WaveWatch3.seek`, which moves to the time step at, or just after, a date
+without reading any data. Months and steps are located with a time index of
+the layout of each month's steps that is kept in the cache folder. Setting
+`WaveWatch3.step`, including to a step in a later month, and the BMI time
+queries no longer read data.
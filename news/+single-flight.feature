@@ -0,0 +1,6 @@
+Made downloads safe to share between processes. Before a data file is
+downloaded, an exclusive lock is taken on it (with `flock` or, on Windows,
+`msvcrt.locking`) so that, when several processes or threads need the same file,
+the first downloads it while the others wait and then reuse it rather than
+downloading it again or overwriting each other's partial downloads. Lock files
+are kept in a hidden *.wavewatch3-locks* folder within the cache folder.
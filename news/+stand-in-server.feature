@@ -0,0 +1,7 @@
+Added the `bmi_wavewatch3.testing` module with `StandInServer`, a local HTTP
+server that serves synthetic WAVEWATCH III files from the same paths as the NOAA
+servers, with optional latency, bandwidth limits, dropped connections and error
+responses. Data are downloaded from a mirror when the `WAVEWATCH3_MIRROR`
+environment variable (or the new `--mirror` option of *ww3*) is set. Added
+*benchmarks/bench_fetch.py*, which reports files/s, MB/s and response
+percentiles for `WaveWatch3.fetch` and `ww3 fetch` across concurrency limits.
@@ -0,0 +1,4 @@
+Gzipped data files (used by the *phase1* source) are now decompressed in
+fixed-size blocks as they are downloaded and written directly to the final
+*.grb2* file. The compressed file is no longer stored and is never read
+entirely into memory.
@@ -0,0 +1,4 @@
+Added `quantities` and `variables` keywords to `WaveWatch3` (and the
+*quantities* and *variables* keys of the BMI configuration) so that only the
+files that hold the requested data are downloaded and opened. `ww3 plot` now
+downloads just the file that holds the variable it plots.
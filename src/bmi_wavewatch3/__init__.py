@@ -1,15 +1,22 @@
 from ._version import __version__
 from .bmi import BmiWaveWatch3
 from .downloader import WaveWatch3Downloader
+from .engine import HttpEngine, UrllibEngine
 from .errors import ChoiceError, WaveWatch3Error
+from .executor import Executor
+from .scheduler import AdaptiveScheduler
 from .source import SOURCES
 from .wavewatch3 import WaveWatch3
 
 __all__ = [
     "__version__",
+    "AdaptiveScheduler",
     "BmiWaveWatch3",
     "ChoiceError",
+    "Executor",
+    "HttpEngine",
     "SOURCES",
+    "UrllibEngine",
     "WaveWatch3",
     "WaveWatch3Downloader",
     "WaveWatch3Error",
@@ -1,4 +1,5 @@
 from collections import namedtuple
+from typing import Optional
 
 import numpy
 from bmipy import Bmi
@@ -8,6 +9,7 @@ try:
 except ModuleNotFoundError:
     import tomli as tomllib
 
+from .executor import Executor
 from .wavewatch3 import WaveWatch3
 
 BmiVar = namedtuple(
@@ -26,9 +28,21 @@ class BmiWaveWatch3(Bmi):
     _input_var_names = ()
     _output_var_names = ()
 
-    def __init__(self) -> None:
+    def __init__(self, executor: Optional[Executor] = None) -> None:
+        """Create a WAVEWATCH III component.
+
+        Parameters
+        ----------
+        executor : Executor, optional
+            Executor used to download data. If not provided, one is created
+            from the *executor* and *workers* keys of the configuration
+            file. The executor is closed when the component is finalized.
+        """
         self._config = {}
+        self._executor = executor
+        self._ww3 = None
         self._data = None
+        self._hours = None
         self._grid = {}
         self._var = None
         self._time_index = None
@@ -40,6 +54,10 @@ class BmiWaveWatch3(Bmi):
         loop. This typically includes deallocating memory, closing files and
         printing reports.
         """
+        if self._ww3 is not None:
+            self._ww3.close()
+        if self._executor is not None:
+            self._executor.close()
         self._data = None
 
     def get_component_name(self) -> str:
@@ -60,7 +78,7 @@ class BmiWaveWatch3(Bmi):
         float
             The current model time.
         """
-        return float(self._data.step[self._time_index]) * 1e-9 / 60 / 60
+        return float(self._hours[self._time_index])
 
     def get_end_time(self) -> float:
         """End time of the model.
@@ -70,7 +88,7 @@ class BmiWaveWatch3(Bmi):
         float
             The maximum model time.
         """
-        return float(self._data.step[-1]) * 1e-9 / 60 / 60
+        return float(self._hours[-1])
 
     def get_grid_edge_count(self, grid: int) -> int:
         """Get the number of edges in the grid.
@@ -658,12 +676,30 @@ class BmiWaveWatch3(Bmi):
         with open(config_file, "rb") as fp:
             self._config = tomllib.load(fp)["wavewatch3"]
 
+        if self._executor is None:
+            self._executor = Executor(
+                self._config.get("executor", "thread"),
+                max_workers=self._config.get("workers"),
+            )
+
         self._ww3 = WaveWatch3(
             self._config["date"],
             grid=self._config["grid"],
             source=self._config["source"],
+            prefetch=self._config.get("prefetch", 0),
+            executor=self._executor,
+            cache_quota=self._config.get("cache_quota"),
+            storage=self._config.get("storage"),
+            decoded_cache=self._config.get("decoded_cache"),
+            index_dir=self._config.get("index_dir"),
+            quantities=self._config.get("quantities"),
+            variables=self._config.get("variables"),
+            chunks=self._config.get("chunks"),
+            parallel=self._config.get("parallel", False),
+            bbox=self._config.get("bbox"),
         )
         self._data = self._ww3.data
+        self._hours = self._ww3.time_index.hours(self._ww3.year, self._ww3.month)
 
         self._grid, var_to_id = _grids_from_dataset(self._data)
         self._var = _vars_from_dataset(self._data, var_to_id)
@@ -676,6 +712,11 @@ class BmiWaveWatch3(Bmi):
             "eastward_wind_speed": "u",  # U component of wind (eastward_wind)
             "northward_wind_speed": "v",  # V component of wind (northward_wind)
         }
+        self._standard_to_local_name = {
+            standard: local
+            for standard, local in self._standard_to_local_name.items()
+            if local in self._var
+        }
         self._var = {
             standard: self._var[local]
             for standard, local in self._standard_to_local_name.items()
@@ -748,23 +789,32 @@ def _grids_from_dataset(dataset):
 
 
 def _var_grid(dataset):
+    """Grids of a dataset's variables, from their coordinates.
+
+    The coordinates, rather than the GRIB attributes, describe the grid
+    so that the grid of a subset of the data is that of the subset.
+    """
     var_to_grid = {}
     for name, var in dataset.data_vars.items():
-        shape = var.GRIB_Ny, var.GRIB_Nx
+        lat, lon = var.latitude.values, var.longitude.values
+        shape = len(lat), len(lon)
         yx_spacing = (
-            var.GRIB_iDirectionIncrementInDegrees,
-            var.GRIB_jDirectionIncrementInDegrees,
-        )
-        yx_of_lower_left = (
-            var.GRIB_latitudeOfLastGridPointInDegrees,
-            var.GRIB_longitudeOfFirstGridPointInDegrees,
+            _spacing(lat, var.attrs.get("GRIB_jDirectionIncrementInDegrees")),
+            _spacing(lon, var.attrs.get("GRIB_iDirectionIncrementInDegrees")),
         )
+        yx_of_lower_left = float(lat.min()), float(lon.min())
         grid = BmiGridUniformRectilinear(shape, yx_spacing, yx_of_lower_left)
 
         var_to_grid[name] = grid
     return var_to_grid
 
 
+def _spacing(coord, default=None):
+    if len(coord) > 1:
+        return float(abs(coord[1] - coord[0]))
+    return float(default) if default is not None else 0.0
+
+
 def _vars_from_dataset(dataset, var_to_gid):
     vars = {}
     for name, var in dataset.data_vars.items():
@@ -0,0 +1,641 @@
+import contextlib
+import fnmatch
+import hashlib
+import itertools
+import os
+import pathlib
+import socket
+import sqlite3
+import time
+import urllib
+from collections import namedtuple
+
+from .decoded import is_decoded_from, remove_path
+from .errors import ChoiceError
+from .source import SOURCES
+from .storage import SCRATCH_DIR, plain_name
+
+INDEX_NAME = ".wavewatch3-index.sqlite"
+
+CacheEntry = namedtuple(
+    "CacheEntry",
+    [
+        "name",
+        "url",
+        "source",
+        "grid",
+        "quantity",
+        "month",
+        "size",
+        "checksum",
+        "accessed",
+    ],
+)
+
+COLUMNS = ("source", "grid", "quantity", "month")
+
+SIDECAR_PATTERNS = (
+    "*.grb2.*.idx",
+    "*.grb2*.part",
+    "*.grb2.validators.json",
+    "*.grb2.inventory.json",
+    "*.grb.*.idx",
+    "*.grb.part",
+    "*.grb.validators.json",
+    "*.grb2.gz.validators.json",
+    "*.grb2.zst.validators.json",
+    "*.grb2*.part.validators.json",
+    "*.grb.part.validators.json",
+    "*.decoded.nc",
+    "*.decoded.zarr",
+    "*.decoded.*.part",
+)
+
+INDEX_PATTERNS = ("*.grb2.*.idx", "*.grb.*.idx")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    url TEXT,
+    source TEXT,
+    grid TEXT,
+    quantity TEXT,
+    month TEXT,
+    size INTEGER NOT NULL,
+    checksum TEXT,
+    accessed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pins (
+    token TEXT NOT NULL,
+    name TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    host TEXT NOT NULL,
+    PRIMARY KEY (token, name)
+);
+"""
+
+_SIZE_UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+
+def parse_name(name):
+    """Parse the name of a cached WAVEWATCH III data file.
+
+    Parameters
+    ----------
+    name : str
+        Name of a local data file.
+
+    Returns
+    -------
+    tuple of str or None
+        The grid, quantity and month (as "YYYY-MM") of the file, or ``None``
+        if *name* is not the name of a data file.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.cache import parse_name
+    >>> parse_name("multi_1.glo_30m.hs.201005.grb2")
+    ('glo_30m', 'hs', '2010-05')
+    >>> parse_name("nww3.tp.200501.grb")
+    ('nww3', 'tp', '2005-01')
+    >>> parse_name("multi_1.glo_30m.hs.201005.grb2.zst")
+    ('glo_30m', 'hs', '2010-05')
+    >>> parse_name("multi_1.glo_30m.hs.201005.grb2.validators.json") is None
+    True
+    """
+    parts = plain_name(name).split(".")
+    if parts[-1] == "grb2" and len(parts) >= 5:
+        grid, quantity, month = parts[1:4]
+    elif parts[-1] == "grb" and len(parts) == 4:
+        grid, quantity, month = parts[:3]
+    else:
+        return None
+    if len(month) != 6 or not month.isdigit():
+        return None
+    return grid, quantity, f"{month[:4]}-{month[4:]}"
+
+
+def source_of(url):
+    """Name of the data source that a url points into.
+
+    Sources that share a folder on the server (*multigrid* and
+    *multigrid-extended*) are reported as the first, alphabetically.
+    """
+    if url is None:
+        return None
+    path = urllib.parse.urlsplit(url).path
+    for name in sorted(SOURCES):
+        if path.startswith(SOURCES[name].PREFIX.rstrip("/") + "/"):
+            return name
+    return None
+
+
+def parse_size(size):
+    """Convert a size, like "500M" or "2.5G", to a number of bytes.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.cache import parse_size
+    >>> parse_size("2.5K")
+    2560
+    >>> parse_size(1000)
+    1000
+    """
+    if isinstance(size, (int, float)):
+        nbytes = int(size)
+    else:
+        value = size.strip().upper().removesuffix("B").removesuffix("I")
+        number = value.rstrip("KMGT")
+        try:
+            nbytes = int(float(number) * _SIZE_UNITS[value[len(number) :]])
+        except (KeyError, ValueError):
+            raise ValueError(f"{size!r}: not a size (e.g. 500M or 2.5G)")
+    if nbytes < 0:
+        raise ValueError(f"{size!r}: size must not be negative")
+    return nbytes
+
+
+def _is_alive(pid, host):
+    """Check if the process that pinned a file may still be running."""
+    if host != socket.gethostname() or os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def checksum(path, blocksize=2**20):
+    """Compute the SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        while block := fp.read(blocksize):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CacheIndex:
+    """An index of the data files in a cache folder.
+
+    The index is an SQLite database, kept in the cache folder, that records
+    the source, grid, quantity, month, size, checksum and time of last access
+    of each data file. Finding, accounting for and cleaning cached files
+    then needs just a query of the index rather than a listing of the
+    folder and a ``stat`` of every file.
+
+    The index is created, from the files already in the folder, when it is
+    first used. Files that are added or removed other than through the
+    package are picked up by :meth:`sync`.
+
+    Parameters
+    ----------
+    folder : str or path-like
+        The cache folder.
+    index_dir : str or path-like, optional
+        Folder in which the *cfgrib* indexes (and decompressed copies) of
+        the data files are kept, if not in the cache folder. The indexes of
+        the data files of the cache that are found there are treated as
+        their auxiliary files (see :meth:`sidecars`).
+    """
+
+    def __init__(self, folder, index_dir=None):
+        self._folder = pathlib.Path(folder).expanduser()
+        self._index_dir = (
+            None if index_dir is None else pathlib.Path(index_dir).expanduser()
+        )
+
+    @property
+    def folder(self):
+        """The cache folder."""
+        return self._folder
+
+    @property
+    def path(self):
+        """Path to the index database."""
+        return self._folder / INDEX_NAME
+
+    @property
+    def index_dir(self):
+        """The folder of the *cfgrib* indexes, if not the cache folder."""
+        return self._index_dir
+
+    def __repr__(self):
+        if self._index_dir is None:
+            return f"CacheIndex({str(self._folder)!r})"
+        return f"CacheIndex({str(self._folder)!r}, index_dir={str(self._index_dir)!r})"
+
+    @contextlib.contextmanager
+    def _connect(self):
+        new = not self.path.is_file()
+        self._folder.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30.0)
+        try:
+            with connection:
+                connection.executescript(_SCHEMA)
+                if new:
+                    connection.executemany(
+                        "INSERT OR IGNORE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            self._entry(path, with_checksum=False)
+                            for path in self._data_files()
+                        ),
+                    )
+                yield connection
+        finally:
+            connection.close()
+
+    def _data_files(self):
+        with os.scandir(self._folder) as entries:
+            for entry in entries:
+                if entry.is_file() and parse_name(entry.name):
+                    yield pathlib.Path(entry.path)
+
+    def _entry(self, path, url=None, with_checksum=True, accessed=None):
+        stat = os.stat(path)
+        grid, quantity, month = parse_name(path.name)
+        return CacheEntry(
+            name=path.name,
+            url=url,
+            source=source_of(url),
+            grid=grid,
+            quantity=quantity,
+            month=month,
+            size=stat.st_size,
+            checksum=checksum(path) if with_checksum else None,
+            accessed=stat.st_mtime if accessed is None else accessed,
+        )
+
+    def record(self, path, url=None):
+        """Add (or update) a data file in the index.
+
+        Parameters
+        ----------
+        path : str or path-like
+            Path to a data file in the cache folder.
+        url : str, optional
+            Url from which the file was downloaded.
+
+        Returns
+        -------
+        CacheEntry or None
+            The entry for the file or ``None`` if *path* is not a data file.
+        """
+        path = pathlib.Path(path)
+        if not parse_name(path.name):
+            return None
+        entry = self._entry(path, url=url, accessed=time.time())
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                entry,
+            )
+        return entry
+
+    def lookup(self, names):
+        """Find files in the index, marking those found as accessed.
+
+        Files that are in the index but are no longer in the cache folder
+        (because they were removed other than through the package) are
+        removed from the index and are not found.
+
+        Parameters
+        ----------
+        names : iterable of str
+            Names of data files.
+
+        Returns
+        -------
+        set of str
+            The names that are in the index and in the cache folder.
+        """
+        names = list(names)
+        found = set()
+        if not names:
+            return found
+        with self._connect() as connection:
+            for start in range(0, len(names), 500):
+                chunk = names[start : start + 500]
+                marks = ", ".join("?" * len(chunk))
+                found.update(
+                    name
+                    for (name,) in connection.execute(
+                        f"SELECT name FROM files WHERE name IN ({marks})", chunk
+                    )
+                )
+            gone = {name for name in found if not (self._folder / name).is_file()}
+            found -= gone
+            connection.executemany(
+                "DELETE FROM files WHERE name = ?", ((name,) for name in gone)
+            )
+            connection.executemany(
+                "UPDATE files SET accessed = ? WHERE name = ?",
+                ((time.time(), name) for name in found),
+            )
+        return found
+
+    def missing(self, items, key=None, chunksize=500):
+        """Iterate over the items whose files are not in the index.
+
+        Items are looked up a chunk at a time so that *items* may be a
+        (long) generator. Files that are found are marked as accessed.
+
+        Parameters
+        ----------
+        items : iterable
+            Items to check.
+        key : callable, optional
+            Function that returns the name of the data file of an item. If
+            not provided, items are the names themselves.
+        chunksize : int, optional
+            Number of items to look up at once.
+
+        Yields
+        ------
+        object
+            The items whose files are not in the index, in order.
+        """
+        key = (lambda item: item) if key is None else key
+        items = iter(items)
+        while chunk := list(itertools.islice(items, chunksize)):
+            found = self.lookup(key(item) for item in chunk)
+            yield from (item for item in chunk if key(item) not in found)
+
+    def entries(self, **filters):
+        """List the files in the index.
+
+        Parameters
+        ----------
+        **filters : str, optional
+            Only list files whose *source*, *grid*, *quantity* or *month*
+            match the given glob-style patterns (e.g. ``month="2010-*"``).
+
+        Returns
+        -------
+        list of CacheEntry
+            The matching files, sorted by name.
+        """
+        where, params = _where(filters)
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT * FROM files{where} ORDER BY name", params
+            ).fetchall()
+        return [CacheEntry(*row) for row in rows]
+
+    def usage(self, by="quantity", **filters):
+        """Summarize the disk space used by the cache.
+
+        Parameters
+        ----------
+        by : {"source", "grid", "quantity", "month"}, optional
+            Column by which to group files.
+        **filters : str, optional
+            Glob-style patterns that files must match (see :meth:`entries`).
+
+        Returns
+        -------
+        list of tuple
+            For each group, its value, number of files and total size, in
+            bytes.
+        """
+        if by not in COLUMNS:
+            raise ChoiceError(by, COLUMNS)
+        where, params = _where(filters)
+        with self._connect() as connection:
+            return connection.execute(
+                f"SELECT {by}, COUNT(*), SUM(size) FROM files{where}"
+                f" GROUP BY {by} ORDER BY {by}",
+                params,
+            ).fetchall()
+
+    def remove(self, names):
+        """Remove files from the index (but not from the cache folder)."""
+        with self._connect() as connection:
+            connection.executemany(
+                "DELETE FROM files WHERE name = ?", ((name,) for name in names)
+            )
+
+    def sync(self):
+        """Bring the index up to date with the files in the cache folder.
+
+        Returns
+        -------
+        tuple of list
+            Names of the files that were added to, and removed from, the
+            index.
+        """
+        with self._connect() as connection:
+            indexed = {name for (name,) in connection.execute("SELECT name FROM files")}
+            on_disk = {path.name: path for path in self._data_files()}
+
+            added = sorted(set(on_disk) - indexed)
+            removed = sorted(indexed - set(on_disk))
+            connection.executemany(
+                "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._entry(on_disk[name]) for name in added),
+            )
+            connection.executemany(
+                "DELETE FROM files WHERE name = ?", ((name,) for name in removed)
+            )
+        return added, removed
+
+    def pin(self, token, names):
+        """Protect files from eviction.
+
+        Pins are held by the current process and are ignored once it has
+        exited.
+
+        Parameters
+        ----------
+        token : str
+            Identifies the holder of the pins. The files previously pinned
+            with *token* are replaced by *names*.
+        names : iterable of str
+            Names of the files to pin.
+        """
+        pid, host = os.getpid(), socket.gethostname()
+        with self._connect() as connection:
+            connection.execute("DELETE FROM pins WHERE token = ?", (token,))
+            connection.executemany(
+                "INSERT OR IGNORE INTO pins VALUES (?, ?, ?, ?)",
+                ((token, name, pid, host) for name in names),
+            )
+
+    def unpin(self, token):
+        """Remove the pins held with *token*."""
+        if not self.path.is_file():
+            return
+        with self._connect() as connection:
+            connection.execute("DELETE FROM pins WHERE token = ?", (token,))
+
+    def pinned(self):
+        """Names of the files pinned by running processes."""
+        with self._connect() as connection:
+            return self._pinned(connection)
+
+    def _pinned(self, connection):
+        dead = [
+            (pid, host)
+            for pid, host in connection.execute("SELECT DISTINCT pid, host FROM pins")
+            if not _is_alive(pid, host)
+        ]
+        connection.executemany("DELETE FROM pins WHERE pid = ? AND host = ?", dead)
+        return {name for (name,) in connection.execute("SELECT name FROM pins")}
+
+    def evict(self, quota, keep=(), dry_run=False):
+        """Remove the least recently used files until the cache fits a quota.
+
+        The size of the cache includes the auxiliary files of the data
+        files (see :meth:`sidecars`), which are removed along with them.
+        Files that are pinned (see :meth:`pin`), or listed in *keep*, are
+        never removed so the cache may remain larger than the quota.
+
+        Parameters
+        ----------
+        quota : int or str
+            Largest size of the cache, in bytes (or as a string like
+            ``"20G"``).
+        keep : iterable of str, optional
+            Names of files not to remove.
+        dry_run : bool, optional
+            If ``True``, do not remove any files but only report the files
+            that would be removed.
+
+        Returns
+        -------
+        list of str
+            Names of the removed files.
+        """
+        quota = parse_size(quota)
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT name, size FROM files ORDER BY accessed, name"
+            ).fetchall()
+            sidecars = {path: _disk_usage(path) for path in self.sidecars()}
+            excess = sum(size for _, size in rows) + sum(sidecars.values()) - quota
+            if excess <= 0:
+                return []
+
+            protected = self._pinned(connection) | set(keep)
+            evicted, freed = [], []
+            for name, size in rows:
+                if excess <= 0:
+                    break
+                if name not in protected:
+                    evicted.append(name)
+                    excess -= size
+                    for path in list(sidecars):
+                        if _is_sidecar(path, [name]):
+                            freed.append(path)
+                            excess -= sidecars.pop(path)
+
+            if evicted and not dry_run:
+                for path in [self._folder / name for name in evicted] + freed:
+                    remove_path(path)
+                connection.executemany(
+                    "DELETE FROM files WHERE name = ?", ((name,) for name in evicted)
+                )
+        return evicted
+
+    def sidecars(self, names=None):
+        """Find the auxiliary files in the cache folder.
+
+        These are the partial downloads, saved validators and inventories,
+        *cfgrib* indexes, and decompressed and decoded copies of data files.
+        If the cache has an *index_dir*, the indexes and decompressed copies
+        kept there of the data files in the cache are included.
+
+        Parameters
+        ----------
+        names : iterable of str, optional
+            Only find the auxiliary files of these data files.
+
+        Returns
+        -------
+        list of pathlib.Path
+            Paths to the auxiliary files.
+        """
+        paths = _scan(self._folder, SIDECAR_PATTERNS)
+        if names is not None:
+            names = list(names)
+            paths = [path for path in paths if _is_sidecar(path, names)]
+
+        if self._index_dir is not None and self._index_dir != self._folder:
+            if names is None:
+                with self._connect() as connection:
+                    names = [
+                        name for (name,) in connection.execute("SELECT name FROM files")
+                    ]
+            plain = {plain_name(name) for name in names}
+            paths += [
+                path
+                for path in _scan(self._index_dir, INDEX_PATTERNS)
+                if _data_name(path) in plain
+            ]
+        return sorted(paths)
+
+
+def _scan(folder, patterns):
+    """Find the auxiliary files in a folder and its folder of scratch copies."""
+    paths = []
+    if folder.is_dir():
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if any(
+                    fnmatch.fnmatchcase(entry.name, pattern) for pattern in patterns
+                ):
+                    paths.append(pathlib.Path(entry.path))
+
+    scratch = folder / SCRATCH_DIR
+    if scratch.is_dir():
+        with os.scandir(scratch) as entries:
+            for entry in entries:
+                if entry.is_file() and parse_name(entry.name.removesuffix(".part")):
+                    paths.append(pathlib.Path(entry.path))
+    return paths
+
+
+def _data_name(path):
+    """Name of the decompressed data file of an index or scratch copy."""
+    if path.parent.name == SCRATCH_DIR:
+        return path.name.removesuffix(".part")
+    return path.name.rsplit(".", 2)[0]
+
+
+def _disk_usage(path):
+    """Number of bytes used by a file or a folder tree (a Zarr store)."""
+    path = pathlib.Path(path)
+    try:
+        if not path.is_dir():
+            return path.stat().st_size
+        return sum(
+            (pathlib.Path(root) / name).stat().st_size
+            for root, _, files in os.walk(path)
+            for name in files
+        )
+    except FileNotFoundError:
+        return 0
+
+
+def _is_sidecar(path, names):
+    """Check if an auxiliary file belongs to any of some data files."""
+    if path.parent.name == SCRATCH_DIR:
+        return path.name.removesuffix(".part") in {plain_name(name) for name in names}
+    return any(
+        path.name.startswith((f"{name}.", f"{plain_name(name)}."))
+        or is_decoded_from(path.name, name)
+        for name in names
+    )
+
+
+def _where(filters):
+    clauses, params = [], []
+    for column, pattern in filters.items():
+        if column not in COLUMNS:
+            raise ChoiceError(column, COLUMNS)
+        if pattern is not None:
+            clauses.append(f"{column} GLOB ?")
+            params.append(pattern)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
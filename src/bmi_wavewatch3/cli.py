@@ -1,5 +1,7 @@
+import asyncio
+import contextlib
+import datetime
 import inspect
-import itertools
 import os
 import pathlib
 import sys
@@ -7,22 +9,37 @@ import textwrap
 import urllib
 from collections import namedtuple
 from functools import partial
-from multiprocessing import Pool, RLock
 
 import click
 import matplotlib.pyplot as plt
 from tqdm.auto import tqdm
 
-from .downloader import WaveWatch3Downloader
-from .errors import ChoiceError, DateValueError
-from .source import SOURCES
+from .cache import COLUMNS, CacheIndex, parse_size
+from .decoded import FORMATS, remove_path, validate_format
+from .downloader import WaveWatch3Downloader, gather_per_host
+from .errors import ChoiceError, DateValueError, WaveWatch3Error
+from .executor import Executor
+from .gribindex import build_indexes
+from .plan import iter_months, plan_downloads, plan_range
+from .points import (
+    METHODS,
+    OUTPUT_FORMATS,
+    read_points,
+    validate_output_format,
+    write_points,
+)
+from .scheduler import AdaptiveScheduler
+from .source import SOURCES, VARIABLES, quantities_of
+from .storage import SUFFIXES, validate_storage
 from .wavewatch3 import WaveWatch3
 
 out = partial(click.secho, bold=True, file=sys.stderr)
 err = partial(click.secho, fg="red", file=sys.stderr)
 
 
-DownloadResult = namedtuple("DownloadResult", ["remote", "local", "success", "status"])
+DownloadResult = namedtuple(
+    "DownloadResult", ["remote", "local", "success", "status", "dates"], defaults=[()]
+)
 
 
 def validate_date(ctx, param, value):
@@ -50,21 +67,11 @@ def validate_quantity(ctx, param, value):
 
 
 def validate_data_var(ctx, param, value):
-    data_var_to_quantity = {
-        "dirpw": "dp",
-        "swh": "hs",
-        "perpw": "tp",
-        "u": "wind",
-        "v": "wind",
-        "swdir": "pdir",
-        "swell": "phs",
-        "swper": "ptp",
-    }
     source = SOURCES[ctx.parent.params["source"]]
     try:
-        quantity = data_var_to_quantity[value]
-    except KeyError:
-        raise click.BadParameter(ChoiceError(value, list(data_var_to_quantity)))
+        (quantity,) = quantities_of(value)
+    except ChoiceError as error:
+        raise click.BadParameter(error)
 
     try:
         source.validate_quantity(quantity)
@@ -73,6 +80,74 @@ def validate_data_var(ctx, param, value):
     return value
 
 
+def validate_data_vars(ctx, param, value):
+    source = SOURCES[ctx.parent.params["source"]]
+    try:
+        quantities = quantities_of(value)
+    except ChoiceError as error:
+        raise click.BadParameter(error)
+
+    for quantity in quantities:
+        try:
+            source.validate_quantity(quantity)
+        except ChoiceError as error:
+            raise click.BadParameter(error)
+    return value
+
+
+def validate_point(ctx, param, value):
+    """Convert points, like "46.1,-124.5", to latitude and longitude."""
+    points = []
+    for point in value:
+        try:
+            lat, lon = (float(coord) for coord in point.split(","))
+        except ValueError:
+            raise click.BadParameter(f"{point!r}: not a point (e.g. 46.1,-124.5)")
+        points.append((lat, lon))
+    return points
+
+
+def validate_rate_limit(ctx, param, value):
+    """Convert a rate, like "500K" or "2.5M/s", to bytes per second."""
+    if value is None:
+        return None
+    try:
+        rate = parse_size(value.strip().upper().removesuffix("/S"))
+    except ValueError:
+        raise click.BadParameter(f"{value!r}: not a rate (e.g. 500K or 2.5M)")
+    if rate <= 0:
+        raise click.BadParameter(f"{value!r}: rate must be positive")
+    return rate
+
+
+def validate_size(ctx, param, value):
+    """Convert a size, like "500M" or "2.5G", to bytes."""
+    if value is None:
+        return None
+    try:
+        return parse_size(value)
+    except ValueError as error:
+        raise click.BadParameter(str(error))
+
+
+def validate_decoded(ctx, param, value):
+    """Check that decoded copies can be written in a format."""
+    if value is None:
+        return None
+    try:
+        return validate_format(value)
+    except WaveWatch3Error as error:
+        raise click.BadParameter(str(error))
+
+
+def validate_storage_option(ctx, param, value):
+    """Check that downloaded files can be kept in a format."""
+    try:
+        return validate_storage(value)
+    except WaveWatch3Error as error:
+        raise click.BadParameter(str(error))
+
+
 def validate_grid(ctx, param, value):
     source = SOURCES[ctx.parent.params["source"]]
     if not value:
@@ -108,7 +183,14 @@ def validate_grid(ctx, param, value):
     default="multigrid",
     help="WAVEWATCH III data source",
 )
-def ww3(cd, silent, verbose, source) -> None:
+@click.option(
+    "--mirror",
+    envvar="WAVEWATCH3_MIRROR",
+    metavar="URL",
+    help="Download data from a mirror of the NOAA servers.",
+)
+@click.pass_context
+def ww3(ctx, cd, silent, verbose, source, mirror) -> None:
     """Download WAVEWATCH III data.
 
     \b
@@ -118,9 +200,30 @@ def ww3(cd, silent, verbose, source) -> None:
 
         $ ww3 fetch 2010-05-22 2010-05-22
     """
+    if mirror:
+        ctx.with_resource(_environ(WAVEWATCH3_MIRROR=mirror))
     os.chdir(cd)
 
 
+@contextlib.contextmanager
+def _environ(**values):
+    """Set environment variables for the length of a command.
+
+    The mirror is read from the environment, rather than passed along, so
+    that it reaches the threads and worker processes that build urls.
+    """
+    prev = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in prev.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
 @ww3.command()
 @click.option("--all", is_flag=True, help="info on all sources")
 @click.pass_context
@@ -177,6 +280,11 @@ def url(ctx, date, grid, quantity):
     is_flag=True,
     help="force download even if local file already exists",
 )
+@click.option(
+    "--revalidate",
+    is_flag=True,
+    help="download local files again if they have changed on the server",
+)
 @click.option("--file", type=click.File("r", lazy=False), help="read dates from a file")
 @click.option("--grid", default=None, help="Grid to download", callback=validate_grid)
 @click.option(
@@ -186,25 +294,134 @@ def url(ctx, date, grid, quantity):
     help="Quantity to download",
     callback=validate_quantity,
 )
+@click.option(
+    "--async",
+    "use_async",
+    is_flag=True,
+    help="schedule downloads with asyncio rather than a pool of threads",
+)
+@click.option(
+    "--max-per-host",
+    default=4,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="maximum number of simultaneous downloads from a host (with --async)",
+)
+@click.option(
+    "--max-concurrency",
+    default=8,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="maximum number of simultaneous downloads",
+)
+@click.option(
+    "--rate-limit",
+    default=None,
+    callback=validate_rate_limit,
+    help="cap on the combined download rate, in bytes per second (e.g. 2.5M)",
+)
+@click.option(
+    "--index",
+    "build_index",
+    is_flag=True,
+    help="build the cfgrib indexes of the downloaded files",
+)
+@click.option(
+    "--index-dir",
+    type=click.Path(file_okay=False, path_type=pathlib.Path),
+    envvar="WAVEWATCH3_INDEX_DIR",
+    default=None,
+    help="folder in which to write cfgrib indexes (implies --index)",
+)
+@click.option(
+    "--storage",
+    type=click.Choice(sorted(SUFFIXES)),
+    envvar="WAVEWATCH3_STORAGE",
+    default="plain",
+    show_default=True,
+    callback=validate_storage_option,
+    help="format in which to keep downloaded files",
+)
 @click.pass_context
-def fetch(ctx, date, dry_run, force, file, grid, quantity):
+def fetch(
+    ctx,
+    date,
+    dry_run,
+    force,
+    revalidate,
+    file,
+    grid,
+    quantity,
+    use_async,
+    max_per_host,
+    max_concurrency,
+    rate_limit,
+    build_index,
+    index_dir,
+    storage,
+):
     """Download WAVEWATCH III data by date."""
     verbose = ctx.parent.params["verbose"]
     silent = ctx.parent.params["silent"]
-    Source = SOURCES[ctx.parent.params["source"]]
 
     if file:
-        date += file.read().splitlines()
+        date += tuple(line for line in file.read().splitlines() if line.strip())
 
-    urls = [str(Source(d, q, grid=grid)) for q in quantity for d in date]
+    plan = plan_downloads(
+        date, quantities=quantity, grid=grid, source=ctx.parent.params["source"]
+    )
+    urls = list(plan)
 
     if not silent and verbose:
-        for url in urls:
-            out(url)
+        for url, dates in plan.items():
+            out(f"{url} ({len(dates)} {'date' if len(dates) == 1 else 'dates'})")
 
     if not dry_run:
-        results = _retreive_urls(urls, disable=silent, force=force)
+        scheduler = AdaptiveScheduler(
+            max_concurrency=max_concurrency, rate_limit=rate_limit
+        )
+        index = CacheIndex(".")
+        cached = (
+            None
+            if force or revalidate
+            else index.lookup(
+                WaveWatch3Downloader.local_file_part(url, storage=storage)
+                for url in urls
+            )
+        )
+        if use_async:
+            results = asyncio.run(
+                _aretreive_urls(
+                    urls,
+                    disable=silent,
+                    force=force,
+                    revalidate=revalidate,
+                    max_per_host=max_per_host,
+                    meter=scheduler.meter,
+                    cached=cached,
+                    index=index,
+                    storage=storage,
+                )
+            )
+        else:
+            results = _retreive_urls(
+                urls,
+                disable=silent,
+                force=force,
+                revalidate=revalidate,
+                scheduler=scheduler,
+                cached=cached,
+                index=index,
+                storage=storage,
+            )
+        results = [
+            result._replace(dates=tuple(plan[result.remote])) for result in results
+        ]
 
+        if not silent and verbose:
+            for result in results:
+                for date in result.dates:
+                    out(f"{date}: {result.local}")
         if not silent:
             [
                 out(f"{result.status}: {result.local}")
@@ -217,9 +434,127 @@ def fetch(ctx, date, dry_run, force, file, grid, quantity):
             if not result.success
         ]
 
+        if build_index or index_dir is not None:
+            with Executor("thread", max_workers=max_concurrency) as executor:
+                build_indexes(
+                    [result.local for result in results if result.success],
+                    index_dir=index_dir,
+                    executor=executor,
+                )
+
         [print(result.local) for result in results if result.success]
 
 
+@ww3.command()
+@click.option(
+    "--start", required=True, metavar="YYYY-MM", help="first month to download"
+)
+@click.option("--end", required=True, metavar="YYYY-MM", help="last month to download")
+@click.option("--grid", default=None, help="Grid to download", callback=validate_grid)
+@click.option(
+    "--quantity",
+    "-q",
+    multiple=True,
+    help="Quantity to download",
+    callback=validate_quantity,
+)
+@click.option("--dry-run", is_flag=True, help="only print the urls to download")
+@click.option(
+    "--force",
+    "-f",
+    is_flag=True,
+    help="force download even if local file already exists",
+)
+@click.option(
+    "--max-concurrency",
+    default=8,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="maximum number of simultaneous downloads",
+)
+@click.option(
+    "--rate-limit",
+    default=None,
+    callback=validate_rate_limit,
+    help="cap on the combined download rate, in bytes per second (e.g. 2.5M)",
+)
+@click.option(
+    "--storage",
+    type=click.Choice(sorted(SUFFIXES)),
+    envvar="WAVEWATCH3_STORAGE",
+    default="plain",
+    show_default=True,
+    callback=validate_storage_option,
+    help="format in which to keep downloaded files",
+)
+@click.pass_context
+def prefetch(
+    ctx,
+    start,
+    end,
+    grid,
+    quantity,
+    dry_run,
+    force,
+    max_concurrency,
+    rate_limit,
+    storage,
+):
+    """Download all WAVEWATCH III data files for a range of months.
+
+    Files that are already cached are skipped. For example, to cache the
+    significant wave height of the multigrid hindcast,
+
+    \b
+        ww3 prefetch --start=2005-02 --end=2019-05 -q hs
+    """
+    verbose = ctx.parent.params["verbose"]
+    silent = ctx.parent.params["silent"]
+
+    try:
+        urls = plan_range(
+            start,
+            end,
+            quantities=quantity,
+            grid=grid,
+            source=ctx.parent.params["source"],
+        )
+    except (ChoiceError, DateValueError) as error:
+        raise click.BadParameter(str(error))
+
+    index = CacheIndex(".")
+    if not force:
+        urls = index.missing(
+            urls, key=partial(WaveWatch3Downloader.local_file_part, storage=storage)
+        )
+
+    if dry_run:
+        [print(url) for url in urls]
+        return
+
+    results = _retreive_urls(
+        urls,
+        disable=silent,
+        force=force,
+        scheduler=AdaptiveScheduler(
+            max_concurrency=max_concurrency, rate_limit=rate_limit
+        ),
+        cached=frozenset(),
+        index=index,
+        storage=storage,
+    )
+
+    if not silent and verbose:
+        [out(f"{result.status}: {result.local}") for result in results]
+    [
+        err(f"{result.status}: {result.remote}")
+        for result in results
+        if not result.success
+    ]
+
+    [print(result.local) for result in results if result.success]
+
+
 @ww3.command()
 @click.option("--dry-run", is_flag=True, help="only display what would have been done")
 @click.option(
@@ -228,30 +563,44 @@ def fetch(ctx, date, dry_run, force, file, grid, quantity):
     help="cache folder to clean",
     default="~/.wavewatch3/data",
 )
+@click.option(
+    "--index-dir",
+    type=click.Path(file_okay=False, path_type=pathlib.Path),
+    envvar="WAVEWATCH3_INDEX_DIR",
+    default=None,
+    help="folder that holds the cfgrib indexes of the cached files",
+)
 @click.option("--yes", is_flag=True, help="remove files without prompting")
+@click.option(
+    "--max-size",
+    default=None,
+    callback=validate_size,
+    help=(
+        "only remove the least recently used files, until the cache is no"
+        " larger than this size (e.g. 20G)"
+    ),
+)
 @click.pass_context
-def clean(ctx, dry_run, cache_dir, yes):
+def clean(ctx, dry_run, cache_dir, index_dir, yes, max_size):
     """Remove cached date files."""
     verbose = ctx.parent.params["verbose"]
     silent = ctx.parent.params["silent"]
 
-    source = "multi_*"
-    grid = "*"
-    quantity = "*"
-    date = "*"
-
     cache_dir = cache_dir.expanduser()
-    cache_files = list(
-        itertools.chain(
-            cache_dir.glob(f"{source}.{grid}.{quantity}.{date}.grb2"),
-            cache_dir.glob(f"{source}.{grid}.{quantity}.{date}.grb2.gz"),
-            cache_dir.glob(f"{source}.{grid}.{quantity}.{date}.grb2.*.idx"),
-            cache_dir.glob(f"{grid}.{quantity}.{date}.grb"),
-            cache_dir.glob(f"{grid}.{quantity}.{date}.grb.*.idx"),
-        )
-    )
+    if cache_dir.is_dir():
+        index = CacheIndex(cache_dir, index_dir=index_dir)
+        entries = index.entries()
+        if max_size is None:
+            sidecars = index.sidecars()
+        else:
+            evicted = set(index.evict(max_size, dry_run=True))
+            entries = [entry for entry in entries if entry.name in evicted]
+            sidecars = index.sidecars(evicted) if evicted else []
+        cache_files = [cache_dir / entry.name for entry in entries] + sidecars
+    else:
+        index, entries, cache_files = None, [], []
 
-    total_bytes = sum(cache_file.stat().st_size for cache_file in cache_files)
+    total_bytes = sum(entry.size for entry in entries)
 
     if not silent and not dry_run:
         for cache_file in cache_files:
@@ -260,16 +609,225 @@ def clean(ctx, dry_run, cache_dir, yes):
 
     if not dry_run and len(cache_files):
         yes = yes or click.confirm(
-            "Are you sure you want to remove all files?", abort=True
+            f"Are you sure you want to remove {'all' if max_size is None else 'these'}"
+            " files?",
+            abort=True,
         )
 
     for cache_file in cache_files:
-        cache_file.unlink() if not dry_run else out(f"rm {cache_file}")
+        remove_path(cache_file) if not dry_run else out(f"rm {cache_file}")
+    if not dry_run and index is not None:
+        index.remove(entry.name for entry in entries)
 
     if not dry_run and (verbose and not silent):
         out(f"Removed {len(cache_files)} files ({total_bytes} bytes)")
 
 
+@ww3.command()
+@click.argument("action", type=click.Choice(["ls", "du", "sync"]))
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, path_type=pathlib.Path),
+    help="cache folder",
+    default="~/.wavewatch3/data",
+)
+@click.option("--grid", default=None, help="only files whose grid matches a pattern")
+@click.option(
+    "--quantity", default=None, help="only files whose quantity matches a pattern"
+)
+@click.option(
+    "--month", default=None, help="only files whose month (YYYY-MM) matches a pattern"
+)
+@click.option(
+    "--by",
+    type=click.Choice(COLUMNS),
+    default="quantity",
+    show_default=True,
+    help="column by which to group files (with du)",
+)
+@click.pass_context
+def cache(ctx, action, cache_dir, grid, quantity, month, by):
+    """Query the index of cached data files.
+
+    \b
+    Actions:
+      ls    list cached files with their size and time of last access
+      du    summarize the disk space used by cached files
+      sync  update the index with files added or removed by other means
+
+    \b
+    Examples:
+
+      Show the space used by each month of 2010,
+
+        $ ww3 cache --by=month --month="2010-*" du
+    """
+    silent = ctx.parent.params["silent"]
+
+    cache_dir = cache_dir.expanduser()
+    if not cache_dir.is_dir():
+        return
+    index = CacheIndex(cache_dir)
+    filters = {"grid": grid, "quantity": quantity, "month": month}
+
+    if action == "ls":
+        for entry in index.entries(**filters):
+            accessed = datetime.datetime.fromtimestamp(entry.accessed)
+            print(
+                f"{entry.size:>12d} {accessed.isoformat(sep=' ', timespec='minutes')}"
+                f" {cache_dir / entry.name}"
+            )
+    elif action == "du":
+        usage = index.usage(by=by, **filters)
+        for value, count, size in usage:
+            print(f"{value}\t{count}\t{size}")
+        if not silent:
+            out(
+                f"Total: {sum(count for _, count, _ in usage)} files,"
+                f" {sum(size for _, _, size in usage) // 2**20} MB"
+            )
+    else:
+        added, removed = index.sync()
+        [print(f"+ {cache_dir / name}") for name in added]
+        [print(f"- {cache_dir / name}") for name in removed]
+        if not silent:
+            out(f"Added {len(added)} files, removed {len(removed)} files")
+
+
+@ww3.command()
+@click.option(
+    "--start", required=True, metavar="YYYY-MM", help="first month to extract"
+)
+@click.option("--end", required=True, metavar="YYYY-MM", help="last month to extract")
+@click.option(
+    "--points",
+    "points_file",
+    type=click.File("r"),
+    default=None,
+    help="CSV file of points, with latitude, longitude and (optional) name columns",
+)
+@click.option(
+    "--point",
+    multiple=True,
+    metavar="LAT,LON",
+    callback=validate_point,
+    help="a point at which to extract data",
+)
+@click.option("--grid", default=None, help="Grid to extract", callback=validate_grid)
+@click.option(
+    "--data-var",
+    multiple=True,
+    help="Data variable to extract",
+    callback=validate_data_vars,
+)
+@click.option(
+    "--method",
+    type=click.Choice(METHODS),
+    default="nearest",
+    show_default=True,
+    help="how to sample the grid at the points",
+)
+@click.option(
+    "--output",
+    "-o",
+    default="-",
+    help="file to write (.csv or .parquet), or - for standard output",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(sorted(OUTPUT_FORMATS)),
+    default=None,
+    help="format of the output [default: from the extension of the output, or csv]",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, path_type=pathlib.Path),
+    help="cache folder",
+    default="~/.wavewatch3/data",
+)
+@click.pass_context
+def extract(
+    ctx,
+    start,
+    end,
+    points_file,
+    point,
+    grid,
+    data_var,
+    method,
+    output,
+    output_format,
+    cache_dir,
+):
+    """Extract time series of WAVEWATCH III data at points.
+
+    For example, to extract significant wave height and peak period at
+    the buoys listed in a CSV file,
+
+    \b
+        ww3 extract --start=2009-01 --end=2019-12 --points=buoys.csv \\
+            --data-var=swh --data-var=perpw -o buoys.parquet
+    """
+    silent = ctx.parent.params["silent"]
+
+    lats, lons, names = [], [], None
+    if points_file is not None:
+        try:
+            lats, lons, names = read_points(points_file)
+        except WaveWatch3Error as error:
+            raise click.BadParameter(str(error), param_hint="--points")
+        lats, lons = list(lats), list(lons)
+        names = None if names is None else list(names)
+    if point:
+        if names is not None:
+            names += [f"{lat:g},{lon:g}" for lat, lon in point]
+        lats += [lat for lat, _ in point]
+        lons += [lon for _, lon in point]
+    if not lats:
+        raise click.UsageError("no points given (use --points or --point)")
+
+    try:
+        output_format = validate_output_format(
+            output_format, None if output == "-" else output
+        )
+    except WaveWatch3Error as error:
+        raise click.BadParameter(str(error), param_hint="--format")
+    if output == "-" and output_format != "csv":
+        raise click.BadParameter(
+            f"{output_format}: can only write csv to standard output",
+            param_hint="--format",
+        )
+
+    try:
+        frames = WaveWatch3.extract_points(
+            lats,
+            lons,
+            start,
+            end,
+            method=method,
+            names=names,
+            cache=cache_dir,
+            grid=grid,
+            source=ctx.parent.params["source"],
+            variables=data_var or None,
+        )
+    except WaveWatch3Error as error:
+        raise click.BadParameter(str(error))
+
+    if not silent:
+        frames = tqdm(frames, desc="months", total=_count_months(start, end))
+    rows = write_points(
+        frames, sys.stdout if output == "-" else output, format=output_format
+    )
+    if not silent:
+        out(f"{rows} rows written to {'<stdout>' if output == '-' else output}")
+
+
+def _count_months(start, end):
+    return sum(1 for _ in iter_months(start, end))
+
+
 @ww3.command()
 @click.argument("date", callback=validate_date)
 @click.option("--grid", default=None, help="Grid to download", callback=validate_grid)
@@ -279,24 +837,22 @@ def clean(ctx, dry_run, cache_dir, yes):
     default="swh",
     callback=validate_data_var,
 )
+@click.option(
+    "--decoded",
+    type=click.Choice(sorted(FORMATS)),
+    envvar="WAVEWATCH3_DECODED_CACHE",
+    default=None,
+    callback=validate_decoded,
+    help="keep a decoded copy of the data, in this format, for faster reopening",
+)
 @click.pass_context
-def plot(ctx, date, grid, data_var):
+def plot(ctx, date, grid, data_var, decoded):
     """Plot WAVEWATCH III data by date."""
     verbose = ctx.parent.params["verbose"]
     silent = ctx.parent.params["silent"]
     source = ctx.parent.params["source"]
 
-    data_var_to_quantity = {
-        "dirpw": "dp",
-        "swh": "hs",
-        "perpw": "tp",
-        "u": "wind",
-        "v": "wind",
-        "swdir": "pdir",
-        "swell": "phs",
-        "swper": "ptp",
-    }
-    quantity = data_var_to_quantity[data_var]
+    quantity = VARIABLES[data_var]
 
     if not silent:
         out(f"source: {source}")
@@ -304,32 +860,101 @@ def plot(ctx, date, grid, data_var):
         out(f"date: {date}")
         out(f"data_var: {data_var} ({quantity})")
 
-    ww3 = WaveWatch3(date, source=source, grid=grid)
+    ww3 = WaveWatch3(
+        date, source=source, grid=grid, decoded_cache=decoded, variables=[data_var]
+    )
     if not silent and verbose:
         [out(f"source file: {url}") for url in ww3._urls]
 
     ww3.data
     if not silent and verbose:
-        [out(f"cache file: {ww3._cache / url.filename}") for url in ww3._urls]
+        [
+            out(
+                "cache file:"
+                f" {ww3._cache / WaveWatch3Downloader.local_file_part(str(url))}"
+            )
+            for url in ww3._urls
+        ]
 
     ww3.data[data_var][ww3.step, :, :].plot()
     plt.gca().set_aspect(1)
     plt.show()
 
 
-def _retreive_urls(urls, disable=False, force=False):
-    tqdm.set_lock(RLock())
-    p = Pool(initializer=tqdm.set_lock, initargs=(tqdm.get_lock(),))
-    return p.map(
-        partial(_retreive, disable=disable, force=force), list(enumerate(urls))
+def _retreive_urls(
+    urls,
+    disable=False,
+    force=False,
+    revalidate=False,
+    scheduler=None,
+    cached=None,
+    index=None,
+    storage="plain",
+):
+    scheduler = AdaptiveScheduler() if scheduler is None else scheduler
+    return scheduler.map(
+        partial(
+            _retreive,
+            disable=disable,
+            force=force,
+            revalidate=revalidate,
+            meter=scheduler.meter,
+            cached=cached,
+            index=index,
+            storage=storage,
+        ),
+        enumerate(urls),
+        failed=lambda result: not result.success,
+    )
+
+
+async def _aretreive_urls(
+    urls,
+    disable=False,
+    force=False,
+    revalidate=False,
+    max_per_host=4,
+    meter=None,
+    cached=None,
+    index=None,
+    storage="plain",
+):
+    return await gather_per_host(
+        partial(
+            _retreive,
+            disable=disable,
+            force=force,
+            revalidate=revalidate,
+            meter=meter,
+            cached=cached,
+            index=index,
+            storage=storage,
+        ),
+        list(enumerate(urls)),
+        max_per_host=max_per_host,
+        key=lambda position_and_url: position_and_url[1],
     )
 
 
-def _retreive(position_and_url, disable=False, force=False):
+def _retreive(
+    position_and_url,
+    disable=False,
+    force=False,
+    revalidate=False,
+    meter=None,
+    cached=None,
+    index=None,
+    storage="plain",
+):
     position, url = position_and_url
-    name = pathlib.Path(urllib.parse.urlparse(url).path).name
+    name = WaveWatch3Downloader.url_file_part(url)
+    local_name = WaveWatch3Downloader.local_file_part(url, storage=storage)
+    if cached is None:
+        is_cached = pathlib.Path(local_name).is_file()
+    else:
+        is_cached = local_name in cached
 
-    if not pathlib.Path(name).is_file() or force:
+    if not is_cached or force or revalidate:
         with TqdmUpTo(
             unit="B",
             unit_scale=True,
@@ -342,18 +967,30 @@ def _retreive(position_and_url, disable=False, force=False):
         ) as t:
             try:
                 WaveWatch3Downloader.retreive(
-                    url, filename=name, reporthook=t.update_to, force=force
+                    url,
+                    filename=name,
+                    reporthook=t.update_to if meter is None else meter(t.update_to),
+                    force=force,
+                    revalidate=revalidate,
+                    index=index,
+                    storage=storage,
                 )
             except (urllib.error.HTTPError, urllib.error.URLError) as error:
                 success, status = False, str(error)
             else:
-                t.total = t.n
-                success, status = True, f"downloaded {t.total} bytes"
+                if is_cached and not force and t.total is None:
+                    success, status = True, "not modified"
+                else:
+                    t.total = t.n
+                    success, status = True, f"downloaded {t.total} bytes"
     else:
         success, status = True, "cached"
 
     return DownloadResult(
-        local=pathlib.Path(name).absolute(), remote=url, success=success, status=status
+        local=pathlib.Path(local_name).absolute(),
+        remote=url,
+        success=success,
+        status=status,
     )
 
 
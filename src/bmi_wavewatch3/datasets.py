@@ -0,0 +1,176 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class DatasetCache:
+    """A least-recently-used cache of open datasets.
+
+    Opening a month of GRIB files is slow so the datasets are kept open,
+    keyed by the files they were opened from, and shared between the
+    :class:`~bmi_wavewatch3.WaveWatch3` instances of a process. Datasets
+    are reference counted: a dataset is only closed once it is no longer
+    in use and it is not one of the *maxsize* most recently used.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Number of datasets, not in use, to keep open.
+
+    Examples
+    --------
+    >>> import xarray as xr
+    >>> from bmi_wavewatch3.datasets import DatasetCache
+    >>> cache = DatasetCache(maxsize=1)
+    >>> ds = cache.acquire("2010-05", xr.Dataset)
+    >>> cache.acquire("2010-05", xr.Dataset) is ds
+    True
+    >>> cache.release("2010-05")
+    >>> cache.release("2010-05")
+    >>> "2010-05" in cache
+    True
+    >>> _ = cache.acquire("2010-06", xr.Dataset)
+    >>> cache.release("2010-06")
+    >>> "2010-05" in cache
+    False
+    """
+
+    def __init__(self, maxsize=4):
+        if maxsize < 0:
+            raise ValueError("maxsize must be non-negative")
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._opening = {}
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        """Number of datasets, not in use, to keep open."""
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize):
+        if maxsize < 0:
+            raise ValueError("maxsize must be non-negative")
+        with self._lock:
+            self._maxsize = maxsize
+            stale = self._trim()
+        _close_all(stale)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def acquire(self, key, open_dataset):
+        """Get a dataset, opening it if it is not already open.
+
+        If more than one thread asks for the same dataset, only the first
+        opens it while the others wait for it to be opened.
+
+        Parameters
+        ----------
+        key : hashable
+            Key that identifies the dataset.
+        open_dataset : callable
+            Function, called without arguments, that opens the dataset.
+
+        Returns
+        -------
+        xarray.Dataset
+            The dataset, which must be handed back with :meth:`release`
+            once it is no longer in use.
+        """
+        with self._lock:
+            if (ds := self._use(key)) is not None:
+                return ds
+            opening = self._opening.setdefault(key, threading.Lock())
+
+        with opening:
+            with self._lock:
+                if (ds := self._use(key)) is not None:
+                    return ds
+            try:
+                ds = open_dataset()
+            finally:
+                with self._lock:
+                    self._opening.pop(key, None)
+            with self._lock:
+                self._entries[key] = [ds, 1]
+                stale = self._trim()
+        _close_all(stale)
+        return ds
+
+    def release(self, key, close=False):
+        """Hand back a dataset that is no longer in use.
+
+        Parameters
+        ----------
+        key : hashable
+            Key that identifies the dataset.
+        close : bool, optional
+            If ``True``, close the dataset, once it is no longer in use,
+            rather than keeping it open with the recently used datasets.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > 0:
+                entry[1] -= 1
+            stale = self._trim()
+            if close and key in self._entries and entry[1] == 0:
+                stale.append(self._entries.pop(key)[0])
+        _close_all(stale)
+
+    def clear(self):
+        """Close all of the datasets that are not in use."""
+        with self._lock:
+            stale = [key for key, (_, count) in self._entries.items() if count == 0]
+            stale = [self._entries.pop(key)[0] for key in stale]
+        _close_all(stale)
+
+    def _use(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry[1] += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _trim(self):
+        """Remove the least recently used datasets that are not in use."""
+        unused = [key for key, (_, count) in self._entries.items() if count == 0]
+        stale = unused[: max(len(unused) - self._maxsize, 0)]
+        return [self._entries.pop(key)[0] for key in stale]
+
+
+def _close_all(datasets):
+    for ds in datasets:
+        ds.close()
+
+
+_cache = None
+_cache_pid = None
+_cache_lock = threading.Lock()
+
+
+def get_dataset_cache():
+    """Get the cache of open datasets for this process.
+
+    The number of datasets kept open, other than those in use, is set by
+    the ``WAVEWATCH3_DATASET_CACHE_SIZE`` environment variable (by
+    default, 4).
+
+    Returns
+    -------
+    DatasetCache
+        The cache shared by the :class:`~bmi_wavewatch3.WaveWatch3`
+        instances of this process.
+    """
+    global _cache, _cache_pid
+
+    with _cache_lock:
+        if _cache is None or _cache_pid != os.getpid():
+            maxsize = int(os.environ.get("WAVEWATCH3_DATASET_CACHE_SIZE") or 4)
+            _cache, _cache_pid = DatasetCache(maxsize=maxsize), os.getpid()
+        return _cache
@@ -0,0 +1,247 @@
+import importlib.util
+import json
+import os
+import pathlib
+import shutil
+
+import xarray as xr
+
+from . import gribindex
+from .errors import ChoiceError, WaveWatch3Error
+from .lock import FileLock, lock_path
+from .storage import plain_name
+
+FORMATS = {
+    "netcdf": ".decoded.nc",
+    "zarr": ".decoded.zarr",
+}
+
+_ATTR = "wavewatch3_sources"
+
+
+def decoded_stem(name):
+    """Common part of the names of the decoded copies of a month of data.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.decoded import decoded_stem
+    >>> decoded_stem("multi_1.glo_30m.hs.201005.grb2")
+    'multi_1.glo_30m.201005'
+    >>> decoded_stem("nww3.hs.200501.grb")
+    'nww3.200501'
+    >>> decoded_stem("multi_1.glo_30m.hs.201005.20100501T00-20100501T06.swh.grb2")
+    'multi_1.glo_30m.201005.20100501T00-20100501T06.swh'
+    >>> decoded_stem("multi_1.glo_30m.hs.201005.grb2.zst")
+    'multi_1.glo_30m.201005'
+    """
+    parts, quantity = _split(name)
+    if len(parts) <= quantity:
+        return ".".join(parts)
+    return ".".join(parts[:quantity] + parts[quantity + 1 :])
+
+
+def decoded_path(paths, format="zarr"):
+    """Path to the decoded copy of a month of data files.
+
+    The name of the copy holds the quantities of the files it is made
+    from so that loading other quantities of the same month makes a
+    separate copy.
+
+    Parameters
+    ----------
+    paths : list of path-like
+        The GRIB files that hold a month of data.
+    format : {"netcdf", "zarr"}, optional
+        Format of the decoded copy.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the decoded copy, which is kept alongside the data files.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.decoded import decoded_path
+    >>> decoded_path(
+    ...     ["data/multi_1.glo_30m.tp.201005.grb2", "data/multi_1.glo_30m.hs.201005.grb2"]
+    ... ).as_posix()
+    'data/multi_1.glo_30m.201005.hs-tp.decoded.zarr'
+    """
+    path = pathlib.Path(paths[0])
+    quantities = {_quantity_of(pathlib.Path(filepath).name) for filepath in paths}
+    quantities = "-".join(sorted(quantities - {None}))
+    return path.with_name(f"{decoded_stem(path.name)}.{quantities}{FORMATS[format]}")
+
+
+def is_decoded_from(copy, name):
+    """Check if a decoded copy is made from, among others, a data file.
+
+    Parameters
+    ----------
+    copy : str
+        Name of a decoded copy.
+    name : str
+        Name of a data file.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.decoded import is_decoded_from
+    >>> copy = "multi_1.glo_30m.201005.hs-tp.decoded.zarr"
+    >>> is_decoded_from(copy, "multi_1.glo_30m.tp.201005.grb2.gz")
+    True
+    >>> is_decoded_from(copy, "multi_1.glo_30m.dp.201005.grb2")
+    False
+    >>> is_decoded_from(copy, "multi_1.glo_30m.hs.201006.grb2")
+    False
+    """
+    for suffix in FORMATS.values():
+        if copy.endswith(suffix):
+            stem, _, quantities = copy[: -len(suffix)].rpartition(".")
+            if stem == decoded_stem(name):
+                return _quantity_of(name) in quantities.split("-")
+    return False
+
+
+def _split(name):
+    parts = plain_name(name).split(".")[:-1]
+    return parts, 1 if parts[:1] == ["nww3"] else 2
+
+
+def _quantity_of(name):
+    parts, quantity = _split(name)
+    return parts[quantity] if len(parts) > quantity else None
+
+
+def validate_format(format):
+    """Check that data can be stored in a format.
+
+    Raises
+    ------
+    ChoiceError
+        If *format* is not a known format.
+    WaveWatch3Error
+        If the package needed to write the format is not installed.
+    """
+    if format not in FORMATS:
+        raise ChoiceError(format, FORMATS)
+    if _netcdf_engine() is None if format == "netcdf" else not _has("zarr"):
+        package = "netCDF4 (or h5netcdf)" if format == "netcdf" else "zarr"
+        raise WaveWatch3Error(f"{format}: decoded copies require {package}")
+    return format
+
+
+def open_decoded(paths, format="zarr", open_grib=None, chunks=None):
+    """Open GRIB files through a decoded copy, writing the copy if needed.
+
+    Decoding GRIB messages is slow so, the first time a month of data is
+    opened, the decoded data are written, chunked and compressed, to a
+    single NetCDF4 file or Zarr store. Later opens, by any process, read
+    the copy instead. The copy records the names, sizes and modification
+    times of the GRIB files it was made from, and it is written again if
+    any of them change.
+
+    Parameters
+    ----------
+    paths : list of path-like
+        The GRIB files that hold a month of data.
+    format : {"netcdf", "zarr"}, optional
+        Format of the decoded copy.
+    open_grib : callable, optional
+        Function that opens the GRIB files as an :class:`xarray.Dataset`.
+    chunks : str, int or dict, optional
+        How to chunk the data that are read (see
+        :func:`~bmi_wavewatch3.gribindex.grib_chunks`). If not provided,
+        use the chunks of the decoded copy.
+
+    Returns
+    -------
+    xarray.Dataset
+        The data, read from the decoded copy.
+    """
+    validate_format(format)
+    if open_grib is None:
+        open_grib = gribindex.open_grib
+
+    path = decoded_path(paths, format=format)
+    sources = _fingerprint(paths)
+
+    chunks = {} if chunks is None else gribindex.grib_chunks(chunks)
+    ds = _open(path, format, sources, chunks=chunks)
+    if ds is None:
+        with FileLock(lock_path(path)):
+            ds = _open(path, format, sources, chunks=chunks)
+            if ds is None:
+                with open_grib(paths) as grib:
+                    _write(grib, path, format, sources)
+                ds = _open(path, format, sources, chunks=chunks)
+    if ds is None:
+        raise WaveWatch3Error(f"{path}: unable to open decoded data")
+    return ds
+
+
+def _fingerprint(paths):
+    sources = []
+    for path in sorted(pathlib.Path(p) for p in paths):
+        stat = path.stat()
+        sources.append([path.name, stat.st_size, stat.st_mtime_ns])
+    return json.dumps(sources)
+
+
+def _open(path, format, sources, chunks=None):
+    if not path.exists():
+        return None
+    try:
+        if format == "zarr":
+            ds = xr.open_zarr(path, chunks=chunks)
+        else:
+            ds = xr.open_dataset(path, engine=_netcdf_engine(), chunks=chunks)
+    except Exception:
+        return None
+    if ds.attrs.get(_ATTR) != sources:
+        ds.close()
+        return None
+    del ds.attrs[_ATTR]
+    return ds
+
+
+def _write(ds, path, format, sources):
+    ds = ds.copy()
+    ds.attrs[_ATTR] = sources
+    if "step" in ds.dims:
+        ds = ds.chunk({"step": min(ds.sizes["step"], 8)})
+    for name in ds.variables:
+        ds[name].encoding.pop("chunks", None)
+        ds[name].encoding.pop("preferred_chunks", None)
+
+    part = path.with_name(path.name + ".part")
+    remove_path(part)
+    if format == "zarr":
+        ds.to_zarr(part, mode="w", consolidated=True)
+    else:
+        ds.to_netcdf(
+            part,
+            engine=_netcdf_engine(),
+            encoding={name: {"zlib": True, "complevel": 4} for name in ds.data_vars},
+        )
+    remove_path(path)
+    os.replace(part, path)
+
+
+def remove_path(path):
+    """Remove a file or, as Zarr stores are folders, a folder tree."""
+    path = pathlib.Path(path)
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def _has(package):
+    return importlib.util.find_spec(package) is not None
+
+
+def _netcdf_engine():
+    for package, engine in (("netCDF4", "netcdf4"), ("h5netcdf", "h5netcdf")):
+        if _has(package):
+            return engine
+    return None
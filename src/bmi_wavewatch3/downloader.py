@@ -1,7 +1,16 @@
+import asyncio
 import gzip
+import os
 import pathlib
+import shutil
 import urllib
-import urllib.request
+from collections import defaultdict
+
+from .engine import get_engine, part_file, read_validators, validators_file
+from .errors import WaveWatch3Error
+from .inventory import inventory_file, read_inventory, select_messages, subset_file_part
+from .lock import FileLock, lock_path
+from .storage import compress, stored_path
 
 
 class WaveWatch3Downloader:
@@ -15,27 +24,304 @@ class WaveWatch3Downloader:
         return pathlib.Path(urllib.parse.urlparse(url).path).name
 
     @staticmethod
-    def retreive(url, filename=None, reporthook=None, force=False):
+    def local_file_part(url, storage="plain"):
+        """Name of the local file that holds the data downloaded from a url.
+
+        Gzipped files are decompressed as they are downloaded so, unless
+        files are kept compressed (see *storage*), their local names do not
+        include the *.gz* extension.
+
+        Examples
+        --------
+        >>> from bmi_wavewatch3 import WaveWatch3Downloader
+        >>> WaveWatch3Downloader.local_file_part(
+        ...     "https://example.com/multi_reanal.glo_30m.hs.200901.grb2.gz"
+        ... )
+        'multi_reanal.glo_30m.hs.200901.grb2'
+        >>> WaveWatch3Downloader.local_file_part(
+        ...     "https://example.com/multi_1.glo_30m.hs.201005.grb2", storage="zstd"
+        ... )
+        'multi_1.glo_30m.hs.201005.grb2.zst'
+        """
+        name = WaveWatch3Downloader.url_file_part(url)
+        name = name[: -len(".gz")] if name.endswith(".gz") else name
+        return stored_path(name, storage).name
+
+    @staticmethod
+    def retreive(
+        url,
+        filename=None,
+        reporthook=None,
+        force=False,
+        engine=None,
+        revalidate=False,
+        index=None,
+        storage="plain",
+    ):
+        """Download a WAVEWATCH III data file, unless it is already cached.
+
+        Parameters
+        ----------
+        url : str
+            Url of the data file.
+        filename : str or path-like, optional
+            Local file to download to. Gzipped files are decompressed as
+            they are downloaded. If not provided, use the name of the remote
+            file.
+        reporthook : callable, optional
+            A function called as ``reporthook(blocknum, blocksize, totalsize)``
+            as data are downloaded.
+        force : bool, optional
+            If ``True``, download the file even if it already exists.
+        engine : HttpEngine or UrllibEngine, optional
+            Engine used to download the data.
+        revalidate : bool, optional
+            If ``True``, download an existing file again if it has changed on
+            the server.
+        index : CacheIndex, optional
+            Cache index in which to record the downloaded file.
+        storage : {"plain", "gzip", "zstd"}, optional
+            Format in which to keep the local file. Compressed files are
+            named with a *.gz* or *.zst* extension. Files served gzipped
+            are kept as they are served.
+
+        Returns
+        -------
+        pathlib.Path
+            Path to the local file.
+        """
         if filename is None:
             filename = WaveWatch3Downloader.url_file_part(url)
-        if not pathlib.Path(filename).is_file() or force:
-            filepath, _ = urllib.request.urlretrieve(
-                url, reporthook=reporthook, data=None, filename=filename
+        filepath = pathlib.Path(filename)
+
+        decompress = filepath.suffix == ".gz"
+        if decompress:
+            filepath = filepath.with_name(filepath.stem)
+
+        if storage != "plain" and not (storage == "gzip" and decompress):
+            return WaveWatch3Downloader._retreive_compressed(
+                url,
+                filepath,
+                storage,
+                reporthook=reporthook,
+                force=force,
+                engine=engine,
+                revalidate=revalidate,
+                index=index,
             )
-        else:
-            filepath = filename
+        elif storage == "gzip":
+            filepath, decompress = filepath.with_name(filepath.name + ".gz"), False
 
-        filepath = pathlib.Path(filepath)
-        if filepath.suffix == ".gz":
-            filepath = WaveWatch3Downloader.unzip(filepath)
-        return pathlib.Path(filepath).absolute()
+        if filepath.is_file() and not (force or revalidate):
+            return filepath.absolute()
+
+        with FileLock(lock_path(filepath)):
+            if not filepath.is_file() or force:
+                zipped = filepath.with_name(filepath.name + ".gz")
+                if decompress and zipped.is_file() and not force:
+                    WaveWatch3Downloader.unzip(zipped)
+                else:
+                    engine = get_engine() if engine is None else engine
+                    engine.download(
+                        url, filepath, reporthook=reporthook, decompress=decompress
+                    )
+                if index is not None:
+                    index.record(filepath, url=url)
+            elif revalidate:
+                engine = get_engine() if engine is None else engine
+                mtime = filepath.stat().st_mtime_ns
+                engine.download(
+                    url,
+                    filepath,
+                    reporthook=reporthook,
+                    decompress=decompress,
+                    revalidate=True,
+                )
+                if index is not None and filepath.stat().st_mtime_ns != mtime:
+                    index.record(filepath, url=url)
+
+        return filepath.absolute()
+
+    @staticmethod
+    def _retreive_compressed(
+        url,
+        filepath,
+        storage,
+        reporthook=None,
+        force=False,
+        engine=None,
+        revalidate=False,
+        index=None,
+    ):
+        """Download a data file and compress it for storage.
+
+        The validators saved with the download are kept with the compressed
+        file. To revalidate the file, they are sent with a conditional
+        request and, if the file has changed on the server, it is read from
+        the response to that request.
+        """
+        stored = stored_path(filepath, storage)
+        if stored.is_file() and not (force or revalidate):
+            return stored.absolute()
+
+        with FileLock(lock_path(stored)):
+            validators = None
+            if stored.is_file() and not force:
+                if not revalidate:
+                    return stored.absolute()
+                validators = read_validators(stored, url)
+
+            engine = get_engine() if engine is None else engine
+            filepath.unlink(missing_ok=True)
+            engine.download(
+                url,
+                filepath,
+                reporthook=reporthook,
+                decompress=url.endswith(".gz"),
+                revalidate=validators is not None,
+                validators=validators,
+            )
+            if not filepath.is_file():  # not modified
+                return stored.absolute()
+            compress(filepath, storage)
+            if validators_file(filepath).is_file():
+                os.replace(validators_file(filepath), validators_file(stored))
+            if index is not None:
+                index.record(stored, url=url)
+
+        return stored.absolute()
+
+    @staticmethod
+    def retreive_subset(
+        url,
+        filename=None,
+        time_range=None,
+        variables=None,
+        force=False,
+        engine=None,
+        max_gap=2**16,
+        reporthook=None,
+        index=None,
+    ):
+        """Download just some of the messages of a GRIB2 file.
+
+        The inventory of the remote file is read (and cached next to
+        *filename*) and only the byte ranges of the messages valid within
+        *time_range* for *variables* are downloaded. The messages are
+        concatenated into a local GRIB2 file.
+
+        Parameters
+        ----------
+        url : str
+            Url of a GRIB2 file.
+        filename : str or path-like, optional
+            File to write the messages to. If not provided, the name is built
+            from the name of the remote file and the selection.
+        time_range : tuple of str, optional
+            Start and end (inclusive) of the valid times to download.
+        variables : iterable of str, optional
+            Names of the variables to download (e.g. ``"swh"`` or ``"u"``).
+        force : bool, optional
+            If ``True``, download the messages even if *filename* exists.
+        engine : HttpEngine or UrllibEngine, optional
+            Engine used to download the data.
+        max_gap : int, optional
+            Largest gap, in bytes, between two messages that are fetched
+            with a single request.
+        reporthook : callable, optional
+            A function called as ``reporthook(blocknum, blocksize, totalsize)``
+            as data are downloaded.
+        index : CacheIndex, optional
+            Cache index in which to record the downloaded file.
+
+        Returns
+        -------
+        pathlib.Path or None
+            Path to the downloaded file, or ``None`` if no messages of the
+            file were selected.
+        """
+        name = WaveWatch3Downloader.url_file_part(url)
+        if name.endswith(".gz"):
+            raise WaveWatch3Error(f"{name}: unable to subset a gzipped file")
+
+        if filename is None:
+            filename = subset_file_part(
+                name, time_range=time_range, variables=variables
+            )
+        filepath = pathlib.Path(filename)
+        if filepath.is_file() and not force:
+            return filepath.absolute()
+
+        with FileLock(lock_path(filepath.with_name(name))):
+            if filepath.is_file() and not force:
+                return filepath.absolute()
+
+            engine = get_engine() if engine is None else engine
+
+            cache = inventory_file(filepath.with_name(name))
+            if force:
+                cache.unlink(missing_ok=True)
+            messages = select_messages(
+                read_inventory(url, engine, cache=cache),
+                time_range=time_range,
+                variables=variables,
+            )
+            if not messages:
+                return None
+
+            engine.download_ranges(
+                url,
+                filepath,
+                {
+                    (m.offset, None if m.length is None else m.offset + m.length)
+                    for m in messages
+                },
+                max_gap=max_gap,
+                reporthook=reporthook,
+            )
+            if index is not None:
+                index.record(filepath, url=url)
+
+        return filepath.absolute()
+
+    @staticmethod
+    async def aretreive(
+        url,
+        filename=None,
+        reporthook=None,
+        force=False,
+        engine=None,
+        revalidate=False,
+        index=None,
+        storage="plain",
+    ):
+        """Asynchronous version of :meth:`retreive`.
+
+        The download runs in a worker thread so that it does not block the
+        event loop.
+        """
+        return await asyncio.to_thread(
+            WaveWatch3Downloader.retreive,
+            url,
+            filename=filename,
+            reporthook=reporthook,
+            force=force,
+            engine=engine,
+            revalidate=revalidate,
+            index=index,
+            storage=storage,
+        )
 
     @staticmethod
     def unzip(filepath):
         filepath = pathlib.Path(filepath)
-        with gzip.open(filepath, "rb") as zip_file, open(filepath.stem, "wb") as fp:
-            fp.write(zip_file.read())
-        return pathlib.Path(filepath.stem)
+        unzipped = filepath.with_name(filepath.stem)
+        with gzip.open(filepath, "rb") as zip_file, open(
+            part_file(unzipped), "wb"
+        ) as fp:
+            shutil.copyfileobj(zip_file, fp, length=2**16)
+        os.replace(part_file(unzipped), unzipped)
+        return unzipped
 
     @property
     def filepath(self):
@@ -44,3 +330,31 @@ class WaveWatch3Downloader:
     @property
     def url(self):
         return self._url
+
+
+async def gather_per_host(func, items, max_per_host=4, key=str):
+    """Call a blocking function on many urls, limiting requests to each host.
+
+    Parameters
+    ----------
+    func : callable
+        Function to call with each item. It is run in a worker thread.
+    items : iterable
+        Items to pass to *func*.
+    max_per_host : int, optional
+        Maximum number of calls to run at once for any one host.
+    key : callable, optional
+        Function that returns the url of an item.
+
+    Returns
+    -------
+    list
+        The values returned by *func*, in the same order as *items*.
+    """
+    semaphores = defaultdict(lambda: asyncio.Semaphore(max_per_host))
+
+    async def _call(item):
+        async with semaphores[urllib.parse.urlsplit(key(item)).netloc]:
+            return await asyncio.to_thread(func, item)
+
+    return await asyncio.gather(*(_call(item) for item in items))
@@ -0,0 +1,936 @@
+import http.client
+import itertools
+import json
+import os
+import pathlib
+import socket
+import ssl
+import threading
+import time
+import urllib
+import urllib.error
+import urllib.request
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+
+from ._version import __version__
+from .errors import WaveWatch3Error
+
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+_RETRYABLE_CODES = (408, 429, 500, 502, 503, 504)
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class _Engine:
+    """Methods shared by the download engines.
+
+    Subclasses provide an ``open(url, headers=None)`` context manager that
+    yields a response.
+    """
+
+    _blocksize = 2**16
+    _retries = 0
+    _backoff = 0.0
+    _max_backoff = 0.0
+
+    def read(self, url, start=None, end=None):
+        """Read the contents of a url.
+
+        Parameters
+        ----------
+        url : str
+            The url to read.
+        start : int, optional
+            Offset of the first byte to read.
+        end : int, optional
+            Offset of the byte at which to stop reading (exclusive). If not
+            provided, read to the end of the file.
+
+        Returns
+        -------
+        bytes
+            The requested bytes. If *start* is past the end of the file, the
+            returned bytes are empty.
+        """
+        headers = {}
+        if start is not None or end is not None:
+            last = "" if end is None else end - 1
+            headers["Range"] = f"bytes={start or 0}-{last}"
+
+        def _read():
+            try:
+                with self.open(url, headers=headers) as response:
+                    data = response.read()
+                    if headers and response.status != 206:
+                        data = data[start:end]
+            except urllib.error.HTTPError as error:
+                if error.code != 416:
+                    raise
+                data = b""
+            return data
+
+        return self._retry(_read)
+
+    def download_ranges(self, url, filename, ranges, max_gap=2**16, reporthook=None):
+        """Download byte ranges of a url into a single file.
+
+        Ranges that are separated by at most *max_gap* bytes are fetched
+        with a single request, but only the requested bytes are written.
+
+        Parameters
+        ----------
+        url : str
+            The url to download.
+        filename : str or path-like
+            The file to write the downloaded data to.
+        ranges : iterable of tuple of int
+            The ``(start, end)`` byte ranges to download. An *end* of
+            ``None`` means the end of the file.
+        max_gap : int, optional
+            Largest gap, in bytes, between two ranges that are fetched with
+            one request.
+        reporthook : callable, optional
+            A function called as ``reporthook(blocknum, blocksize, totalsize)``
+            as data are downloaded.
+
+        Returns
+        -------
+        pathlib.Path
+            Path to the downloaded file.
+        """
+        filepath = pathlib.Path(filename)
+        partfile = part_file(filepath)
+
+        spans = coalesce_ranges(ranges, max_gap=max_gap)
+        if any(end is None for _, end, _ in spans):
+            total = -1
+        else:
+            total = sum(end - start for start, end, _ in spans)
+
+        nbytes = 0
+
+        def _progress(size):
+            nonlocal nbytes
+            nbytes += size
+            reporthook(nbytes, 1, total)
+
+        if reporthook:
+            reporthook(0, 1, total)
+        with open(partfile, "wb") as fp:
+            for start, end, pieces in spans:
+                self._retry(
+                    self._download_span,
+                    url,
+                    fp,
+                    fp.tell(),
+                    start,
+                    end,
+                    pieces,
+                    progress=_progress if reporthook else None,
+                )
+        os.replace(partfile, filepath)
+
+        return filepath
+
+    def _download_span(self, url, fp, position, start, end, pieces, progress=None):
+        fp.seek(position)
+        fp.truncate()
+
+        last = "" if end is None else end - 1
+        with self.open(url, headers={"Range": f"bytes={start}-{last}"}) as response:
+            if response.status != 206:
+                raise WaveWatch3Error(f"{url}: server does not support range requests")
+            offset = start
+            for piece_start, piece_end in pieces:
+                _copy(response, None, piece_start - offset, self._blocksize, progress)
+                nbytes = None if piece_end is None else piece_end - piece_start
+                _copy(response, fp, nbytes, self._blocksize, progress)
+                offset = piece_end
+
+    def _retry(self, func, *args, **kwds):
+        for attempt in itertools.count():
+            try:
+                return func(*args, **kwds)
+            except Exception as error:
+                if attempt >= self._retries or not _is_retryable(error):
+                    raise
+                time.sleep(min(self._max_backoff, self._backoff * 2**attempt))
+
+
+class UrllibEngine(_Engine):
+    """Download files with :func:`urllib.request.urlopen`.
+
+    Every file is downloaded over a new connection.
+    """
+
+    def download(
+        self,
+        url,
+        filename,
+        reporthook=None,
+        decompress=False,
+        revalidate=False,
+        validators=None,
+    ):
+        """Download a url to a file.
+
+        Parameters
+        ----------
+        url : str
+            The url to download.
+        filename : str or path-like
+            The file to write the downloaded data to.
+        reporthook : callable, optional
+            A function called as ``reporthook(blocknum, blocksize, totalsize)``
+            as data are downloaded.
+        decompress : bool, optional
+            If ``True``, the remote file is gzipped and is decompressed as it
+            is downloaded.
+        revalidate : bool, optional
+            If ``True`` and *filename* already exists (or *validators* are
+            given), send a conditional request and only download the file
+            if it has changed on the server, in which case the file is read
+            from the response to that same request.
+        validators : dict, optional
+            Validators (see :func:`read_validators`) with which to
+            revalidate the file, in place of those saved next to
+            *filename*.
+
+        Returns
+        -------
+        pathlib.Path
+            Path to the downloaded file.
+        """
+        filepath = pathlib.Path(filename)
+        partfile = part_file(filepath)
+
+        headers = _conditional_headers(filepath, url, validators) if revalidate else {}
+        try:
+            with self.open(url, headers=headers) as response, (
+                _GunzipWriter if decompress else _FileWriter
+            )(partfile) as writer:
+                writer.restart()
+                total = int(response.getheader("Content-Length", -1))
+                blocknum = 0
+                if reporthook:
+                    reporthook(blocknum, self._blocksize, total)
+                while block := response.read(self._blocksize):
+                    writer.write(block)
+                    blocknum += 1
+                    if reporthook:
+                        reporthook(blocknum, self._blocksize, total)
+                if total >= 0 and writer.offset < total:
+                    raise urllib.error.ContentTooShortError(
+                        f"retrieval incomplete: got only {writer.offset} out of"
+                        f" {total} bytes",
+                        None,
+                    )
+                validators = _validators(response.headers)
+        except urllib.error.HTTPError as error:
+            if error.code == 304:
+                return filepath
+            raise
+        os.replace(partfile, filepath)
+        write_validators(filepath, url, validators)
+
+        return filepath
+
+    @contextmanager
+    def open(self, url, headers=None):
+        """Send a GET request.
+
+        Parameters
+        ----------
+        url : str
+            The url to request.
+        headers : dict, optional
+            Additional request headers.
+
+        Yields
+        ------
+        http.client.HTTPResponse
+            The response.
+        """
+        request = urllib.request.Request(url, headers=headers or {})
+        with urllib.request.urlopen(request) as response:
+            yield response
+
+    def close(self):
+        """Release any resources held by the engine."""
+        pass
+
+
+class HttpEngine(_Engine):
+    """Download files over HTTP(S), reusing connections to each host.
+
+    Connections are kept alive between requests and are shared by all of
+    the threads that use the engine, so downloading many files from the
+    same host only pays for the TCP and TLS handshakes once per connection.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of idle connections to keep open for each host.
+    timeout : float, optional
+        Socket timeout, in seconds.
+    blocksize : int, optional
+        Number of bytes to read from a response at a time.
+    max_redirects : int, optional
+        Maximum number of redirects to follow for a single request.
+    retries : int, optional
+        Number of times to retry a failed download.
+    backoff : float, optional
+        Time, in seconds, to wait before the first retry. The wait time is
+        doubled for each subsequent retry.
+    max_backoff : float, optional
+        Maximum time, in seconds, to wait between retries.
+    """
+
+    def __init__(
+        self,
+        maxsize=8,
+        timeout=60.0,
+        blocksize=2**16,
+        max_redirects=5,
+        retries=5,
+        backoff=0.5,
+        max_backoff=30.0,
+    ):
+        self._maxsize = maxsize
+        self._timeout = timeout
+        self._blocksize = blocksize
+        self._max_redirects = max_redirects
+        self._retries = retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._headers = {
+            "User-Agent": f"bmi-wavewatch3/{__version__}",
+            "Accept-Encoding": "identity",
+        }
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    @property
+    def blocksize(self):
+        return self._blocksize
+
+    def download(
+        self,
+        url,
+        filename,
+        reporthook=None,
+        decompress=False,
+        revalidate=False,
+        validators=None,
+    ):
+        """Download a url to a file.
+
+        Data are written to a temporary *.part* file that is moved into place
+        only once the download is complete. If the transfer fails, the download
+        is retried, resuming from the end of the *.part* file, after waiting
+        a (capped) exponentially increasing amount of time.
+
+        The validators of the response that a *.part* file is written from
+        are saved next to it. A *.part* file is resumed, whether by a retry
+        or by a later download, with an ``If-Range`` request so that, if the
+        file has since changed on the server, it is downloaded again from the
+        start rather than having new bytes appended to old ones. A *.part*
+        file left by an earlier download without validators is discarded.
+
+        The ``ETag`` and ``Last-Modified`` headers of the response are saved
+        next to the downloaded file (see :func:`validators_file`) so that the
+        file can later be revalidated with a conditional request.
+
+        Parameters
+        ----------
+        url : str
+            The url to download.
+        filename : str or path-like
+            The file to write the downloaded data to.
+        reporthook : callable, optional
+            A function called as ``reporthook(blocknum, blocksize, totalsize)``
+            as data are downloaded.
+        decompress : bool, optional
+            If ``True``, the remote file is gzipped and is decompressed, a
+            block at a time, as it is downloaded.
+        revalidate : bool, optional
+            If ``True`` and *filename* already exists (or *validators* are
+            given), send a conditional request and only download the file
+            if it has changed on the server.
+        validators : dict, optional
+            Validators (see :func:`read_validators`) with which to
+            revalidate the file, in place of those saved next to
+            *filename*.
+
+        Returns
+        -------
+        pathlib.Path
+            Path to the downloaded file.
+        """
+        scheme = urllib.parse.urlsplit(url).scheme
+        if scheme not in ("http", "https"):
+            raise urllib.error.URLError(f"unknown url type: {scheme!r}")
+
+        filepath = pathlib.Path(filename)
+        partfile = part_file(filepath)
+
+        headers = _conditional_headers(filepath, url, validators) if revalidate else {}
+
+        with (_GunzipWriter if decompress else _FileWriter)(partfile) as writer:
+            if headers:
+                writer.restart()
+            for attempt in itertools.count():
+                try:
+                    validators = self._download_part(
+                        url, writer, reporthook=reporthook, headers=headers
+                    )
+                except Exception as error:
+                    if attempt >= self._retries or not _is_retryable(error):
+                        raise
+                    time.sleep(min(self._max_backoff, self._backoff * 2**attempt))
+                else:
+                    break
+
+        if validators is None:
+            partfile.unlink()
+        else:
+            os.replace(partfile, filepath)
+            write_validators(filepath, url, validators)
+        validators_file(partfile).unlink(missing_ok=True)
+        return filepath
+
+    def _download_part(self, url, writer, reporthook=None, headers=None):
+        headers = dict(headers or {})
+        if writer.offset:
+            resumed = read_validators(writer.path, url)
+            if if_range := _if_range(resumed):
+                headers["If-Range"] = if_range
+            elif writer.inherited:
+                writer.restart()
+        offset = writer.offset
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+        try:
+            with self.open(url, headers=headers) as response:
+                if response.status == 206:
+                    start, total = _parse_content_range(
+                        response.getheader("Content-Range")
+                    )
+                    if start != offset:
+                        writer.restart()
+                        raise urllib.error.URLError(
+                            f"server resumed at byte {start}, not {offset}"
+                        )
+                elif response.status == 304:
+                    return None
+                else:
+                    writer.restart()
+                    write_validators(writer.path, url, _validators(response.headers))
+                    total = int(response.getheader("Content-Length", -1))
+
+                blocknum = writer.offset // self._blocksize
+                if reporthook:
+                    reporthook(blocknum, self._blocksize, total)
+                while block := response.read(self._blocksize):
+                    writer.write(block)
+                    blocknum += 1
+                    if reporthook:
+                        reporthook(blocknum, self._blocksize, total)
+        except urllib.error.HTTPError as error:
+            if error.code != 416:
+                raise
+            _, total = _parse_content_range(error.headers.get("Content-Range"))
+            if total != offset:
+                writer.restart()
+                raise urllib.error.URLError(f"unable to resume download at {offset}")
+            return read_validators(writer.path, url)
+
+        if total >= 0 and writer.offset < total:
+            raise urllib.error.ContentTooShortError(
+                f"retrieval incomplete: got only {writer.offset} out of {total} bytes",
+                None,
+            )
+        return _validators(response.headers)
+
+    @contextmanager
+    def open(self, url, headers=None):
+        """Send a GET request, following redirects.
+
+        Parameters
+        ----------
+        url : str
+            The url to request.
+        headers : dict, optional
+            Additional request headers.
+
+        Yields
+        ------
+        http.client.HTTPResponse
+            The response. Its connection is returned to the pool once
+            the context exits.
+
+        Raises
+        ------
+        urllib.error.HTTPError
+            If the server responds with an error status.
+        urllib.error.URLError
+            If the server could not be reached.
+        """
+        for _ in range(self._max_redirects + 1):
+            key, conn, response = self._request(url, headers=headers)
+            if response.status not in _REDIRECT_CODES:
+                break
+            location = response.getheader("Location")
+            response.read()
+            self._release(key, conn, response)
+            url = urllib.parse.urljoin(url, location)
+        else:
+            raise urllib.error.HTTPError(
+                url, response.status, "too many redirects", response.headers, None
+            )
+
+        try:
+            if response.status >= 400:
+                response.read()
+                raise urllib.error.HTTPError(
+                    url, response.status, response.reason, response.headers, None
+                )
+            yield response
+        finally:
+            self._release(key, conn, response)
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            connections = [conn for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+        for conn in connections:
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _request(self, url, headers=None):
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+
+        if parts.scheme == "http" and _proxy_for(parts.scheme, parts.hostname):
+            target = url
+
+        headers = {**self._headers, **(headers or {})}
+        for attempt in range(2):
+            conn = self._acquire(key)
+            reused = conn.sock is not None
+            try:
+                conn.request("GET", target, headers=headers)
+                response = conn.getresponse()
+            except _STALE_CONNECTION_ERRORS as error:
+                conn.close()
+                if not reused or attempt:
+                    raise urllib.error.URLError(error)
+            except OSError as error:
+                conn.close()
+                raise urllib.error.URLError(error)
+            else:
+                return key, conn, response
+
+    def _acquire(self, key):
+        with self._lock:
+            if self._idle[key]:
+                return self._idle[key].pop()
+        return self._connect(*key)
+
+    def _release(self, key, conn, response):
+        if not response.isclosed() or response.will_close:
+            conn.close()
+            return
+        with self._lock:
+            if len(self._idle[key]) < self._maxsize:
+                self._idle[key].append(conn)
+                return
+        conn.close()
+
+    def _connect(self, scheme, netloc):
+        host = urllib.parse.urlsplit(f"//{netloc}").hostname
+        proxy = _proxy_for(scheme, host)
+
+        if scheme == "https":
+            if proxy:
+                conn = http.client.HTTPSConnection(
+                    proxy.hostname,
+                    proxy.port,
+                    timeout=self._timeout,
+                    context=self._ssl_context,
+                )
+                conn.set_tunnel(netloc)
+            else:
+                conn = http.client.HTTPSConnection(
+                    netloc, timeout=self._timeout, context=self._ssl_context
+                )
+        elif scheme == "http":
+            if proxy:
+                conn = http.client.HTTPConnection(
+                    proxy.hostname, proxy.port, timeout=self._timeout
+                )
+            else:
+                conn = http.client.HTTPConnection(netloc, timeout=self._timeout)
+        else:
+            raise urllib.error.URLError(f"unknown url type: {scheme!r}")
+        return conn
+
+
+class _FileWriter:
+    """Append downloaded blocks to a (possibly partially downloaded) file.
+
+    *inherited* is ``True`` while the file holds bytes that were written
+    before the writer was created (by an earlier download).
+    """
+
+    def __init__(self, filepath):
+        self.path = pathlib.Path(filepath)
+        self._fp = open(filepath, "ab")
+        self.offset = self._fp.tell()
+        self.inherited = self.offset > 0
+
+    def write(self, block):
+        self._fp.write(block)
+        self.offset += len(block)
+
+    def restart(self):
+        self._fp.seek(0)
+        self._fp.truncate()
+        self.offset = 0
+        self.inherited = False
+
+    def close(self):
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _GunzipWriter(_FileWriter):
+    """Decompress gzipped blocks as they arrive and write them to a file.
+
+    The decompressor's state lives in memory, so a download can be resumed
+    by the same writer but a *.part* file left by an earlier one can not.
+    """
+
+    def __init__(self, filepath):
+        super().__init__(filepath)
+        self.restart()
+
+    def write(self, block):
+        self.offset += len(block)
+        while block:
+            if self._decompressor.eof:
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            self._fp.write(self._decompressor.decompress(block))
+            block = self._decompressor.unused_data
+
+    def restart(self):
+        super().restart()
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def __exit__(self, exc_type, *args):
+        try:
+            if exc_type is None:
+                self._fp.write(self._decompressor.flush())
+                if not self._decompressor.eof:
+                    raise EOFError("compressed file ended before the end-of-stream")
+        finally:
+            self.close()
+
+
+def coalesce_ranges(ranges, max_gap=0):
+    """Merge byte ranges that are separated by small gaps.
+
+    Parameters
+    ----------
+    ranges : iterable of tuple of int
+        The ``(start, end)`` byte ranges, where an *end* of ``None``
+        means the end of the file.
+    max_gap : int, optional
+        Largest gap, in bytes, between two ranges that are merged.
+
+    Returns
+    -------
+    list of tuple
+        The merged ranges as ``(start, end, pieces)`` where *pieces* lists
+        the requested ranges within the span, with contiguous ranges joined.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.engine import coalesce_ranges
+    >>> coalesce_ranges([(10, 20), (0, 10), (25, 30), (100, None)], max_gap=5)
+    [(0, 30, [(0, 20), (25, 30)]), (100, None, [(100, None)])]
+    """
+    spans = []
+    for start, end in sorted(ranges, key=lambda r: r[0]):
+        if spans and spans[-1][1] is not None and start - spans[-1][1] <= max_gap:
+            span_start, span_end, pieces = spans[-1]
+            if start == pieces[-1][1]:
+                pieces[-1] = (pieces[-1][0], end)
+            else:
+                pieces.append((start, end))
+            spans[-1] = (span_start, end, pieces)
+        else:
+            spans.append((start, end, [(start, end)]))
+    return spans
+
+
+def _copy(src, dst, nbytes, blocksize, progress=None):
+    """Copy (or, if *dst* is ``None``, skip) *nbytes* bytes from a response.
+
+    If provided, *progress* is called with the size of each block read.
+    """
+    while nbytes is None or nbytes > 0:
+        size = blocksize if nbytes is None else min(blocksize, nbytes)
+        block = src.read(size)
+        if not block:
+            if nbytes:
+                raise urllib.error.ContentTooShortError(
+                    "retrieval incomplete: response ended early", None
+                )
+            break
+        if dst is not None:
+            dst.write(block)
+        if progress is not None:
+            progress(len(block))
+        if nbytes is not None:
+            nbytes -= len(block)
+
+
+def part_file(filepath):
+    """Path to the file that holds a partially downloaded file.
+
+    Parameters
+    ----------
+    filepath : str or path-like
+        Path to the completely downloaded file.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the partially downloaded file.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.engine import part_file
+    >>> part_file("data/multi_1.glo_30m.hs.201005.grb2").as_posix()
+    'data/multi_1.glo_30m.hs.201005.grb2.part'
+    """
+    filepath = pathlib.Path(filepath)
+    return filepath.with_name(filepath.name + ".part")
+
+
+def validators_file(filepath):
+    """Path to the file that holds the cache validators of a downloaded file.
+
+    Parameters
+    ----------
+    filepath : str or path-like
+        Path to the downloaded file.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the file of validators.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.engine import validators_file
+    >>> validators_file("data/multi_1.glo_30m.hs.201005.grb2").as_posix()
+    'data/multi_1.glo_30m.hs.201005.grb2.validators.json'
+    """
+    filepath = pathlib.Path(filepath)
+    return filepath.with_name(filepath.name + ".validators.json")
+
+
+def read_validators(filepath, url):
+    """Read the cache validators of a file downloaded from a url.
+
+    Parameters
+    ----------
+    filepath : str or path-like
+        Path to the downloaded file.
+    url : str
+        The url the file was downloaded from.
+
+    Returns
+    -------
+    dict
+        The ``ETag`` and ``Last-Modified`` values of the last response, if
+        available, keyed by ``"etag"`` and ``"last_modified"``.
+    """
+    try:
+        with open(validators_file(filepath)) as fp:
+            validators = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+    if validators.pop("url", None) != url:
+        return {}
+    return validators
+
+
+def write_validators(filepath, url, validators):
+    """Save the cache validators of a file downloaded from a url.
+
+    Parameters
+    ----------
+    filepath : str or path-like
+        Path to the downloaded file.
+    url : str
+        The url the file was downloaded from.
+    validators : dict
+        The validators to save. If empty, remove any saved validators.
+    """
+    sidecar = validators_file(filepath)
+    if not validators:
+        sidecar.unlink(missing_ok=True)
+        return
+
+    with open(part_file(sidecar), "w") as fp:
+        json.dump({"url": url, **validators}, fp)
+    os.replace(part_file(sidecar), sidecar)
+
+
+def _validators(headers):
+    validators = {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+    return {key: value for key, value in validators.items() if value}
+
+
+def _if_range(validators):
+    """Value of an ``If-Range`` header from saved validators.
+
+    Weak entity tags can not be used with ``If-Range`` so, for those, the
+    modification time is used instead, if there is one.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.engine import _if_range
+    >>> _if_range({"etag": '"abc"', "last_modified": "Sat, 01 May 2010 00:00:00 GMT"})
+    '"abc"'
+    >>> _if_range({"etag": 'W/"abc"'}) is None
+    True
+    """
+    etag = validators.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return validators.get("last_modified")
+
+
+def _conditional_headers(filepath, url, validators=None):
+    if validators is None:
+        if not pathlib.Path(filepath).is_file():
+            return {}
+        validators = read_validators(filepath, url)
+
+    headers = {}
+    if "etag" in validators:
+        headers["If-None-Match"] = validators["etag"]
+    if "last_modified" in validators:
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _is_retryable(error):
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in _RETRYABLE_CODES
+    return isinstance(
+        error,
+        (
+            urllib.error.URLError,
+            http.client.HTTPException,
+            ConnectionError,
+            TimeoutError,
+            socket.timeout,
+        ),
+    )
+
+
+def _parse_content_range(content_range):
+    """Parse the start byte and total size from a Content-Range header.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.engine import _parse_content_range
+    >>> _parse_content_range("bytes 100-199/1000")
+    (100, 1000)
+    >>> _parse_content_range("bytes */1000")
+    (-1, 1000)
+    >>> _parse_content_range("bytes 100-199/*")
+    (100, -1)
+    """
+    try:
+        _, value = content_range.split()
+        byte_range, total = value.split("/")
+    except (AttributeError, ValueError):
+        raise urllib.error.URLError(f"{content_range!r}: invalid Content-Range")
+    start = -1 if byte_range == "*" else int(byte_range.split("-")[0])
+    return start, -1 if total == "*" else int(total)
+
+
+def _proxy_for(scheme, host):
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    return urllib.parse.urlsplit(proxy if "//" in proxy else f"//{proxy}")
+
+
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Get the default download engine for this process.
+
+    Returns
+    -------
+    HttpEngine or UrllibEngine
+        The engine used when one is not given explicitly.
+    """
+    global _engine, _engine_pid
+
+    with _engine_lock:
+        if _engine is None or _engine_pid != os.getpid():
+            _engine, _engine_pid = HttpEngine(), os.getpid()
+        return _engine
+
+
+def set_engine(engine):
+    """Set the default download engine for this process.
+
+    Parameters
+    ----------
+    engine : HttpEngine or UrllibEngine
+        An object with a ``download(url, filename, reporthook=None)`` method.
+
+    Returns
+    -------
+    HttpEngine or UrllibEngine
+        The previous default engine.
+    """
+    global _engine, _engine_pid
+
+    with _engine_lock:
+        prev, _engine, _engine_pid = _engine, engine, os.getpid()
+    return prev
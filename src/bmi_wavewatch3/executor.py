@@ -0,0 +1,169 @@
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from .errors import ChoiceError, WaveWatch3Error
+
+BACKENDS = ("thread", "process", "none")
+
+
+class Executor:
+    """Run calls in a pool of workers that is reused until it is closed.
+
+    The pool is created when it is first used and is kept for all
+    subsequent calls, so its workers are started just once.
+
+    Parameters
+    ----------
+    backend : {"thread", "process", "none"}, optional
+        How calls are run: in a pool of threads, in a pool of processes or,
+        one after the other, in the calling thread. Functions (and their
+        arguments) run with the *process* backend must be picklable.
+    max_workers : int, optional
+        Number of workers in the pool. The default depends on the backend
+        (see :mod:`concurrent.futures`).
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.executor import Executor
+    >>> with Executor("none") as executor:
+    ...     executor.map(abs, [-1, 2, -3])
+    [1, 2, 3]
+    """
+
+    def __init__(self, backend="thread", max_workers=None):
+        if backend not in BACKENDS:
+            raise ChoiceError(backend, BACKENDS)
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("max_workers must be positive")
+        self._backend = backend
+        self._max_workers = max_workers
+        self._pool = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        """How calls are run."""
+        return self._backend
+
+    @property
+    def max_workers(self):
+        """Number of workers in the pool."""
+        return self._max_workers
+
+    @property
+    def closed(self):
+        """``True`` if the executor has been closed."""
+        return self._closed
+
+    def submit(self, func, *args, **kwds):
+        """Schedule a call.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            The future result of the call. With the *none* backend, the
+            call has already been made.
+        """
+        if self._backend == "none":
+            if self._closed:
+                raise WaveWatch3Error("executor is closed")
+            future = Future()
+            try:
+                future.set_result(func(*args, **kwds))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+        return self._get_pool().submit(func, *args, **kwds)
+
+    def map(self, func, items):
+        """Call a function on each item.
+
+        Returns
+        -------
+        list
+            The values returned by *func*, in the same order as *items*.
+        """
+        if self._backend == "none":
+            if self._closed:
+                raise WaveWatch3Error("executor is closed")
+            return [func(item) for item in items]
+        return list(self._get_pool().map(func, items))
+
+    def close(self, wait=True):
+        """Shut down the pool of workers.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            If ``True``, wait for calls that are underway to finish. Calls
+            that have not yet started are cancelled.
+        """
+        with self._lock:
+            pool, self._pool, self._closed = self._pool, None, True
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return f"Executor({self._backend!r}, max_workers={self._max_workers!r})"
+
+    def _get_pool(self):
+        with self._lock:
+            if self._closed:
+                raise WaveWatch3Error("executor is closed")
+            if self._pool is None:
+                Pool = (
+                    ThreadPoolExecutor
+                    if self._backend == "thread"
+                    else ProcessPoolExecutor
+                )
+                self._pool = Pool(max_workers=self._max_workers)
+            return self._pool
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Get the default executor for this process.
+
+    Returns
+    -------
+    Executor
+        The executor used when one is not given explicitly.
+    """
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        if _executor is None or _executor.closed or _executor_pid != os.getpid():
+            _executor, _executor_pid = Executor(), os.getpid()
+        return _executor
+
+
+def set_executor(executor):
+    """Set the default executor for this process.
+
+    Parameters
+    ----------
+    executor : Executor
+        The executor to use when one is not given explicitly.
+
+    Returns
+    -------
+    Executor
+        The previous default executor.
+    """
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        prev, _executor, _executor_pid = _executor, executor, os.getpid()
+    return prev
@@ -0,0 +1,243 @@
+import os
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import xarray as xr
+
+from .executor import get_executor
+from .lock import SHARED_LOCKS, FileLock, lock_path
+from .storage import decompress, is_compressed, is_current, plain_name, scratch_path
+
+
+def index_template(filepath, index_dir=None):
+    """Template that *cfgrib* uses to name the index file of a GRIB file.
+
+    Parameters
+    ----------
+    filepath : str or path-like
+        Path to a GRIB file.
+    index_dir : str or path-like, optional
+        Folder in which to keep the index file. If not provided, the index
+        file is kept next to the GRIB file, where *cfgrib* puts it by
+        default.
+
+    Returns
+    -------
+    str
+        The template, which *cfgrib* fills in with a hash of the keys it
+        indexes.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.gribindex import index_template
+    >>> index_template("/data/multi_1.glo_30m.hs.201005.grb2")
+    '{path}.{short_hash}.idx'
+    >>> index_template(
+    ...     "/data/multi_1.glo_30m.hs.201005.grb2", index_dir="/index"
+    ... ).replace(os.sep, "/")
+    '/index/multi_1.glo_30m.hs.201005.grb2.{short_hash}.idx'
+    """
+    if index_dir is None:
+        return "{path}.{short_hash}.idx"
+    name = plain_name(pathlib.Path(filepath).name).replace("{", "{{").replace("}", "}}")
+    return os.path.join(
+        os.path.abspath(os.path.expanduser(index_dir)), f"{name}.{{short_hash}}.idx"
+    )
+
+
+def build_index(filepath, index_dir=None):
+    """Scan a GRIB file and write its *cfgrib* index.
+
+    If an up-to-date index already exists, it is read rather than
+    written again. The index of a compressed file is built from a
+    decompressed copy (see :func:`~bmi_wavewatch3.storage.scratch_path`),
+    which is removed once the index is written, and, unless *index_dir*
+    is given, is kept next to the compressed file.
+
+    Parameters
+    ----------
+    filepath : str or path-like
+        Path to a GRIB file.
+    index_dir : str or path-like, optional
+        Folder in which to write the index file.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the GRIB file.
+    """
+    if index_dir is not None:
+        pathlib.Path(index_dir).expanduser().mkdir(parents=True, exist_ok=True)
+    filepath = pathlib.Path(filepath)
+    path, indexpath, reader = _readable(filepath, index_dir)
+    try:
+        xr.open_dataset(path, engine="cfgrib", indexpath=indexpath).close()
+    finally:
+        _done_reading(path, reader)
+    return filepath
+
+
+def build_indexes(paths, index_dir=None, executor=None):
+    """Write the *cfgrib* indexes of GRIB files in parallel.
+
+    Parameters
+    ----------
+    paths : iterable of path-like
+        Paths to GRIB files.
+    index_dir : str or path-like, optional
+        Folder in which to write the index files. If not provided, each is
+        written next to its GRIB file.
+    executor : Executor, optional
+        Executor that scans the files. If not provided, use the default
+        executor (see :func:`~bmi_wavewatch3.executor.get_executor`).
+
+    Returns
+    -------
+    list of pathlib.Path
+        Paths to the GRIB files.
+    """
+    if executor is None:
+        executor = get_executor()
+    return executor.map(partial(build_index, index_dir=index_dir), list(paths))
+
+
+def grib_chunks(chunks=None):
+    """Chunk sizes with which to read GRIB data with *dask*.
+
+    Parameters
+    ----------
+    chunks : str, int or dict, optional
+        Either ``"messages"``, to read each GRIB message (a single step of
+        a single variable) as its own chunk, or chunk sizes as accepted by
+        :func:`xarray.open_dataset` (e.g. ``"auto"`` or
+        ``{"latitude": 90, "longitude": 180}`` to read spatial tiles of
+        each message). If not provided, each variable of each file is
+        read as a single chunk.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.gribindex import grib_chunks
+    >>> grib_chunks()
+    {}
+    >>> grib_chunks("messages")
+    {'step': 1}
+    >>> grib_chunks({"latitude": 90, "longitude": 180})
+    {'step': 1, 'latitude': 90, 'longitude': 180}
+    """
+    if chunks is None:
+        return {}
+    elif chunks == "messages":
+        return {"step": 1}
+    elif isinstance(chunks, dict):
+        return {"step": 1, **chunks}
+    return chunks
+
+
+def open_grib(paths, index_dir=None, chunks=None, parallel=False):
+    """Open GRIB files as a single dataset.
+
+    Parameters
+    ----------
+    paths : iterable of path-like
+        Paths to GRIB files.
+    index_dir : str or path-like, optional
+        Folder that holds the *cfgrib* index files. If not provided, the
+        index files are kept next to the GRIB files.
+    chunks : str, int or dict, optional
+        How to chunk the data (see :func:`grib_chunks`).
+    parallel : bool, optional
+        If ``True``, open (and index) the files in parallel.
+
+    Returns
+    -------
+    xarray.Dataset
+        The data of all the files, read lazily.
+
+    Notes
+    -----
+    *cfgrib* reads GRIB messages from files on disk so compressed files
+    are read from decompressed copies, kept in a hidden folder next to the
+    index files. A copy is shared by every process that reads the file and
+    is removed once the last of them closes its dataset. A copy always has
+    the same path, and the modification time of the file it was made from,
+    so that the saved index of the copy is valid each time the file is
+    reopened. Where shared locks are not available (on Windows), copies
+    are kept until they are removed by ``ww3 clean`` or by eviction.
+    """
+    paths = [pathlib.Path(path) for path in paths]
+    chunks = grib_chunks(chunks)
+    compressed = any(is_compressed(path) for path in paths)
+    if index_dir is None and not compressed:
+        return xr.open_mfdataset(
+            paths, engine="cfgrib", chunks=chunks, parallel=parallel
+        )
+
+    if index_dir is not None:
+        pathlib.Path(index_dir).expanduser().mkdir(parents=True, exist_ok=True)
+    datasets, readers = [], []
+    try:
+        with ThreadPoolExecutor(
+            max_workers=max(len(paths), 1) if parallel else 1
+        ) as pool:
+            for ds, reader in pool.map(
+                partial(_open_one, index_dir=index_dir, chunks=chunks), paths
+            ):
+                datasets.append(ds)
+                readers.append(reader)
+        combined = xr.combine_by_coords(datasets, combine_attrs="override")
+    except Exception:
+        _close_all(datasets, readers)
+        raise
+    combined.set_close(partial(_close_all, datasets, readers))
+    return combined
+
+
+def _open_one(filepath, index_dir=None, chunks=None):
+    path, indexpath, reader = _readable(filepath, index_dir)
+    try:
+        ds = xr.open_dataset(path, engine="cfgrib", indexpath=indexpath, chunks=chunks)
+    except Exception:
+        _done_reading(path, reader)
+        raise
+    return ds, (path, reader)
+
+
+def _readable(filepath, index_dir):
+    """Path to a file that *cfgrib* can read, its index template and reader lock."""
+    if not is_compressed(filepath):
+        return filepath, index_template(filepath, index_dir), None
+    copy = scratch_path(filepath, index_dir)
+    with FileLock(lock_path(copy)):
+        if not is_current(copy, filepath):
+            decompress(filepath, copy)
+        reader = (
+            FileLock(_readers_path(copy), shared=True).acquire()
+            if SHARED_LOCKS
+            else None
+        )
+    return copy, index_template(filepath, index_dir or filepath.parent), reader
+
+
+def _done_reading(copy, reader):
+    """Stop reading a decompressed copy, removing it if no one else is."""
+    if reader is None:
+        return
+    with FileLock(lock_path(copy)):
+        reader.release()
+        try:
+            with FileLock(_readers_path(copy), timeout=0):
+                copy.unlink(missing_ok=True)
+        except TimeoutError:
+            pass
+
+
+def _readers_path(copy):
+    return lock_path(copy.with_name(copy.name + ".readers"))
+
+
+def _close_all(datasets, readers=()):
+    for ds in datasets:
+        ds.close()
+    for copy, reader in readers:
+        _done_reading(copy, reader)
@@ -0,0 +1,344 @@
+import datetime
+import json
+import os
+import pathlib
+import re
+import struct
+import urllib
+import urllib.error
+from collections import namedtuple
+
+from .engine import part_file
+from .errors import WaveWatch3Error
+
+GribMessage = namedtuple(
+    "GribMessage", ["offset", "length", "reference_time", "step", "variable"]
+)
+GribMessage.__doc__ = """A message within a GRIB file.
+
+The *length* of a message is ``None`` if it is the last message of a file
+whose size is not known. *step* is the forecast time, in hours, from the
+message's *reference_time*. *variable* is the wgrib2 name of the message's
+parameter (e.g. ``"HTSGW"``).
+"""
+
+WGRIB2_NAMES = {
+    "dirpw": "DIRPW",
+    "perpw": "PERPW",
+    "swh": "HTSGW",
+    "swdir": "SWDIR",
+    "swell": "SWELL",
+    "swper": "SWPER",
+    "u": "UGRD",
+    "v": "VGRD",
+    "wdir": "WDIR",
+    "ws": "WIND",
+}
+
+_GRIB2_PARAMETERS = {
+    (0, 2, 0): "WDIR",
+    (0, 2, 1): "WIND",
+    (0, 2, 2): "UGRD",
+    (0, 2, 3): "VGRD",
+    (10, 0, 3): "HTSGW",
+    (10, 0, 4): "WVDIR",
+    (10, 0, 5): "WVHGT",
+    (10, 0, 6): "WVPER",
+    (10, 0, 7): "SWDIR",
+    (10, 0, 8): "SWELL",
+    (10, 0, 9): "SWPER",
+    (10, 0, 10): "DIRPW",
+    (10, 0, 11): "PERPW",
+}
+_HOURS_PER_TIME_UNIT = {0: 1 / 60, 1: 1, 2: 24, 10: 3, 11: 6, 12: 12, 13: 1 / 3600}
+_SCAN_BYTES = 512
+
+
+def parse_idx(text, size=None):
+    """Parse a wgrib2-style inventory.
+
+    Parameters
+    ----------
+    text : str
+        The contents of an inventory (*.idx*) file.
+    size : int, optional
+        Size of the GRIB file, in bytes, used to find the length of the
+        last message.
+
+    Returns
+    -------
+    list of GribMessage
+        The messages of the inventory.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.inventory import parse_idx
+    >>> messages = parse_idx(
+    ...     "1:0:d=2010050100:HTSGW:surface:anl:\\n"
+    ...     "2:1200:d=2010050100:HTSGW:surface:3 hour fcst:\\n"
+    ... )
+    >>> [(m.offset, m.length, m.step, m.variable) for m in messages]
+    [(0, 1200, 0, 'HTSGW'), (1200, None, 3, 'HTSGW')]
+    """
+    entries = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            _, offset, date, variable, _, forecast = line.split(":")[:6]
+            reference_time = datetime.datetime.strptime(date, "d=%Y%m%d%H")
+        except ValueError:
+            raise WaveWatch3Error(f"{line!r}: unable to parse inventory line")
+        entries.append(
+            (int(offset), reference_time, _parse_forecast(forecast), variable)
+        )
+
+    offsets = sorted({entry[0] for entry in entries}) + [size]
+    next_offset = dict(zip(offsets[:-1], offsets[1:]))
+
+    return [
+        GribMessage(
+            offset,
+            None if next_offset[offset] is None else next_offset[offset] - offset,
+            reference_time,
+            step,
+            variable,
+        )
+        for offset, reference_time, step, variable in entries
+    ]
+
+
+def _parse_forecast(forecast):
+    """Parse the forecast time, in hours, from a wgrib2 inventory field.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.inventory import _parse_forecast
+    >>> _parse_forecast("anl"), _parse_forecast("9 hour fcst")
+    (0, 9)
+    >>> _parse_forecast("2 day fcst")
+    48
+    """
+    if forecast == "anl":
+        return 0
+    match = re.fullmatch(r"(\d+) (min|hour|day) fcst", forecast)
+    if not match:
+        raise WaveWatch3Error(f"{forecast!r}: unable to parse forecast time")
+    value, unit = int(match.group(1)), match.group(2)
+    return value * {"min": 1 / 60, "hour": 1, "day": 24}[unit]
+
+
+def scan_messages(read):
+    """Build an inventory by reading the header of each message of a GRIB file.
+
+    Parameters
+    ----------
+    read : callable
+        A function, ``read(start, end)``, that returns the bytes of the file
+        from *start* up to (but not including) *end*.
+
+    Returns
+    -------
+    list of GribMessage
+        The messages of the file.
+    """
+    messages = []
+    offset = 0
+    while True:
+        head = read(offset, offset + _SCAN_BYTES)
+        if len(head) < 16:
+            break
+        if head[:4] != b"GRIB" or head[7] != 2:
+            raise WaveWatch3Error(f"not a GRIB2 message at byte {offset}")
+        (length,) = struct.unpack(">Q", head[8:16])
+        messages.append(
+            _parse_message_header(
+                head, offset, length, lambda n: read(offset, offset + n)
+            )
+        )
+        offset += length
+    return messages
+
+
+def _parse_message_header(head, offset, length, read):
+    discipline = head[6]
+    reference_time, step, variable = None, None, None
+
+    pos = 16
+    while reference_time is None or variable is None:
+        if pos + 5 > len(head):
+            head = read(pos + _SCAN_BYTES)
+        if head[pos : pos + 4] == b"7777" or pos + 5 > len(head):
+            break
+        section_length, number = struct.unpack(">IB", head[pos : pos + 5])
+        if pos + min(section_length, 23) > len(head):
+            head = read(pos + section_length)
+        if number == 1:
+            year, month, day, hour, minute, second = struct.unpack(
+                ">HBBBBB", head[pos + 12 : pos + 19]
+            )
+            reference_time = datetime.datetime(year, month, day, hour, minute, second)
+        elif number == 4:
+            category, parameter = head[pos + 9], head[pos + 10]
+            unit, forecast_time = struct.unpack(">BI", head[pos + 17 : pos + 22])
+            step = forecast_time * _HOURS_PER_TIME_UNIT.get(unit, 1)
+            variable = _GRIB2_PARAMETERS.get(
+                (discipline, category, parameter),
+                f"var{discipline}_{category}_{parameter}",
+            )
+        pos += section_length
+
+    return GribMessage(offset, length, reference_time, step, variable)
+
+
+def read_inventory(url, engine, cache=None):
+    """Read the inventory of messages of a remote GRIB file.
+
+    The inventory is read from a wgrib2-style *.idx* file next to the GRIB
+    file on the server if there is one. Otherwise, it is built by reading
+    just the header of each message with a series of range requests.
+
+    Parameters
+    ----------
+    url : str
+        Url of a GRIB2 file.
+    engine : HttpEngine or UrllibEngine
+        The engine used to read from the server.
+    cache : str or path-like, optional
+        File in which to save the inventory. If the file exists, the
+        inventory is read from it rather than from the server.
+
+    Returns
+    -------
+    list of GribMessage
+        The messages of the file.
+    """
+    if cache is not None and pathlib.Path(cache).is_file():
+        with open(cache) as fp:
+            return [_message_from_json(message) for message in json.load(fp)]
+
+    try:
+        messages = parse_idx(engine.read(f"{url}.idx").decode())
+    except urllib.error.HTTPError as error:
+        if error.code not in (403, 404):
+            raise
+        messages = scan_messages(lambda start, end: engine.read(url, start, end))
+
+    if cache is not None:
+        with open(part_file(cache), "w") as fp:
+            json.dump([_message_to_json(message) for message in messages], fp)
+        os.replace(part_file(cache), cache)
+
+    return messages
+
+
+def inventory_file(filepath):
+    """Path to the file that caches the inventory of a GRIB file.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.inventory import inventory_file
+    >>> inventory_file("data/multi_1.glo_30m.hs.201005.grb2").as_posix()
+    'data/multi_1.glo_30m.hs.201005.grb2.inventory.json'
+    """
+    filepath = pathlib.Path(filepath)
+    return filepath.with_name(filepath.name + ".inventory.json")
+
+
+def select_messages(messages, time_range=None, variables=None):
+    """Select the messages valid within a time range for some variables.
+
+    Parameters
+    ----------
+    messages : iterable of GribMessage
+        Messages to select from.
+    time_range : tuple of str, optional
+        Start and end (inclusive) of the valid times to select, as
+        isoformatted strings. Either may be ``None``.
+    variables : iterable of str, optional
+        Names of the variables to select. Names are either data variable
+        names (e.g. ``"swh"``) or wgrib2 names (e.g. ``"HTSGW"``).
+
+    Returns
+    -------
+    list of GribMessage
+        The selected messages.
+
+    Examples
+    --------
+    >>> import datetime
+    >>> from bmi_wavewatch3.inventory import GribMessage, select_messages
+    >>> time = datetime.datetime(2010, 5, 1)
+    >>> messages = [
+    ...     GribMessage(0, 10, time, 0, "UGRD"),
+    ...     GribMessage(10, 10, time, 0, "VGRD"),
+    ...     GribMessage(20, 10, time, 3, "UGRD"),
+    ...     GribMessage(30, 10, time, 3, "VGRD"),
+    ... ]
+    >>> [m.offset for m in select_messages(messages, variables=["u"])]
+    [0, 20]
+    >>> [m.offset for m in select_messages(messages, ("2010-05-01T03", None))]
+    [20, 30]
+    """
+    start, end = time_range or (None, None)
+    start = datetime.datetime.fromisoformat(start) if start else None
+    end = datetime.datetime.fromisoformat(end) if end else None
+    if variables is not None:
+        variables = {WGRIB2_NAMES.get(name, name) for name in variables}
+
+    selected = []
+    for message in messages:
+        valid_time = message.reference_time + datetime.timedelta(hours=message.step)
+        if (
+            (start is None or valid_time >= start)
+            and (end is None or valid_time <= end)
+            and (variables is None or message.variable in variables)
+        ):
+            selected.append(message)
+    return selected
+
+
+def subset_file_part(name, time_range=None, variables=None):
+    """Name of the local file that holds a subset of a GRIB file.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.inventory import subset_file_part
+    >>> subset_file_part(
+    ...     "multi_1.glo_30m.wind.201005.grb2",
+    ...     time_range=("2010-05-01", "2010-05-03"),
+    ...     variables=["u"],
+    ... )
+    'multi_1.glo_30m.wind.201005.20100501T00-20100503T00.u.grb2'
+    """
+    path = pathlib.PurePath(name)
+
+    tags = []
+    if time_range is not None:
+        tags.append(
+            "-".join(
+                ""
+                if date is None
+                else datetime.datetime.fromisoformat(date).strftime("%Y%m%dT%H")
+                for date in time_range
+            )
+        )
+    if variables is not None:
+        tags.append("+".join(sorted(variables)))
+
+    return ".".join([path.stem] + tags) + path.suffix
+
+
+def _message_to_json(message):
+    return {**message._asdict(), "reference_time": message.reference_time.isoformat()}
+
+
+def _message_from_json(message):
+    return GribMessage(
+        **{
+            **message,
+            "reference_time": datetime.datetime.fromisoformat(
+                message["reference_time"]
+            ),
+        }
+    )
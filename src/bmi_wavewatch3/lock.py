@@ -0,0 +1,151 @@
+import os
+import pathlib
+import time
+
+try:
+    import fcntl
+except ModuleNotFoundError:
+    import msvcrt
+
+    fcntl = None
+
+LOCK_DIR = ".wavewatch3-locks"
+SHARED_LOCKS = fcntl is not None
+
+
+def lock_path(filepath):
+    """Path to the lock file that guards a data file.
+
+    Lock files are kept in a hidden folder next to the data files so
+    that they are not mistaken for data (or removed along with them).
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.lock import lock_path
+    >>> lock_path("/data/multi_1.glo_30m.hs.201005.grb2").as_posix()
+    '/data/.wavewatch3-locks/multi_1.glo_30m.hs.201005.grb2.lock'
+    """
+    filepath = pathlib.Path(filepath)
+    return filepath.parent / LOCK_DIR / f"{filepath.name}.lock"
+
+
+class FileLock:
+    """An exclusive lock, shared between processes, held on a file.
+
+    The lock is held through an advisory lock of the operating system
+    (``flock`` or, on Windows, ``msvcrt.locking``) so it is released if
+    the process that holds it dies. Separate :class:`FileLock` objects
+    exclude one another even within a single process.
+
+    A lock may instead be taken as *shared*, in which case it excludes
+    only exclusive locks. Shared locks need ``flock`` and so are not
+    available on Windows (see :data:`SHARED_LOCKS`).
+
+    Parameters
+    ----------
+    path : str or path-like
+        Path to the lock file. It is created if it does not exist.
+    timeout : float, optional
+        Time, in seconds, to wait for the lock before raising
+        :class:`TimeoutError`. If not provided, wait for as long as it takes.
+    poll_interval : float, optional
+        Time, in seconds, between attempts to take a lock that is held
+        elsewhere, when waiting with a *timeout*.
+    shared : bool, optional
+        If ``True``, take a shared, rather than an exclusive, lock.
+
+    Examples
+    --------
+    >>> import tempfile, os
+    >>> from bmi_wavewatch3.lock import FileLock
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     with FileLock(os.path.join(folder, "a.lock")) as lock:
+    ...         lock.locked
+    True
+    """
+
+    def __init__(self, path, timeout=None, poll_interval=0.05, shared=False):
+        if shared and not SHARED_LOCKS:
+            raise NotImplementedError("shared locks are not available")
+        self._path = pathlib.Path(path)
+        self._timeout = timeout
+        self._poll_interval = poll_interval
+        self._shared = shared
+        self._fd = None
+
+    @property
+    def path(self):
+        """Path to the lock file."""
+        return self._path
+
+    @property
+    def locked(self):
+        """``True`` if the lock is held by this object."""
+        return self._fd is not None
+
+    def acquire(self):
+        """Take the lock, waiting until it is available."""
+        if self._fd is not None:
+            raise RuntimeError(f"{self._path}: lock is already held")
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if self._timeout is None and fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_SH if self._shared else fcntl.LOCK_EX)
+            else:
+                deadline = (
+                    None if self._timeout is None else time.monotonic() + self._timeout
+                )
+                while not _try_lock(fd, shared=self._shared):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise TimeoutError(f"{self._path}: timed out waiting for lock")
+                    time.sleep(self._poll_interval)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return self
+
+    def release(self):
+        """Release the lock, if it is held."""
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            try:
+                _unlock(fd)
+            finally:
+                os.close(fd)
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *args):
+        self.release()
+
+    def __repr__(self):
+        return (
+            f"FileLock({str(self._path)!r}, timeout={self._timeout!r},"
+            f" shared={self._shared!r})"
+        )
+
+
+def _try_lock(fd, shared=False):
+    try:
+        if fcntl is not None:
+            fcntl.flock(
+                fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB
+            )
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
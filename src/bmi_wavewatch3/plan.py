@@ -0,0 +1,153 @@
+from .errors import ChoiceError, DateValueError
+from .source import SOURCES
+
+
+def plan_downloads(dates, quantities=None, grid="glo_30m", source="multigrid"):
+    """Map dates to the files that hold their data.
+
+    WAVEWATCH III data are stored as monthly files so many dates map to the
+    same file. The plan lists each file just once, along with all of the
+    dates that it holds data for.
+
+    Parameters
+    ----------
+    dates : str or iterable of str
+        Date or dates as isoformat strings ("YYYY-MM-DD").
+    quantities : iterable of str, optional
+        Quantities to download. If not provided, plan to download all of
+        the quantities of the source.
+    grid : str, optional
+        The WAVEWATCH III grid to download.
+    source : str, optional
+        Source from which to download data from.
+
+    Returns
+    -------
+    dict
+        Urls of the files to download, in the order they were first needed,
+        mapped to the dates that need them.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.plan import plan_downloads
+    >>> plan = plan_downloads(
+    ...     ["2010-05-01", "2010-05-15", "2010-06-01"], quantities=["hs"]
+    ... )
+    >>> for url, dates in plan.items():
+    ...     print(url.rsplit("/", 1)[-1], dates)
+    multi_1.glo_30m.hs.201005.grb2 ['2010-05-01', '2010-05-15']
+    multi_1.glo_30m.hs.201006.grb2 ['2010-06-01']
+    """
+    try:
+        Source = SOURCES[source]
+    except KeyError:
+        raise ChoiceError(source, SOURCES)
+
+    dates = [dates] if isinstance(dates, str) else dates
+    quantities = sorted(Source.QUANTITIES) if quantities is None else quantities
+
+    plan = {}
+    for date in dates:
+        for quantity in quantities:
+            url = str(Source(date, quantity=quantity, grid=grid))
+            if date not in plan.setdefault(url, []):
+                plan[url].append(date)
+    return plan
+
+
+def iter_months(start, end):
+    """Iterate over the months of a range of dates.
+
+    Parameters
+    ----------
+    start, end : str
+        First and last (inclusive) months of the range, as isoformat
+        strings ("YYYY-MM" or "YYYY-MM-DD").
+
+    Yields
+    ------
+    str
+        The first day of each month, as an isoformat string.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.plan import iter_months
+    >>> list(iter_months("2010-11", "2011-02-15"))
+    ['2010-11-01', '2010-12-01', '2011-01-01', '2011-02-01']
+    """
+    year, month = _parse_month(start)
+    last = _parse_month(end)
+    while (year, month) <= last:
+        yield f"{year:04d}-{month:02d}-01"
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def plan_range(start, end, quantities=None, grid="glo_30m", source="multigrid"):
+    """Iterate over the urls of the files that hold a range of months.
+
+    Unlike :func:`plan_downloads`, the urls are generated as they are
+    needed so that plans that span many years can be streamed.
+
+    Parameters
+    ----------
+    start, end : str
+        First and last (inclusive) months to download, as isoformat
+        strings ("YYYY-MM" or "YYYY-MM-DD").
+    quantities : iterable of str, optional
+        Quantities to download. If not provided, plan to download all of
+        the quantities of the source.
+    grid : str, optional
+        The WAVEWATCH III grid to download.
+    source : str, optional
+        Source from which to download data from.
+
+    Returns
+    -------
+    iterator of str
+        Urls of the files to download, month by month.
+
+    Raises
+    ------
+    DateValueError
+        If the range is not within the dates of the source.
+    ChoiceError
+        If a quantity, or the grid, is not provided by the source.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.plan import plan_range
+    >>> for url in plan_range("2010-05", "2010-06", quantities=["hs", "tp"]):
+    ...     print(url.rsplit("/", 1)[-1])
+    multi_1.glo_30m.hs.201005.grb2
+    multi_1.glo_30m.tp.201005.grb2
+    multi_1.glo_30m.hs.201006.grb2
+    multi_1.glo_30m.tp.201006.grb2
+    """
+    try:
+        Source = SOURCES[source]
+    except KeyError:
+        raise ChoiceError(source, SOURCES)
+
+    quantities = sorted(Source.QUANTITIES) if quantities is None else list(quantities)
+    for quantity in quantities:
+        Source.validate_quantity(quantity)
+    Source.validate_grid(grid)
+    for date in (start, end):
+        Source.validate_date("{:04d}-{:02d}-01".format(*_parse_month(date)))
+
+    return (
+        str(Source(month, quantity=quantity, grid=grid))
+        for month in iter_months(start, end)
+        for quantity in quantities
+    )
+
+
+def _parse_month(date):
+    """Parse the year and month of an isoformatted date."""
+    try:
+        year, month = (int(part) for part in date.split("-")[:2])
+    except ValueError:
+        raise DateValueError(f"{date}: not a month (YYYY-MM)")
+    if not 1 <= month <= 12:
+        raise DateValueError(f"{date}: not a month (YYYY-MM)")
+    return year, month
@@ -0,0 +1,405 @@
+import importlib.util
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+from .errors import ChoiceError, WaveWatch3Error
+
+METHODS = ("nearest", "bilinear")
+OUTPUT_FORMATS = {"csv": ".csv", "parquet": ".parquet"}
+
+
+class PointIndex:
+    """Where points fall on a regular latitude-longitude grid.
+
+    The grid cells, and weights, from which to sample each point are
+    computed once so that the values at all of the points can then be
+    gathered from each GRIB message with a single, vectorized, indexing
+    operation. Points that fall on land (a dry cell) are moved to the
+    nearest wet cell.
+
+    Parameters
+    ----------
+    lats, lons : array_like of float
+        Latitudes and longitudes, in degrees, of the points.
+    latitude, longitude : array_like of float
+        Latitudes and longitudes of the rows and columns of the grid.
+    wet : array_like of bool, optional
+        Grid cells that are wet. If not provided, all cells are wet.
+    method : {"nearest", "bilinear"}, optional
+        Take the value of the nearest grid cell or interpolate between
+        the four surrounding cells. When interpolating, dry cells are left
+        out and the weights of the wet ones are scaled to sum to one.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from bmi_wavewatch3.points import PointIndex
+    >>> index = PointIndex(
+    ...     [1.2, 0.0], [-359.0, 2.4], latitude=[2.0, 1.0, 0.0], longitude=[0, 1, 2, 3]
+    ... )
+    >>> index.sample(np.arange(12.0).reshape((3, 4)))
+    array([ 5., 10.])
+    >>> index = PointIndex(
+    ...     [1.5], [1.5], [2.0, 1.0, 0.0], [0, 1, 2, 3], method="bilinear"
+    ... )
+    >>> index.sample(np.arange(12.0).reshape((3, 4)))
+    array([3.5])
+    """
+
+    def __init__(self, lats, lons, latitude, longitude, wet=None, method="nearest"):
+        if method not in METHODS:
+            raise ChoiceError(method, METHODS)
+        lats = np.atleast_1d(lats).astype(float)
+        lons = np.atleast_1d(lons).astype(float)
+        if lats.ndim != 1 or lats.shape != lons.shape:
+            raise WaveWatch3Error("lats and lons must be 1D and of the same length")
+        latitude = np.asarray(latitude, dtype=float)
+        longitude = np.asarray(longitude, dtype=float)
+        shape = len(latitude), len(longitude)
+        wet = np.ones(shape, dtype=bool) if wet is None else np.asarray(wet, dtype=bool)
+        if wet.shape != shape:
+            raise WaveWatch3Error("wet must have the shape of the grid")
+        if not wet.any():
+            raise WaveWatch3Error("the grid does not have any wet cells")
+
+        self._method = method
+        self._shape = shape
+        self._lats, self._lons = lats, lons
+        self._periodic = _is_periodic(longitude)
+
+        lons = _wrap(lons, longitude)
+        rows = _fractional_index(lats, latitude)
+        cols = _fractional_index(lons, longitude)
+        outside = (rows < -0.5) | (rows > shape[0] - 0.5)
+        if not self._periodic:
+            outside |= (cols < -0.5) | (cols > shape[1] - 0.5)
+        if outside.any():
+            raise WaveWatch3Error(
+                f"{np.count_nonzero(outside)} of {len(lats)} points are outside"
+                " of the grid"
+            )
+
+        if method == "nearest":
+            self._rows, self._cols, self._weights = self._nearest(rows, cols)
+        else:
+            self._rows, self._cols, self._weights = self._bilinear(rows, cols)
+
+        dry = ~wet[self._rows, self._cols]
+        self._weights[dry] = 0.0
+        total = self._weights.sum(axis=1)
+        self._snapped = total == 0.0
+        if self._snapped.any():
+            snapped = np.flatnonzero(self._snapped)
+            row, col = _nearest_wet(
+                lats[snapped], lons[snapped], latitude, longitude, wet
+            )
+            self._rows[snapped], self._cols[snapped] = row[:, None], col[:, None]
+            self._weights[snapped] = 0.0
+            self._weights[snapped, 0] = 1.0
+            total[snapped] = 1.0
+        self._weights /= total[:, None]
+
+    @property
+    def method(self):
+        """Method used to sample the points."""
+        return self._method
+
+    @property
+    def lats(self):
+        """Latitudes of the points."""
+        return self._lats.copy()
+
+    @property
+    def lons(self):
+        """Longitudes of the points."""
+        return self._lons.copy()
+
+    @property
+    def snapped(self):
+        """Points that were moved from dry cells to the nearest wet cell."""
+        return self._snapped.copy()
+
+    def __len__(self):
+        return len(self._weights)
+
+    def sample(self, values):
+        """Gather the values of a field at the points.
+
+        Parameters
+        ----------
+        values : array_like
+            Values on the grid, with the grid's rows and columns as the last
+            two dimensions.
+
+        Returns
+        -------
+        ndarray
+            The values at the points, as the last dimension.
+        """
+        values = np.asarray(values)
+        if values.shape[-2:] != self._shape:
+            raise WaveWatch3Error("values must have the shape of the grid")
+        gathered = values[..., self._rows, self._cols]
+        if self._weights.shape[1] == 1:
+            return gathered[..., 0]
+        return np.sum(
+            np.where(self._weights > 0.0, gathered, 0.0) * self._weights, axis=-1
+        )
+
+    def _nearest(self, rows, cols):
+        rows = np.clip(np.rint(rows), 0, self._shape[0] - 1).astype(int)
+        cols = self._column(np.rint(cols).astype(int))
+        return rows[:, None], cols[:, None], np.ones((len(rows), 1))
+
+    def _bilinear(self, rows, cols):
+        ny = self._shape[0]
+        row0 = np.clip(np.floor(rows), 0, ny - 1).astype(int)
+        row1 = np.minimum(row0 + 1, ny - 1)
+        dy = np.clip(rows - row0, 0.0, 1.0)
+
+        col0 = np.floor(cols).astype(int)
+        if not self._periodic:
+            col0 = np.clip(col0, 0, self._shape[1] - 1)
+        dx = np.clip(cols - col0, 0.0, 1.0)
+        col0, col1 = self._column(col0), self._column(col0 + 1)
+
+        return (
+            np.stack([row0, row0, row1, row1], axis=1),
+            np.stack([col0, col1, col0, col1], axis=1),
+            np.stack(
+                [(1 - dy) * (1 - dx), (1 - dy) * dx, dy * (1 - dx), dy * dx], axis=1
+            ),
+        )
+
+    def _column(self, cols):
+        if self._periodic:
+            return cols % self._shape[1]
+        return np.clip(cols, 0, self._shape[1] - 1)
+
+
+def validate_output_format(format, path=None):
+    """Check that points can be written in a format.
+
+    Parameters
+    ----------
+    format : {"csv", "parquet"} or None
+        Format of the output. If not provided, the format is guessed
+        from the extension of *path* and is otherwise CSV.
+    path : str or path-like, optional
+        Path to the output file.
+
+    Returns
+    -------
+    str
+        The format.
+
+    Raises
+    ------
+    ChoiceError
+        If *format* is not a known format.
+    WaveWatch3Error
+        If the package needed to write the format is not installed.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.points import validate_output_format
+    >>> validate_output_format(None, "buoys.csv")
+    'csv'
+    >>> validate_output_format(None)
+    'csv'
+    """
+    if format is None:
+        suffix = pathlib.Path(str(path or "")).suffix
+        format = {ext: name for name, ext in OUTPUT_FORMATS.items()}.get(suffix, "csv")
+    if format not in OUTPUT_FORMATS:
+        raise ChoiceError(format, OUTPUT_FORMATS)
+    if format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise WaveWatch3Error(f"{format}: writing points requires pyarrow")
+    return format
+
+
+def write_points(frames, path, format=None):
+    """Write tables of values at points, one after another, to a file.
+
+    The tables are written as they are generated so that only one of
+    them is held in memory at a time.
+
+    Parameters
+    ----------
+    frames : iterable of pandas.DataFrame
+        Tables with the same columns.
+    path : str, path-like or file-like
+        File to write to. CSV can also be written to an open text file.
+    format : {"csv", "parquet"}, optional
+        Format of the file (see :func:`validate_output_format`).
+
+    Returns
+    -------
+    int
+        The number of rows written.
+    """
+    format = validate_output_format(format, None if hasattr(path, "write") else path)
+    if format == "csv":
+        return _write_csv(frames, path)
+    if hasattr(path, "write"):
+        raise WaveWatch3Error("parquet files can only be written to a path")
+    return _write_parquet(frames, path)
+
+
+def _write_csv(frames, path):
+    rows = 0
+    if hasattr(path, "write"):
+        for frame in frames:
+            frame.to_csv(path, header=rows == 0, index=False)
+            rows += len(frame)
+    else:
+        with open(path, "w", newline="") as fp:
+            rows = _write_csv(frames, fp)
+    return rows
+
+
+def _write_parquet(frames, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows, writer = 0, None
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            rows += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def read_points(path_or_buffer):
+    """Read the locations of points from a CSV file.
+
+    The file has *latitude* (or *lat*) and *longitude* (or *lon*)
+    columns and, optionally, a *name* column.
+
+    Returns
+    -------
+    tuple of ndarray
+        The latitudes, longitudes and names (or ``None``) of the points.
+    """
+    table = pd.read_csv(path_or_buffer)
+    columns = {name.strip().lower(): name for name in table.columns}
+    try:
+        lat = columns.get("latitude", columns.get("lat"))
+        lon = columns.get("longitude", columns.get("lon"))
+        lats, lons = table[lat].to_numpy(float), table[lon].to_numpy(float)
+    except (KeyError, ValueError):
+        raise WaveWatch3Error("points must have latitude and longitude columns")
+    names = table[columns["name"]].to_numpy() if "name" in columns else None
+    return lats, lons, names
+
+
+def iter_points(ww3, months, index, names=None):
+    """Gather the values at points for a range of months.
+
+    Parameters
+    ----------
+    ww3 : WaveWatch3
+        The data, which is moved through *months*.
+    months : iterable of str
+        The months, as isoformat strings.
+    index : PointIndex
+        The points.
+    names : array_like, optional
+        Names of the points. If not provided, the points are numbered.
+
+    Yields
+    ------
+    pandas.DataFrame
+        The values at the points, a month at a time, with a row for each
+        time and point.
+    """
+    names = np.arange(len(index)) if names is None else np.asarray(names)
+    for month in months:
+        ww3.date = month
+        ds = ww3.data
+        valid = (ds.time + ds.step).values
+        end = np.datetime64(month, "M") + np.timedelta64(1, "M")
+        steps = np.flatnonzero(valid < end.astype(valid.dtype))
+        variables = list(ds.data_vars)
+
+        values = {
+            name: np.empty((len(steps), len(index)), dtype=ds[name].dtype)
+            for name in variables
+        }
+        for n, step in enumerate(steps):
+            message = ds[variables].isel(step=step).compute()
+            for name in variables:
+                values[name][n] = index.sample(message[name].values)
+
+        yield pd.DataFrame(
+            {
+                "time": np.repeat(valid[steps], len(index)),
+                "point": np.tile(names, len(steps)),
+                "latitude": np.tile(index.lats, len(steps)),
+                "longitude": np.tile(index.lons, len(steps)),
+                **{name: values[name].reshape(-1) for name in variables},
+            }
+        )
+
+
+def wet_cells(ds):
+    """Grid cells of a dataset that are wet.
+
+    Cells are wet where the significant wave height (or, if the dataset
+    does not have it, its first variable) of the first step is defined.
+    """
+    name = "swh" if "swh" in ds.data_vars else next(iter(ds.data_vars))
+    values = ds[name]
+    if "step" in values.dims:
+        values = values.isel(step=0)
+    return np.isfinite(values.transpose("latitude", "longitude").values)
+
+
+def _is_periodic(longitude):
+    """Check if the columns of a grid wrap around the globe."""
+    if len(longitude) < 2:
+        return False
+    spacing = abs(longitude[1] - longitude[0])
+    return np.isclose(len(longitude) * spacing, 360.0)
+
+
+def _wrap(lons, longitude):
+    """Shift longitudes by multiples of 360 into the range of a grid."""
+    start = min(longitude[0], longitude[-1])
+    return start + (lons - start) % 360.0
+
+
+def _fractional_index(values, coord):
+    """Position of values along a regularly spaced coordinate."""
+    if len(coord) < 2:
+        return np.zeros_like(values)
+    return (values - coord[0]) / (coord[1] - coord[0])
+
+
+def _nearest_wet(lats, lons, latitude, longitude, wet, max_size=2**20):
+    """Row and column of the wet cell closest to each point.
+
+    Points are compared with all of the wet cells a chunk at a time, with
+    chunks sized so that each array of distances has at most about
+    *max_size* elements.
+    """
+    rows, cols = np.nonzero(wet)
+    wet_lat, wet_lon = latitude[rows], longitude[cols]
+    chunksize = max(max_size // len(rows), 1)
+
+    nearest = np.empty(len(lats), dtype=int)
+    for start in range(0, len(lats), chunksize):
+        lat = lats[start : start + chunksize, None]
+        lon = lons[start : start + chunksize, None]
+        dlon = (wet_lon - lon + 180.0) % 360.0 - 180.0
+        distance = (wet_lat - lat) ** 2 + (dlon * np.cos(np.radians(lat))) ** 2
+        nearest[start : start + chunksize] = np.argmin(distance, axis=1)
+    return rows[nearest], cols[nearest]
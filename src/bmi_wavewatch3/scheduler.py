@@ -0,0 +1,241 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .executor import Executor
+
+
+class TokenBucket:
+    """Limit the rate at which bytes are consumed.
+
+    Parameters
+    ----------
+    rate : float
+        Sustained rate, in bytes per second.
+    capacity : float, optional
+        Largest burst, in bytes. The default is one second's worth of bytes.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError(f"{rate}: rate must be positive")
+        self._rate = float(rate)
+        self._capacity = self._rate if capacity is None else float(capacity)
+        self._tokens = self._capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def consume(self, nbytes):
+        """Take *nbytes* from the bucket, waiting until they are available.
+
+        Tokens are reserved before waiting so that threads sharing the
+        bucket are served in turn.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity, self._tokens + (now - self._last) * self._rate
+            )
+            self._last = now
+            self._tokens -= nbytes
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if wait > 0.0:
+            time.sleep(wait)
+
+
+class AdaptiveScheduler:
+    """Run downloads with a concurrency that adapts to the throughput.
+
+    The number of simultaneous downloads starts small and is adjusted as
+    downloads finish. Every *interval* seconds the throughput of the last
+    period is compared to the one before: while it keeps improving, the
+    concurrency keeps moving in the same direction (one download at a time)
+    and, when it drops, the direction is reversed. A failed download halves
+    the concurrency, as a server that is refusing requests is unlikely
+    to be helped by more of them.
+
+    Parameters
+    ----------
+    max_concurrency : int, optional
+        Largest number of downloads to run at once.
+    min_concurrency : int, optional
+        Smallest number of downloads to run at once.
+    rate_limit : float, optional
+        Cap, in bytes per second, on the combined rate of all downloads.
+    interval : float, optional
+        Time, in seconds, over which throughput is measured before the
+        concurrency is adjusted.
+    tolerance : float, optional
+        Fraction by which the throughput must drop before the direction in
+        which the concurrency is moving is reversed.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.scheduler import AdaptiveScheduler
+    >>> AdaptiveScheduler(max_concurrency=4).map(lambda x: x**2, range(5))
+    [0, 1, 4, 9, 16]
+    """
+
+    def __init__(
+        self,
+        max_concurrency=8,
+        min_concurrency=1,
+        rate_limit=None,
+        interval=1.0,
+        tolerance=0.1,
+    ):
+        if not 1 <= min_concurrency <= max_concurrency:
+            raise ValueError(
+                "concurrency limits must satisfy"
+                f" 1 <= min_concurrency ({min_concurrency})"
+                f" <= max_concurrency ({max_concurrency})"
+            )
+        self._min = min_concurrency
+        self._max = max_concurrency
+        self._bucket = None if rate_limit is None else TokenBucket(rate_limit)
+        self._interval = interval
+        self._tolerance = tolerance
+
+        self._concurrency = min(max(2, min_concurrency), max_concurrency)
+        self._direction = 1
+        self._throughput = None
+        self._lock = threading.Lock()
+        self._start_epoch()
+
+    @property
+    def concurrency(self):
+        """The number of downloads currently allowed to run at once."""
+        return self._concurrency
+
+    @property
+    def rate_limit(self):
+        """Cap, in bytes per second, on the combined rate of all downloads."""
+        return None if self._bucket is None else self._bucket.rate
+
+    def meter(self, reporthook=None):
+        """Create a reporthook that meters (and limits) a single download.
+
+        Parameters
+        ----------
+        reporthook : callable, optional
+            A reporthook to call after each block is metered.
+
+        Returns
+        -------
+        callable
+            A function to pass as the ``reporthook`` of a download.
+        """
+        last = None
+
+        def _reporthook(blocknum, blocksize, totalsize):
+            nonlocal last
+            nbytes = 0 if last is None else max(blocknum - last, 0) * blocksize
+            last = blocknum
+            if nbytes:
+                if self._bucket is not None:
+                    self._bucket.consume(nbytes)
+                with self._lock:
+                    self._epoch_bytes += nbytes
+            if reporthook is not None:
+                reporthook(blocknum, blocksize, totalsize)
+
+        return _reporthook
+
+    def map(self, func, items, failed=None, executor=None):
+        """Call a function on each item, adapting the concurrency as it goes.
+
+        Items are taken from *items* only as workers become free, so it may
+        be a (long) generator.
+
+        Parameters
+        ----------
+        func : callable
+            Function to call on each item.
+        items : iterable
+            Items to pass to *func*.
+        failed : callable, optional
+            Function that, given the value returned by *func*, returns
+            ``True`` if the call should count as a failure. Calls that
+            raise an exception always count as failures.
+        executor : Executor, optional
+            Executor that runs the calls. If not provided, calls are run in
+            a pool of *max_concurrency* threads that is shut down once all
+            of the items have been processed.
+
+        Returns
+        -------
+        list
+            The values returned by *func*, in the same order as *items*. If
+            any of the calls raised an exception, the first is re-raised
+            once all of the items have been processed.
+        """
+        if executor is None:
+            with Executor("thread", max_workers=self._max) as executor:
+                return self.map(func, items, failed=failed, executor=executor)
+
+        items = enumerate(items)
+        pending = {}
+        results = {}
+        errors = []
+
+        while True:
+            while items is not None and len(pending) < self._concurrency:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    items = None
+                else:
+                    pending[executor.submit(func, item)] = index
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as error:
+                    errors.append((index, error))
+                    ok = False
+                else:
+                    results[index] = result
+                    ok = failed is None or not failed(result)
+                with self._lock:
+                    self._update(ok)
+
+        if errors:
+            raise min(errors, key=lambda error: error[0])[1]
+        return [results[index] for index in sorted(results)]
+
+    def _start_epoch(self):
+        self._epoch_start = time.monotonic()
+        self._epoch_bytes = 0
+        self._epoch_count = 0
+
+    def _update(self, ok):
+        if not ok:
+            self._concurrency = max(self._min, self._concurrency // 2)
+            self._direction = 1
+            self._throughput = None
+            self._start_epoch()
+            return
+
+        self._epoch_count += 1
+        elapsed = time.monotonic() - self._epoch_start
+        if elapsed < self._interval or self._epoch_count < self._concurrency:
+            return
+
+        throughput = (self._epoch_bytes or self._epoch_count) / elapsed
+        if self._throughput is not None and throughput < self._throughput * (
+            1.0 - self._tolerance
+        ):
+            self._direction = -self._direction
+        self._concurrency = min(
+            max(self._concurrency + self._direction, self._min), self._max
+        )
+        self._throughput = throughput
+        self._start_epoch()
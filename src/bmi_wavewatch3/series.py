@@ -0,0 +1,131 @@
+import dask
+import dask.array as da
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from .errors import WaveWatch3Error
+
+_MONTH = np.timedelta64(1, "M")
+
+
+def month_times(template, month):
+    """Valid times of a month of data laid out like those of another month.
+
+    The valid times of the *template* month, as offsets from the start of
+    their month, are applied to *month*. If the template runs through to
+    the end of its month (as monthly WAVEWATCH III files do), its steps
+    are continued through to the end of *month*, which may be longer.
+    Times that fall in the following month are dropped so that
+    consecutive months do not overlap.
+
+    Parameters
+    ----------
+    template : xarray.Dataset
+        A month of data, with a *time* (the reference time) coordinate
+        and a *step* dimension.
+    month : str
+        The month as an isoformat string ("YYYY-MM-DD").
+
+    Returns
+    -------
+    ndarray of datetime64
+        The valid times.
+    """
+    valid = (template.time + template.step).values
+    first = valid.min().astype("datetime64[M]")
+    offsets = valid - _ns(first)
+    interval = np.diff(valid).min() if len(valid) > 1 else np.timedelta64(1, "D")
+
+    start = np.datetime64(month, "M")
+    length = _ns(start + _MONTH) - _ns(start)
+    if offsets[-1] + interval >= _ns(first + _MONTH) - _ns(first):
+        offsets = np.arange(offsets[0], length, interval)
+    return _ns(start) + offsets[offsets < length]
+
+
+def concat_months(template, months, open_month):
+    """Join months of data, lazily, along a continuous time axis.
+
+    Only the *template* month is read up front, for its coordinates and
+    metadata. The data of every other month are read, with *open_month*,
+    when (and if) they are computed.
+
+    Parameters
+    ----------
+    template : xarray.Dataset
+        The data of the first month.
+    months : list of str
+        The months to join, as isoformat strings, starting with the
+        month of the *template*.
+    open_month : callable
+        Function that takes a month and returns its data as an
+        :class:`xarray.Dataset`.
+
+    Returns
+    -------
+    xarray.Dataset
+        The data of all the months with a *time* dimension of valid times
+        in place of the reference time and steps of each month.
+    """
+    if "step" not in template.dims:
+        raise WaveWatch3Error("unable to join months of data without a step dimension")
+    template = template.transpose("step", ...)
+    names = list(template.data_vars)
+    shape = {name: template[name].shape[1:] for name in names}
+
+    times, parts = [], {name: [] for name in names}
+    for n, month in enumerate(months):
+        valid = month_times(template, month)
+        if n == 0:
+            month_data = _at_times(template, valid, month)
+            for name in names:
+                parts[name].append(da.asarray(month_data[name].data))
+        else:
+            month_data = dask.delayed(_read_month)(open_month, month, names, valid)
+            for name in names:
+                parts[name].append(
+                    da.from_delayed(
+                        month_data[name],
+                        shape=(len(valid),) + shape[name],
+                        dtype=template[name].dtype,
+                    )
+                )
+        times.append(valid)
+
+    coords = {
+        name: coord
+        for name, coord in template.coords.items()
+        if name not in ("time", "step", "valid_time")
+    }
+    coords["time"] = ("time", np.concatenate(times))
+    return xr.Dataset(
+        {
+            name: (
+                ("time",) + template[name].dims[1:],
+                da.concatenate(parts[name]),
+                template[name].attrs,
+            )
+            for name in names
+        },
+        coords=coords,
+        attrs=template.attrs,
+    )
+
+
+def _read_month(open_month, month, names, valid):
+    with open_month(month) as ds:
+        ds = _at_times(ds.transpose("step", ...), valid, month)
+        return {name: ds[name].values for name in names}
+
+
+def _at_times(ds, valid, month):
+    """Select the steps of a month of data at some valid times."""
+    index = pd.Index((ds.time + ds.step).values).get_indexer(valid)
+    if np.any(index < 0):
+        raise WaveWatch3Error(f"{month}: data are missing some of the expected times")
+    return ds.isel(step=index)
+
+
+def _ns(time):
+    return time.astype("datetime64[ns]")
@@ -1,10 +1,52 @@
 import datetime
+import os
 import pathlib
 import urllib
 
 from .errors import ChoiceError, DateValueError
 
 
+VARIABLES = {
+    "dirpw": "dp",
+    "swh": "hs",
+    "perpw": "tp",
+    "u": "wind",
+    "v": "wind",
+    "swdir": "pdir",
+    "swell": "phs",
+    "swper": "ptp",
+}
+
+
+def quantities_of(variables):
+    """Quantities of the data files that hold data variables.
+
+    Parameters
+    ----------
+    variables : str or iterable of str
+        Names of data variables (e.g. ``"swh"``).
+
+    Returns
+    -------
+    list of str
+        The quantities, sorted and without duplicates.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.source import quantities_of
+    >>> quantities_of(["u", "v", "swh"])
+    ['hs', 'wind']
+    """
+    variables = [variables] if isinstance(variables, str) else variables
+    quantities = set()
+    for variable in variables:
+        try:
+            quantities.add(VARIABLES[variable])
+        except KeyError:
+            raise ChoiceError(variable, VARIABLES)
+    return sorted(quantities)
+
+
 class _WaveWatch3Source:
     SCHEME = "https"
     NETLOC = ""
@@ -24,6 +66,7 @@ class _WaveWatch3Source:
     QUANTITIES = {"wind", "hs", "tp", "dp"}
     MIN_DATE = None
     MAX_DATE = None
+    INTERVAL = 3  # hours between the fields of the monthly files
 
     def __init__(self, date, quantity, grid="glo_30m"):
         self._date = datetime.datetime.fromisoformat(self.validate_date(date))
@@ -39,11 +82,14 @@ class _WaveWatch3Source:
         raise NotImplementedError("filename")
 
     def __str__(self):
+        scheme, netloc, prefix = self.SCHEME, self.NETLOC, ""
+        if mirror := os.environ.get("WAVEWATCH3_MIRROR"):
+            scheme, netloc, prefix = urllib.parse.urlsplit(mirror)[:3]
         return urllib.parse.urlunparse(
             [
-                self.SCHEME,
-                self.NETLOC,
-                str(self.path),
+                scheme,
+                netloc,
+                prefix.rstrip("/") + str(self.path),
                 "",
                 "",
                 "",
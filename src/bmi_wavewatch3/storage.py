@@ -0,0 +1,191 @@
+import gzip
+import importlib.util
+import os
+import pathlib
+import shutil
+
+from .engine import part_file
+from .errors import ChoiceError, WaveWatch3Error
+
+SUFFIXES = {"plain": "", "gzip": ".gz", "zstd": ".zst"}
+SCRATCH_DIR = ".wavewatch3-scratch"
+
+
+def validate_storage(storage):
+    """Check that data files can be stored in a format.
+
+    Raises
+    ------
+    ChoiceError
+        If *storage* is not a known storage format.
+    WaveWatch3Error
+        If the package needed to compress files is not installed.
+    """
+    if storage not in SUFFIXES:
+        raise ChoiceError(storage, SUFFIXES)
+    if storage == "zstd" and importlib.util.find_spec("zstandard") is None:
+        raise WaveWatch3Error(f"{storage}: compressing files requires zstandard")
+    return storage
+
+
+def stored_path(filepath, storage="plain"):
+    """Path to a data file as it is kept in the cache.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.storage import stored_path
+    >>> stored_path("data/multi_1.glo_30m.hs.201005.grb2", "zstd").as_posix()
+    'data/multi_1.glo_30m.hs.201005.grb2.zst'
+    >>> stored_path("data/multi_1.glo_30m.hs.201005.grb2").as_posix()
+    'data/multi_1.glo_30m.hs.201005.grb2'
+    """
+    filepath = pathlib.Path(filepath)
+    return filepath.with_name(filepath.name + SUFFIXES[storage])
+
+
+def plain_name(name):
+    """Name of a data file once it is decompressed.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.storage import plain_name
+    >>> plain_name("multi_1.glo_30m.hs.201005.grb2.gz")
+    'multi_1.glo_30m.hs.201005.grb2'
+    >>> plain_name("nww3.hs.200501.grb")
+    'nww3.hs.200501.grb'
+    """
+    return name[: -len(suffix)] if (suffix := _suffix_of(name)) else name
+
+
+def scratch_path(filepath, folder=None):
+    """Path to the decompressed copy of a compressed data file.
+
+    Copies are kept, under the name of the decompressed file, in a hidden
+    folder so that they are not mistaken for data.
+
+    Parameters
+    ----------
+    filepath : str or path-like
+        Path to a compressed data file.
+    folder : str or path-like, optional
+        Folder in which to keep the hidden folder of copies. If not
+        provided, use the folder of the data file.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.storage import scratch_path
+    >>> scratch_path("/data/multi_1.glo_30m.hs.201005.grb2.gz").as_posix()
+    '/data/.wavewatch3-scratch/multi_1.glo_30m.hs.201005.grb2'
+    """
+    filepath = pathlib.Path(filepath)
+    folder = filepath.parent if folder is None else pathlib.Path(folder).expanduser()
+    return folder / SCRATCH_DIR / plain_name(filepath.name)
+
+
+def is_current(copy, filepath):
+    """Check if a decompressed copy was made from a data file as it is now."""
+    try:
+        return os.stat(copy).st_mtime_ns == os.stat(filepath).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def is_compressed(filepath):
+    """Check if a data file is kept compressed."""
+    return bool(_suffix_of(pathlib.Path(filepath).name))
+
+
+def open_stored(filepath):
+    """Open a, possibly compressed, data file for reading.
+
+    Parameters
+    ----------
+    filepath : str or path-like
+        Path to the data file.
+
+    Returns
+    -------
+    file-like
+        A binary stream of the decompressed data.
+    """
+    filepath = pathlib.Path(filepath)
+    suffix = _suffix_of(filepath.name)
+    if suffix == ".gz":
+        return gzip.open(filepath, "rb")
+    elif suffix == ".zst":
+        import zstandard
+
+        return zstandard.open(filepath, "rb")
+    else:
+        return open(filepath, "rb")
+
+
+def compress(filepath, storage):
+    """Compress a data file, replacing the uncompressed file.
+
+    Parameters
+    ----------
+    filepath : str or path-like
+        Path to an uncompressed data file.
+    storage : {"plain", "gzip", "zstd"}
+        Format to compress the file to.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the compressed file.
+    """
+    filepath = pathlib.Path(filepath)
+    stored = stored_path(filepath, storage)
+    if stored == filepath:
+        return filepath
+
+    with open(filepath, "rb") as src, _open_writer(part_file(stored), storage) as dst:
+        shutil.copyfileobj(src, dst, length=2**20)
+    os.replace(part_file(stored), stored)
+    filepath.unlink()
+    return stored
+
+
+def decompress(filepath, dest):
+    """Write the decompressed data of a data file to another file.
+
+    The modification time of the decompressed file is set to that of the
+    compressed file so that indexes built from earlier copies remain valid.
+
+    Parameters
+    ----------
+    filepath : str or path-like
+        Path to a, possibly compressed, data file.
+    dest : str or path-like
+        Path to the file to write.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the decompressed file.
+    """
+    filepath, dest = pathlib.Path(filepath), pathlib.Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with open_stored(filepath) as src, open(part_file(dest), "wb") as dst:
+        shutil.copyfileobj(src, dst, length=2**20)
+    os.replace(part_file(dest), dest)
+    mtime = filepath.stat().st_mtime_ns
+    os.utime(dest, ns=(mtime, mtime))
+    return dest
+
+
+def _open_writer(filepath, storage):
+    if storage == "gzip":
+        return gzip.open(filepath, "wb", compresslevel=6)
+    else:
+        import zstandard
+
+        return zstandard.open(filepath, "wb", cctx=zstandard.ZstdCompressor(level=10))
+
+
+def _suffix_of(name):
+    for suffix in SUFFIXES.values():
+        if suffix and name.endswith(suffix):
+            return suffix
+    return ""
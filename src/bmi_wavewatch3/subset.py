@@ -0,0 +1,99 @@
+import numpy as np
+
+from .errors import WaveWatch3Error
+
+
+def validate_bbox(bbox):
+    """Check a bounding box of longitudes and latitudes.
+
+    Parameters
+    ----------
+    bbox : sequence of float
+        The box as ``(west, south, east, north)``, in degrees.
+
+    Returns
+    -------
+    tuple of float
+        The bounding box.
+
+    Raises
+    ------
+    WaveWatch3Error
+        If the bounding box is not valid.
+
+    Examples
+    --------
+    >>> from bmi_wavewatch3.subset import validate_bbox
+    >>> validate_bbox([-124.5, 40, -122.5, 42])
+    (-124.5, 40.0, -122.5, 42.0)
+    >>> validate_bbox("-124.5,40,-122.5,42")
+    (-124.5, 40.0, -122.5, 42.0)
+    """
+    if isinstance(bbox, str):
+        bbox = bbox.split(",")
+    try:
+        west, south, east, north = (float(value) for value in bbox)
+    except (TypeError, ValueError):
+        raise WaveWatch3Error(f"{bbox!r}: bbox must be (west, south, east, north)")
+    if south > north:
+        raise WaveWatch3Error(f"{bbox!r}: the south edge is north of the north edge")
+    if not -90.0 <= south <= 90.0 or not -90.0 <= north <= 90.0:
+        raise WaveWatch3Error(f"{bbox!r}: latitudes must be between -90 and 90")
+    return west, south, east, north
+
+
+def subset_bbox(ds, bbox):
+    """Restrict a dataset to the grid points within a bounding box.
+
+    Longitudes of the box are wrapped to the range of the dataset's
+    longitudes (WAVEWATCH III grids run from 0 to 360) so that a box
+    can be given with longitudes from -180 to 180. The data are not
+    read, only the slices of them that fall within the box are selected.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        Dataset with *latitude* and *longitude* coordinates.
+    bbox : sequence of float
+        The box as ``(west, south, east, north)``, in degrees.
+
+    Returns
+    -------
+    xarray.Dataset
+        The subset of the dataset.
+
+    Raises
+    ------
+    WaveWatch3Error
+        If no grid points fall within the box, or the box crosses the
+        edge of the grid.
+    """
+    west, south, east, north = validate_bbox(bbox)
+
+    lon = ds.longitude.values
+    west, east = _wrap(west, lon), _wrap(east, lon)
+    if west > east:
+        raise WaveWatch3Error(f"{bbox!r}: bbox crosses the edge of the grid")
+
+    rows = _indices(ds.latitude.values, south, north)
+    cols = _indices(lon, west, east)
+    if rows is None or cols is None:
+        raise WaveWatch3Error(f"{bbox!r}: bbox does not contain any grid points")
+
+    return ds.isel(latitude=rows, longitude=cols)
+
+
+def _wrap(value, lon):
+    """Shift a longitude by multiples of 360 into the range of a grid."""
+    start = lon.min()
+    if value < start or value > lon.max():
+        value = start + (value - start) % 360.0
+    return value
+
+
+def _indices(coord, lower, upper):
+    """Slice of a monotonic coordinate that lies within a range."""
+    inside = np.flatnonzero((coord >= lower) & (coord <= upper))
+    if len(inside) == 0:
+        return None
+    return slice(inside[0], inside[-1] + 1)
@@ -0,0 +1,468 @@
+"""Tools for testing and benchmarking without a connection to NOAA.
+
+:class:`StandInServer` is a local HTTP server that serves synthetic
+WAVEWATCH III files from the same paths as the NOAA servers. Point the
+package at it by setting the ``WAVEWATCH3_MIRROR`` environment variable (or
+the ``--mirror`` option of ``ww3``) to the server's url.
+
+    >>> from bmi_wavewatch3 import WaveWatch3
+    >>> from bmi_wavewatch3.testing import StandInServer
+    >>> with StandInServer(latency=0.05) as server:  # doctest: +SKIP
+    ...     server.populate(["2010-05-01"])
+    ...     with server.mirrored():
+    ...         WaveWatch3.fetch("2010-05-01")
+"""
+import contextlib
+import datetime
+import functools
+import gzip
+import http.server
+import os
+import pathlib
+import struct
+import tempfile
+import threading
+import time
+import urllib
+
+import numpy as np
+
+from .plan import plan_downloads
+
+QUANTITY_PARAMETERS = {
+    "dp": [(10, 0, 10)],
+    "hs": [(10, 0, 3)],
+    "pdir": [(10, 0, 7)],
+    "phs": [(10, 0, 8)],
+    "ptp": [(10, 0, 9)],
+    "tp": [(10, 0, 11)],
+    "wind": [(0, 2, 2), (0, 2, 3)],
+}
+
+
+def encode_grib2(values, reference_time, step=0, parameter=(10, 0, 3)):
+    """Encode a 2D array as a GRIB2 message on a regular 1-degree grid.
+
+    Values are packed, with a precision of 0.01, as 16-bit integers.
+
+    Parameters
+    ----------
+    values : array_like
+        Values of the field, from north to south and west to east.
+    reference_time : datetime.datetime
+        Reference time of the message.
+    step : int, optional
+        Forecast time, in hours, of the message.
+    parameter : tuple of int, optional
+        The GRIB2 ``(discipline, category, number)`` of the field. The
+        default is significant wave height.
+
+    Returns
+    -------
+    bytes
+        The GRIB2 message.
+    """
+    values = np.asarray(values, dtype=float)
+    ny, nx = values.shape
+    discipline, category, number = parameter
+
+    section1 = struct.pack(
+        ">IBHHBBBHBBBBBBB",
+        *(21, 1, 7, 0, 2, 1, 1),
+        reference_time.year,
+        reference_time.month,
+        reference_time.day,
+        reference_time.hour,
+        reference_time.minute,
+        reference_time.second,
+        *(0, 1),
+    )
+    section3 = struct.pack(
+        ">IBBIBBHBBIBIBIIIIIIIBIIIIB",
+        *(72, 3, 0, nx * ny, 0, 0, 0, 6, 0, 0, 0, 0, 0, 0),
+        nx,
+        ny,
+        *(0, 0xFFFFFFFF),
+        (ny - 1) * 1000000,
+        *(0, 48, 0),
+        (nx - 1) * 1000000,
+        *(1000000, 1000000, 0),
+    )
+    section4 = struct.pack(
+        ">IBHHBBBBBHBBIBBIBBI",
+        *(34, 4, 0, 0),
+        category,
+        number,
+        *(2, 0, 0, 0, 0, 1),
+        step,
+        *(1, 0, 0, 255, 0, 0),
+    )
+
+    reference = values.min() * 100
+    packed = np.round(values.ravel() * 100 - reference).astype(">u2").tobytes()
+    section5 = struct.pack(">IBIHfHHBB", 21, 5, nx * ny, 0, reference, 0, 2, 16, 0)
+    section6 = struct.pack(">IBB", 6, 6, 255)
+    section7 = struct.pack(">IB", 5 + len(packed), 7) + packed
+
+    body = section1 + section3 + section4 + section5 + section6 + section7 + b"7777"
+    return b"GRIB" + struct.pack(">HBBQ", 0, discipline, 2, 16 + len(body)) + body
+
+
+def synthetic_month(year, month, quantity, shape=(4, 8), interval=3):
+    """Create a month of synthetic data for a WAVEWATCH III quantity.
+
+    Parameters
+    ----------
+    year, month : int
+        The month of data.
+    quantity : str
+        The WAVEWATCH III quantity (e.g. ``"hs"`` or ``"wind"``).
+    shape : tuple of int, optional
+        Number of rows and columns of the grid.
+    interval : int, optional
+        Time, in hours, between fields.
+
+    Returns
+    -------
+    bytes
+        The month of data as a series of GRIB2 messages.
+    """
+    reference_time = datetime.datetime(year, month, 1)
+    next_month = datetime.datetime(year + month // 12, month % 12 + 1, 1)
+    hours = int((next_month - reference_time).total_seconds() // 3600)
+
+    rng = np.random.default_rng(year * 12 + month)
+    messages = []
+    for step in range(0, hours, interval):
+        for parameter in QUANTITY_PARAMETERS[quantity]:
+            messages.append(
+                encode_grib2(
+                    rng.uniform(0.0, 10.0, size=shape),
+                    reference_time,
+                    step=step,
+                    parameter=parameter,
+                )
+            )
+    return b"".join(messages)
+
+
+class _StandInHandler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        if self.server.connect_latency:
+            time.sleep(self.server.connect_latency)
+
+    def do_GET(self):
+        start = time.monotonic()
+        try:
+            self._do_GET()
+        finally:
+            with self.server.lock:
+                self.server.timings.append((self.path, time.monotonic() - start))
+
+    def _do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        with self.server.lock:
+            error = self.server.errors.pop(0) if self.server.errors else None
+        if error:
+            self.send_error(error)
+            return
+
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with self.server.lock:
+            self.server.requests.append((self.path, dict(self.headers)))
+        with open(path, "rb") as fp:
+            data = fp.read()
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        last_modified = self.date_time_string(int(stat.st_mtime))
+        if self.server.validators and (
+            self.headers.get("If-None-Match") == etag
+            or self.headers.get("If-Modified-Since") == last_modified
+        ):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        start, end = 0, len(data)
+        if_range = self.headers.get("If-Range")
+        if (
+            self.server.ranges
+            and "Range" in self.headers
+            and if_range in (None, etag, last_modified)
+        ):
+            first, last = self.headers["Range"].split("=")[1].split("-")
+            start, end = int(first), min(int(last or len(data) - 1) + 1, len(data))
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+            self.send_header("Accept-Ranges", "bytes" if self.server.ranges else "none")
+        if self.server.validators:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+        body = data[start:end]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        with self.server.lock:
+            fault = self.server.faults > 0
+            self.server.faults -= fault
+        if fault:
+            self._write(body[: len(body) // 2])
+            self.close_connection = True
+        else:
+            self._write(body)
+
+    def _write(self, data):
+        if not self.server.bandwidth:
+            self.wfile.write(data)
+            return
+
+        blocksize = max(int(self.server.bandwidth // 20), 1)
+        start = time.monotonic()
+        for offset in range(0, len(data), blocksize):
+            self.wfile.write(data[offset : offset + blocksize])
+            ahead = (offset + blocksize) / self.server.bandwidth - (
+                time.monotonic() - start
+            )
+            if ahead > 0:
+                time.sleep(ahead)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    """A local stand-in for the NOAA servers.
+
+    Files are served from *root*, laid out with the same paths as on the
+    NOAA servers (see :meth:`populate`). The server understands ``Range``
+    (and ``If-Range``) requests and sends (and checks) ``ETag`` and
+    ``Last-Modified`` headers.
+
+    Parameters
+    ----------
+    root : str or path-like, optional
+        Folder to serve files from. If not provided, use a temporary folder
+        that is removed when the server is closed.
+    latency : float, optional
+        Time, in seconds, to wait before answering each request.
+    connect_latency : float, optional
+        Time, in seconds, to wait whenever a new connection is opened, to
+        mimic the cost of TCP and TLS handshakes with a remote host.
+    bandwidth : float, optional
+        Rate, in bytes per second, at which each response is sent.
+    faults : int, optional
+        Number of responses to cut off, by closing the connection, half-way
+        through their body.
+    errors : list of int, optional
+        HTTP status codes with which to answer the next requests.
+
+    Attributes
+    ----------
+    connections : int
+        Number of connections that have been opened.
+    requests : list of tuple
+        The path and headers of each request.
+    timings : list of tuple
+        The path of each request and the time, in seconds, taken to answer it.
+    ranges : bool
+        If ``False``, ignore ``Range`` requests.
+    validators : bool
+        If ``False``, do not send or check ``ETag`` and ``Last-Modified``.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        root=None,
+        latency=0.0,
+        connect_latency=0.0,
+        bandwidth=None,
+        faults=0,
+        errors=None,
+    ):
+        self._tmpdir = None
+        if root is None:
+            self._tmpdir = tempfile.TemporaryDirectory()
+            root = self._tmpdir.name
+        self.root = pathlib.Path(root)
+
+        super().__init__(
+            ("127.0.0.1", 0),
+            functools.partial(_StandInHandler, directory=str(self.root)),
+        )
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.bandwidth = bandwidth
+        self.faults = faults
+        self.errors = list(errors or [])
+        self.ranges = True
+        self.validators = True
+        self.connections = 0
+        self.requests = []
+        self.timings = []
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base url of the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving requests in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def close(self):
+        """Stop the server and remove its temporary folder, if any."""
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def reset(self):
+        """Forget the connections, requests and timings seen so far."""
+        with self.lock:
+            self.connections = 0
+            self.requests.clear()
+            self.timings.clear()
+
+    def mirror(self, url):
+        """The url on this server that mirrors a NOAA url.
+
+        Examples
+        --------
+        >>> from bmi_wavewatch3.testing import StandInServer
+        >>> with StandInServer() as server:
+        ...     url = server.mirror("https://polar.ncep.noaa.gov/a/b.grb2")
+        ...     url == server.url + "/a/b.grb2"
+        True
+        """
+        return self.url + urllib.parse.urlsplit(str(url)).path
+
+    @contextlib.contextmanager
+    def mirrored(self):
+        """Direct requests for NOAA data to this server.
+
+        Within the context, the ``WAVEWATCH3_MIRROR`` environment
+        variable is set to the url of the server.
+        """
+        prev = os.environ.get("WAVEWATCH3_MIRROR")
+        os.environ["WAVEWATCH3_MIRROR"] = self.url
+        try:
+            yield self
+        finally:
+            if prev is None:
+                del os.environ["WAVEWATCH3_MIRROR"]
+            else:
+                os.environ["WAVEWATCH3_MIRROR"] = prev
+
+    def add(self, url, data):
+        """Serve data from the path of a url.
+
+        Parameters
+        ----------
+        url : str
+            A url; only its path is used.
+        data : bytes
+            The contents of the file.
+
+        Returns
+        -------
+        pathlib.Path
+            Path to the file that is served.
+        """
+        path = self.root / urllib.parse.urlsplit(str(url)).path.lstrip("/")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return path
+
+    def populate(
+        self,
+        dates,
+        quantities=None,
+        grid=None,
+        source="multigrid",
+        shape=(4, 8),
+        interval=3,
+    ):
+        """Serve synthetic WAVEWATCH III data for some dates.
+
+        Files are created for each month that holds one of the dates, and
+        are placed at the same paths as on the NOAA server for *source*.
+        Files with a *.gz* extension are gzipped.
+
+        Parameters
+        ----------
+        dates : str or iterable of str
+            Dates as isoformat strings ("YYYY-MM-DD").
+        quantities : iterable of str, optional
+            Quantities to create. If not provided, create all of the
+            quantities of the source.
+        grid : str, optional
+            WAVEWATCH III grid. If not provided, use the source's default.
+        source : str, optional
+            Name of the data source whose layout to mirror.
+        shape : tuple of int, optional
+            Number of rows and columns of the grid.
+        interval : int, optional
+            Time, in hours, between fields.
+
+        Returns
+        -------
+        list of str
+            Urls on this server of the created files.
+        """
+        kwds = {} if grid is None else {"grid": grid}
+        urls = []
+        for url, dates_in_month in plan_downloads(
+            dates, quantities=quantities, source=source, **kwds
+        ).items():
+            name = urllib.parse.urlsplit(url).path.rsplit("/", 1)[-1]
+            quantity = name.removesuffix(".gz").split(".")[-3]
+            date = datetime.datetime.fromisoformat(dates_in_month[0])
+
+            data = synthetic_month(
+                date.year, date.month, quantity, shape=shape, interval=interval
+            )
+            if name.endswith(".gz"):
+                data = gzip.compress(data, mtime=0)
+            self.add(url, data)
+            urls.append(self.mirror(url))
+        return urls
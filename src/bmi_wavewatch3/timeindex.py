@@ -0,0 +1,216 @@
+import bisect
+import datetime
+import json
+import os
+import pathlib
+import threading
+
+import numpy as np
+
+from .lock import FileLock, lock_path
+
+TIMES_NAME = ".wavewatch3-times.json"
+
+
+class TimeIndex:
+    """Times of the steps of the monthly data files of a grid.
+
+    The layout of each month, the hours (from the start of the month) at
+    which its steps are valid, is recorded as months are opened and kept
+    in a JSON file in the cache folder, so that a date can be mapped to a
+    month and step without opening any data. Months that have not yet
+    been recorded are assumed to have a step every *interval* hours from
+    the start of the month. Evenly spaced steps are stored, and looked
+    up, as a first hour, interval and count.
+
+    Parameters
+    ----------
+    folder : str or path-like
+        The cache folder.
+    key : str
+        Identifies the data (e.g. ``"multigrid/glo_30m"``) within the file.
+    interval : int, optional
+        Hours between steps of months that have not been recorded.
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> from bmi_wavewatch3.timeindex import TimeIndex
+    >>> times = TimeIndex(tempfile.mkdtemp(), "multigrid/glo_30m")
+    >>> times.count(2010, 2)
+    224
+    >>> times.locate("2010-02-03T04")
+    (2010, 2, 18)
+    >>> times.time(2010, 2, 18).isoformat()
+    '2010-02-03T06:00:00'
+    """
+
+    def __init__(self, folder, key, interval=3):
+        self._path = pathlib.Path(folder) / TIMES_NAME
+        self._key = key
+        self._interval = interval
+        self._months = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        """Path to the file that holds the index."""
+        return self._path
+
+    def layout(self, year, month):
+        """Layout of the steps of a month.
+
+        Returns
+        -------
+        dict
+            Either the *start* hour, *interval* and *count* of evenly
+            spaced steps, or the *hours* of each step.
+        """
+        layout = self._load().get(f"{year:04d}-{month:02d}")
+        if layout is None:
+            layout = {
+                "start": 0,
+                "interval": self._interval,
+                "count": _hours_in(year, month) // self._interval,
+            }
+        return layout
+
+    def count(self, year, month):
+        """Number of steps in a month."""
+        layout = self.layout(year, month)
+        return layout["count"] if "count" in layout else len(layout["hours"])
+
+    def hours(self, year, month):
+        """Hours, from the start of a month, at which its steps are valid."""
+        layout = self.layout(year, month)
+        if "hours" in layout:
+            return np.asarray(layout["hours"], dtype=float)
+        return layout["start"] + layout["interval"] * np.arange(
+            layout["count"], dtype=float
+        )
+
+    def time(self, year, month, step):
+        """Time at which a step of a month is valid."""
+        layout = self.layout(year, month)
+        if "hours" in layout:
+            hours = layout["hours"][step]
+        else:
+            if not 0 <= step < layout["count"]:
+                raise IndexError(f"{step}: step out of range")
+            hours = layout["start"] + layout["interval"] * step
+        return datetime.datetime(year, month, 1) + datetime.timedelta(hours=hours)
+
+    def step_at(self, date):
+        """Step of a date's month at, or just after, the date.
+
+        The step may be one past the last step of the month if the date
+        is after the last step.
+        """
+        date = _as_datetime(date)
+        hours = (date - datetime.datetime(date.year, date.month, 1)) / _HOUR
+        layout = self.layout(date.year, date.month)
+        if "hours" in layout:
+            return bisect.bisect_left(layout["hours"], hours)
+        step = -(-(hours - layout["start"]) // layout["interval"])
+        return int(min(max(step, 0), layout["count"]))
+
+    def locate(self, date):
+        """Month and step of the data at, or just after, a date.
+
+        Returns
+        -------
+        tuple of int
+            The year, month and step. Dates after the last step of a month
+            are located at the first step of the following month.
+        """
+        date = _as_datetime(date)
+        year, month, step = date.year, date.month, self.step_at(date)
+        while step >= self.count(year, month):
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            step = 0
+        return year, month, step
+
+    def advance(self, year, month, step):
+        """Month and step that is some number of steps into a month.
+
+        Steps past the end of the month carry on into the months that
+        follow.
+        """
+        while step >= (count := self.count(year, month)):
+            step -= count
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return year, month, step
+
+    def record(self, year, month, ds):
+        """Record the layout of a month from its data.
+
+        Parameters
+        ----------
+        year, month : int
+            The month.
+        ds : xarray.Dataset
+            The month of data, with *time* and *step* coordinates.
+        """
+        start = np.datetime64(f"{year:04d}-{month:02d}-01", "ns")
+        valid = np.atleast_1d((ds.time + ds.step).values)
+        layout = _compact([float(hour) for hour in (valid - start) / _NP_HOUR])
+        if self._load().get(f"{year:04d}-{month:02d}") == layout:
+            return
+
+        with self._lock, FileLock(lock_path(self._path)):
+            data = _read(self._path)
+            data.setdefault(self._key, {})[f"{year:04d}-{month:02d}"] = layout
+            part = self._path.with_name(self._path.name + ".part")
+            part.write_text(json.dumps(data, indent=1, sort_keys=True))
+            os.replace(part, self._path)
+            self._months = data[self._key]
+
+    def _load(self):
+        if self._months is None:
+            with self._lock:
+                if self._months is None:
+                    self._months = _read(self._path).get(self._key, {})
+        return self._months
+
+
+_HOUR = datetime.timedelta(hours=1)
+_NP_HOUR = np.timedelta64(1, "h")
+
+
+def _read(path):
+    try:
+        with open(path) as fp:
+            data = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _compact(hours):
+    """Layout of steps, as a start, interval and count if evenly spaced."""
+    if len(hours) > 1:
+        intervals = {b - a for a, b in zip(hours[:-1], hours[1:])}
+        if len(intervals) == 1 and (interval := intervals.pop()) > 0:
+            return {"start": hours[0], "interval": interval, "count": len(hours)}
+    return {"hours": hours}
+
+
+def _hours_in(year, month):
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return int(
+        (
+            datetime.datetime(next_year, next_month, 1)
+            - datetime.datetime(year, month, 1)
+        )
+        / _HOUR
+    )
+
+
+def _as_datetime(date):
+    if isinstance(date, str):
+        return datetime.datetime.fromisoformat(date)
+    elif isinstance(date, datetime.datetime):
+        return date
+    elif isinstance(date, datetime.date):
+        return datetime.datetime(date.year, date.month, date.day)
+    return datetime.datetime.fromisoformat(str(np.datetime64(date, "s")))
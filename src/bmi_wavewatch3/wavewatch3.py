@@ -2,16 +2,30 @@ import contextlib
 import datetime
 import os
 import pathlib
+import threading
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
-from multiprocessing import Pool
 
-import numpy as np
-import xarray as xr
 from dateutil.relativedelta import relativedelta
 
-from .downloader import WaveWatch3Downloader
-from .errors import ChoiceError
-from .source import SOURCES
+from .cache import CacheIndex, parse_name, parse_size
+from .datasets import get_dataset_cache
+from .decoded import open_decoded, validate_format
+from .downloader import WaveWatch3Downloader, gather_per_host
+from .errors import ChoiceError, DateValueError
+from .executor import get_executor
+from .gribindex import build_indexes, open_grib
+from .inventory import subset_file_part
+from .plan import iter_months, plan_downloads, plan_range
+from .points import METHODS, PointIndex, iter_points, wet_cells
+from .scheduler import AdaptiveScheduler
+from .series import concat_months
+from .source import SOURCES, quantities_of
+from .storage import validate_storage
+from .subset import subset_bbox, validate_bbox
+from .timeindex import TimeIndex
 
 
 class WaveWatch3:
@@ -22,6 +36,18 @@ class WaveWatch3:
         cache="~/.wavewatch3/data",
         lazy=True,
         source="multigrid",
+        prefetch=0,
+        prefetch_index=False,
+        executor=None,
+        cache_quota=None,
+        decoded_cache=None,
+        index_dir=None,
+        storage=None,
+        quantities=None,
+        variables=None,
+        chunks=None,
+        parallel=False,
+        bbox=None,
     ):
         """Advance through WAVEWATCH III data, downloading new data as needed.
 
@@ -37,20 +63,119 @@ class WaveWatch3:
             If ``True``, wait to download data until the xarray Dataset is first accessed.
         source : str, optional
             Source from which to download data from.
+        prefetch : int, optional
+            Number of months, following the current month, to download in a
+            background thread so that the data are ready by the time they
+            are needed.
+        prefetch_index : bool, optional
+            If ``True``, also build the *cfgrib* index of the prefetched
+            files in the background.
+        executor : Executor, optional
+            Executor used to download data files. If not provided, use the
+            default executor (see :func:`~bmi_wavewatch3.executor.get_executor`).
+        cache_quota : int or str, optional
+            Largest size of the cache, in bytes (or as a string like
+            ``"20G"``), including the indexes and decompressed and decoded
+            copies of the data files. Once data are downloaded, the least
+            recently used files are removed to bring the cache within the
+            quota. The files that are in use, by this or any other running
+            instance, are never removed. If not provided, use the value of
+            the ``WAVEWATCH3_CACHE_QUOTA`` environment variable, if set.
+        decoded_cache : {"netcdf", "zarr"}, optional
+            If provided, the first time a month of data is loaded, write the
+            decoded data to a NetCDF4 file or Zarr store, next to the
+            downloaded files, and read it in place of the GRIB files when
+            the month is loaded again. If not provided, use the value of the
+            ``WAVEWATCH3_DECODED_CACHE`` environment variable, if set.
+        index_dir : str or path-like, optional
+            Folder in which to keep the *cfgrib* index files of the data
+            files (which allows the cache to be read-only). If not provided,
+            use the value of the ``WAVEWATCH3_INDEX_DIR`` environment
+            variable or, if that is not set, keep the index files next to
+            the data files.
+        storage : {"plain", "gzip", "zstd"}, optional
+            Format in which to keep downloaded files in the cache. Compressed
+            files are read from decompressed copies, in a hidden folder of
+            the cache, that are removed once the month is no longer in use.
+            If not provided, use the value of the ``WAVEWATCH3_STORAGE``
+            environment variable or, if that is not set, keep the files
+            uncompressed.
+        quantities : iterable of str, optional
+            Quantities (e.g. ``"hs"``) to download and load. If not
+            provided (and neither are *variables*), load all of the
+            quantities of the source.
+        variables : iterable of str, optional
+            Data variables (e.g. ``"swh"``) to load. Only the files that
+            hold these variables (along with any *quantities*) are
+            downloaded and opened.
+        chunks : str, int or dict, optional
+            How the data are split into chunks that are read, and decoded,
+            as they are needed. Use ``"messages"`` to read each step of each
+            variable separately, a dict of sizes (e.g.
+            ``{"latitude": 90, "longitude": 180}``) to read spatial tiles of
+            each step, or any value accepted by :func:`xarray.open_dataset`.
+            If not provided, each variable is read a month at a time.
+        parallel : bool, optional
+            If ``True``, open the files of a month in parallel.
+        bbox : sequence of float, optional
+            Bounding box, ``(west, south, east, north)`` in degrees, of the
+            part of the grid to load. If not provided, load the entire grid.
         """
         try:
             Source = SOURCES[source]
         except KeyError:
             raise ChoiceError(source, SOURCES)
+        if prefetch < 0:
+            raise ValueError("prefetch must be non-negative")
+        if cache_quota is None:
+            cache_quota = os.environ.get("WAVEWATCH3_CACHE_QUOTA") or None
+        if decoded_cache is None:
+            decoded_cache = os.environ.get("WAVEWATCH3_DECODED_CACHE") or None
+        if decoded_cache is not None:
+            validate_format(decoded_cache)
+        if storage is None:
+            storage = os.environ.get("WAVEWATCH3_STORAGE") or "plain"
+        self._storage = validate_storage(storage)
+        self._bbox = None if bbox is None else validate_bbox(bbox)
         self._source = source
+        self._decoded_cache = decoded_cache
+        self._index_dir = index_dir or os.environ.get("WAVEWATCH3_INDEX_DIR") or None
         self._cache = pathlib.Path(cache).expanduser()
+        self._cache_quota = None if cache_quota is None else parse_size(cache_quota)
+        self._index = CacheIndex(self._cache, index_dir=self._index_dir)
+        self._times = TimeIndex(
+            self._cache, f"{source}/{grid}", interval=Source.INTERVAL
+        )
+        self._pins = {}
+        self._pins_lock = threading.Lock()
+        self._token = uuid.uuid4().hex
+        self._unpin = weakref.finalize(self, self._index.unpin, self._token)
         self._lazy = lazy
+        self._chunks = chunks
+        self._parallel = parallel
         self._data = None
+        self._held = []
+        self._release = weakref.finalize(
+            self, _release_all, self._held, close=self._storage != "plain"
+        )
         self._date = None
         self._step = 0
+        self._prefetch = prefetch
+        self._prefetch_index = prefetch_index
+        self._prefetched = {}
+        self._prefetcher = None
+        self._executor = executor
 
+        if quantities is None and variables is None:
+            quantities = Source.QUANTITIES
+        else:
+            quantities = sorted(
+                set(quantities or ()) | set(quantities_of(variables or ()))
+            )
+            for quantity in quantities:
+                Source.validate_quantity(quantity)
         self._urls = [
-            Source(date, quantity=quantity, grid=grid) for quantity in Source.QUANTITIES
+            Source(date, quantity=quantity, grid=grid) for quantity in quantities
         ]
         self.date = date
         if not lazy:
@@ -72,26 +197,29 @@ class WaveWatch3:
         if step < 0:
             raise ValueError("step must be non-negative")
 
-        if step < len(self.data.step):
-            self._step = step
-            self.date = str(
-                (self.data.time + self.data.step[step]).values.astype("datetime64[h]")
-            )
-        else:
-            remaining = step - len(self._data.step)
-            self.inc()
-            self.step = remaining
+        year, month, step = self._times.advance(self.year, self.month, step)
+        self.date = self._times.time(year, month, step).isoformat()
 
     @property
     def source(self):
         """Source from which data will be downloaded."""
         return self._source
 
+    @property
+    def quantities(self):
+        """The quantities that are loaded."""
+        return tuple(url.quantity for url in self._urls)
+
     @property
     def grid(self):
         """The WAVEWATCH III grid region."""
         return self._urls[0].grid
 
+    @property
+    def bbox(self):
+        """Bounding box of the part of the grid that is loaded, if any."""
+        return self._bbox
+
     @property
     def date(self):
         """Current date as an isoformatted string."""
@@ -100,12 +228,19 @@ class WaveWatch3:
     @date.setter
     def date(self, date):
         new_date = datetime.datetime.fromisoformat(date)
-        if new_date != self._date:
-            self._date = new_date
+        if new_date == self._date:
+            return
+        same_month = self._date is not None and (new_date.year, new_date.month) == (
+            self._date.year,
+            self._date.month,
+        )
+        self._date = new_date
+        self._step = self._times.step_at(new_date)
+        if not same_month:
             for url in self._urls:
                 url.month = new_date.month
                 url.year = new_date.year
-            self._data = None
+            self._release_data()
             if not self._lazy:
                 self._load_data()
 
@@ -138,22 +273,240 @@ class WaveWatch3:
         self.date = (self._date + relativedelta(months=months)).isoformat()
 
     def _load_data(self):
-        """Load the current data into an xarray Dataset."""
-        self._fetch_data()
-        self._data = xr.open_mfdataset(
-            [self._cache / url.filename for url in self._urls],
-            engine="cfgrib",
-            parallel=False,
-        )
-        self._step = np.searchsorted(
-            self._data.step, np.datetime64(self.date, "ns") - self._data.time
+        """Load the current data into an xarray Dataset.
+
+        Datasets are shared through the process's cache of open datasets
+        (see :func:`~bmi_wavewatch3.datasets.get_dataset_cache`) so that
+        returning to a recently used month does not open its files again.
+        Months read from compressed files are instead closed once they are
+        no longer in use so that their decompressed copies are removed.
+        """
+        paths = self._fetch_data()
+        key = self._dataset_key(paths)
+        data = get_dataset_cache().acquire(key, partial(self._open_month, paths))
+        self._release_data()
+        self._data = data
+        self._held.append(key)
+        self._times.record(self.year, self.month, data)
+        self._step = self._times.step_at(self._date)
+
+    def seek(self, date):
+        """Move to the step of the data at, or just after, a date.
+
+        The month and step are found from the time index of the cache
+        (see :class:`~bmi_wavewatch3.timeindex.TimeIndex`) without reading
+        any data, which are only loaded when they are next accessed.
+
+        Parameters
+        ----------
+        date : str or datetime.datetime
+            The date to move to.
+
+        Returns
+        -------
+        int
+            The step, within its month, of the data at the date.
+
+        Examples
+        --------
+        >>> import tempfile
+        >>> from bmi_wavewatch3 import WaveWatch3
+        >>> with tempfile.TemporaryDirectory() as cache:
+        ...     ww3 = WaveWatch3("2010-05-01", cache=cache)
+        ...     ww3.seek("2010-07-04T10")
+        ...     ww3.close()
+        28
+        >>> ww3.date
+        '2010-07-04T12'
+        """
+        year, month, step = self._times.locate(date)
+        self.date = self._times.time(year, month, step).isoformat()
+        return self._step
+
+    @property
+    def time_index(self):
+        """The :class:`~bmi_wavewatch3.timeindex.TimeIndex` of the data."""
+        return self._times
+
+    def _dataset_key(self, paths):
+        """Key that identifies the dataset opened from some data files."""
+        files = []
+        for path in sorted(pathlib.Path(path).absolute() for path in paths):
+            stat = path.stat()
+            files.append((str(path), stat.st_size, stat.st_mtime_ns))
+        return (
+            tuple(files),
+            self._decoded_cache,
+            self._index_dir,
+            repr(self._chunks),
+            self._bbox,
         )
 
+    def _release_data(self):
+        """Hand the current data back to the cache of open datasets."""
+        self._data = None
+        _release_all(self._held, close=self._storage != "plain")
+
+    def _open_month(self, paths):
+        """Open the data files of a month as an xarray Dataset."""
+        if self._decoded_cache is None:
+            ds = open_grib(
+                paths,
+                index_dir=self._index_dir,
+                chunks=self._chunks,
+                parallel=self._parallel,
+            )
+        else:
+            ds = open_decoded(
+                paths,
+                format=self._decoded_cache,
+                open_grib=partial(
+                    open_grib, index_dir=self._index_dir, parallel=self._parallel
+                ),
+                chunks=self._chunks,
+            )
+        if self._bbox is not None:
+            ds = subset_bbox(ds, self._bbox)
+        return ds
+
+    def _read_month(self, month):
+        """Download, if needed, and open the data of some other month."""
+        urls = [
+            str(type(url)(month, quantity=url.quantity, grid=url.grid))
+            for url in self._urls
+        ]
+        return self._open_month(self._fetch_month(urls))
+
     def _fetch_data(self):
-        """Download data in parallel."""
-        self._cache.mkdir(parents=True, exist_ok=True)
-        with as_cwd(self._cache):
-            Pool().map(WaveWatch3Downloader.retreive, [str(url) for url in self._urls])
+        """Download data in parallel.
+
+        If the data for the current month are being prefetched, wait for
+        them rather than starting another download. Once the current data
+        are available, start prefetching the months that follow.
+
+        Returns
+        -------
+        list of pathlib.Path
+            Paths to the local data files.
+        """
+        self._pin(keep={(self.year, self.month)} | set(self._prefetched))
+
+        future = self._prefetched.pop((self.year, self.month), None)
+        paths = None
+        if future is not None:
+            try:
+                paths = future.result()
+            except Exception:
+                pass
+            else:
+                self._evict()
+        if paths is None:
+            paths = self._fetch_month([str(url) for url in self._urls])
+
+        if self._prefetch:
+            self._start_prefetch()
+
+        return paths
+
+    def _pin(self, names=(), keep=None):
+        """Protect data files from eviction while this instance uses them.
+
+        Parameters
+        ----------
+        names : iterable of str, optional
+            Names of data files to pin.
+        keep : set of tuple of int, optional
+            If provided, unpin the files of all months, as ``(year, month)``,
+            not in the set.
+        """
+        with self._pins_lock:
+            for name in names:
+                year, month = parse_name(name)[2].split("-")
+                self._pins.setdefault((int(year), int(month)), set()).add(name)
+            if keep is not None:
+                for key in set(self._pins) - keep:
+                    del self._pins[key]
+            self._index.pin(self._token, set().union(*self._pins.values()))
+
+    def _evict(self):
+        """Bring the cache within its quota."""
+        if self._cache_quota is not None:
+            self._index.evict(self._cache_quota)
+
+    def _fetch_month(self, urls, index=False):
+        """Download the data files for a month into the cache."""
+        names = [
+            WaveWatch3Downloader.local_file_part(url, storage=self._storage)
+            for url in urls
+        ]
+        self._pin(names)
+        self._index.lookup(names)
+
+        executor = get_executor() if self._executor is None else self._executor
+        paths = executor.map(
+            partial(
+                _retreive_into, self._cache, index=self._index, storage=self._storage
+            ),
+            urls,
+        )
+        self._evict()
+        if index:
+            build_indexes(paths, index_dir=self._index_dir, executor=executor)
+        return paths
+
+    def _start_prefetch(self):
+        """Start downloading the months that follow the current month."""
+        current = datetime.datetime(self.year, self.month, 1)
+        months = [current + relativedelta(months=n) for n in range(self._prefetch + 1)]
+        keep = {(month.year, month.month) for month in months}
+
+        for key in list(self._prefetched):
+            if key not in keep:
+                self._prefetched.pop(key).cancel()
+
+        if self._prefetcher is None:
+            self._prefetcher = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="wavewatch3-prefetch"
+            )
+
+        for month in months[1:]:
+            key = (month.year, month.month)
+            if key in self._prefetched:
+                continue
+            try:
+                urls = [
+                    str(type(url)(month.isoformat(), url.quantity, grid=url.grid))
+                    for url in self._urls
+                ]
+            except DateValueError:
+                break
+            self._prefetched[key] = self._prefetcher.submit(
+                self._fetch_month, urls, index=self._prefetch_index
+            )
+
+    def close(self):
+        """Stop prefetching data and release the files in use.
+
+        Downloads that have not yet started are cancelled. A download
+        that is underway is allowed to finish. The data files are no
+        longer protected from eviction and the current data are closed.
+        """
+        for future in self._prefetched.values():
+            future.cancel()
+        self._prefetched.clear()
+        if self._prefetcher is not None:
+            self._prefetcher.shutdown(wait=False, cancel_futures=True)
+            self._prefetcher = None
+        with self._pins_lock:
+            self._pins.clear()
+            self._unpin()
+        self._release_data()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     def __repr__(self):
         """String representation of a WaveWatch3 instance."""
@@ -168,8 +521,144 @@ class WaveWatch3:
             and self.source == other.source
         )
 
+    @classmethod
+    def open_range(cls, start, end, **kwds):
+        """Open the WAVEWATCH III data of a range of months as one dataset.
+
+        The months are joined, lazily, along a continuous time axis. Only
+        the first month is downloaded and opened up front, for its
+        coordinates and metadata. The data of the other months are
+        downloaded and read, a month at a time, when they are computed
+        (with *dask*) so that a long time series can be analyzed as a
+        single dataset.
+
+        Parameters
+        ----------
+        start, end : str
+            First and last (inclusive) months of the range, as isoformat
+            strings ("YYYY-MM" or "YYYY-MM-DD").
+        **kwds
+            Keywords (e.g. *cache*, *grid*, *variables* or *bbox*) that
+            select and load the data as for :class:`WaveWatch3`.
+
+        Returns
+        -------
+        xarray.Dataset
+            The data with a *time* dimension of the times at which they
+            are valid. Close the dataset to release the data files.
+
+        Examples
+        --------
+        >>> from bmi_wavewatch3 import WaveWatch3
+        >>> with WaveWatch3.open_range(
+        ...     "2009-12", "2010-02", variables=["swh"]
+        ... ) as ds:
+        ...     winter = ds.swh.mean(dim="time").compute()  # doctest: +SKIP
+        """
+        months = list(iter_months(start, end))
+        if not months:
+            raise DateValueError(f"{start}, {end}: end is before start")
+
+        ww3 = cls(months[0], **kwds)
+        try:
+            ds = concat_months(ww3.data, months, ww3._read_month)
+        except Exception:
+            ww3.close()
+            raise
+        ds.set_close(ww3.close)
+        return ds
+
+    @classmethod
+    def extract_points(
+        cls, lats, lons, start, end, method="nearest", names=None, **kwds
+    ):
+        """Extract time series of WAVEWATCH III data at points.
+
+        The grid cells from which to sample each point are found once,
+        with points that fall on land moved to the nearest wet cell. The
+        values at all of the points are then gathered from each GRIB
+        message at once. The results are generated a month at a time so
+        that long time series, at many points, can be written out (see
+        :func:`~bmi_wavewatch3.points.write_points`) without holding them
+        in memory.
+
+        Parameters
+        ----------
+        lats, lons : array_like of float
+            Latitudes and longitudes, in degrees, of the points.
+        start, end : str
+            First and last (inclusive) months of the time series, as
+            isoformat strings ("YYYY-MM" or "YYYY-MM-DD").
+        method : {"nearest", "bilinear"}, optional
+            Take the value of the nearest grid cell, or interpolate
+            between the four surrounding grid cells.
+        names : array_like, optional
+            Names of the points. If not provided, the points are numbered.
+        **kwds
+            Keywords (e.g. *cache*, *grid* or *variables*) that select and
+            load the data as for :class:`WaveWatch3`. Unless *chunks* is
+            given, the data are read a GRIB message at a time.
+
+        Returns
+        -------
+        iterator of pandas.DataFrame
+            The values at the points, a month at a time, with *time*,
+            *point*, *latitude* and *longitude* columns along with a column
+            for each data variable.
+
+        Examples
+        --------
+        >>> from bmi_wavewatch3 import WaveWatch3
+        >>> from bmi_wavewatch3.points import write_points
+        >>> frames = WaveWatch3.extract_points(
+        ...     [46.1, 41.8], [-124.5, -124.4], "2009-01", "2019-12",
+        ...     variables=["swh", "perpw", "dirpw"],
+        ... )  # doctest: +SKIP
+        >>> write_points(frames, "buoys.parquet")  # doctest: +SKIP
+        """
+        months = list(iter_months(start, end))
+        if not months:
+            raise DateValueError(f"{start}, {end}: end is before start")
+        if method not in METHODS:
+            raise ChoiceError(method, METHODS)
+        if names is not None and len(names) != len(lats):
+            raise ValueError("names and lats must be the same length")
+
+        kwds.setdefault("chunks", "messages")
+        ww3 = cls(months[0], **kwds)
+        try:
+            index = PointIndex(
+                lats,
+                lons,
+                ww3.data.latitude,
+                ww3.data.longitude,
+                wet=wet_cells(ww3.data),
+                method=method,
+            )
+        except Exception:
+            ww3.close()
+            raise
+        return _closing(ww3, iter_points(ww3, months, index, names=names))
+
     @staticmethod
-    def fetch(date, folder=".", force=False, grid="glo_30m", source="multigrid"):
+    def fetch(
+        date,
+        folder=".",
+        force=False,
+        grid="glo_30m",
+        source="multigrid",
+        engine=None,
+        revalidate=False,
+        time_range=None,
+        variables=None,
+        max_concurrency=8,
+        rate_limit=None,
+        executor=None,
+        quota=None,
+        index=False,
+        index_dir=None,
+        storage="plain",
+    ):
         """Fetch WAVEWATCH III data by date.
 
         Parameters
@@ -181,36 +670,363 @@ class WaveWatch3:
         force : bool, optional
             If ``True`` download the data even if the file to be downloaded
             already exists in the destination folder.
+        revalidate : bool, optional
+            If ``True``, check with the server whether files that already
+            exist in the destination folder have changed (using the validators
+            saved when they were downloaded) and download them again if they
+            have. Only whole files can be revalidated so *revalidate* can
+            not be combined with *time_range* or *variables*.
         grid : str, optional
             The WAVEWATCH III grid to download.
+        source : str, optional
+            Source from which to download data from.
+        engine : HttpEngine or UrllibEngine, optional
+            Engine used to download the data. If not provided, use the
+            default engine, which reuses connections between downloads.
+        time_range : tuple of str, optional
+            Start and end (inclusive) of the times to fetch, as isoformatted
+            strings. If provided (or if *variables* is), only the GRIB
+            messages within the range are downloaded, rather than whole
+            monthly files.
+        variables : iterable of str, optional
+            Names of the variables to fetch (e.g. ``"swh"``).
+        max_concurrency : int, optional
+            Maximum number of simultaneous downloads. The number of downloads
+            actually run at once is adjusted, up to this limit, based on the
+            observed throughput and failures.
+        rate_limit : float, optional
+            Cap, in bytes per second, on the combined rate of all downloads.
+        executor : Executor, optional
+            Executor that runs the downloads. If not provided, downloads run
+            in a pool of *max_concurrency* threads. With a *process*
+            executor, each worker process uses its own default engine so
+            neither *engine* nor *rate_limit* may be given.
+        quota : int or str, optional
+            Largest size, in bytes (or as a string like ``"20G"``), of the
+            data files in *folder*, along with their indexes and decompressed
+            and decoded copies. Once the data are fetched, the least
+            recently used files, other than the ones just fetched and the
+            ones in use by a :class:`WaveWatch3` instance, are removed to
+            bring the folder within the quota.
+        index : bool, optional
+            If ``True``, once the data are fetched, build the *cfgrib*
+            indexes of the files, in parallel, so that opening them later
+            does not require scanning them.
+        index_dir : str or path-like, optional
+            Folder in which to write the *cfgrib* index files (implies
+            *index*). If not provided, they are written next to the data
+            files. Pass the same folder as the *index_dir* of
+            :class:`WaveWatch3` to use them.
+        storage : {"plain", "gzip", "zstd"}, optional
+            Format in which to keep the downloaded files. Files that are
+            kept compressed are named with a *.gz* or *.zst* extension. Only
+            whole files, not subsets, are compressed.
 
         Returns
         -------
         list of path-like
-            The downloaded (or cached) data files.
+            The downloaded (or cached) data files. Each file is downloaded,
+            and listed, just once even if it holds data for several dates.
+
+        Notes
+        -----
+        Downloaded files are recorded in the cache index of *folder* (see
+        :class:`~bmi_wavewatch3.cache.CacheIndex`), which is then used to
+        find the files that are already cached. Files that are removed
+        from the folder by other means are noticed once the index is
+        synced (``ww3 cache sync``).
+
+        Examples
+        --------
+        Fetch three days of significant wave height, downloading only the
+        parts of the monthly file that are needed.
+
+        >>> from bmi_wavewatch3 import WaveWatch3
+        >>> WaveWatch3.fetch(
+        ...     "2010-05-01",
+        ...     time_range=("2010-05-01", "2010-05-03"),
+        ...     variables=["swh"],
+        ... )  # doctest: +SKIP
         """
-        dates = [date] if isinstance(date, str) else date
         folder = pathlib.Path(folder)
+        urls = list(plan_downloads(date, grid=grid, source=source))
+        validate_storage(storage)
 
-        try:
-            Source = SOURCES[source]
-        except KeyError:
-            raise ChoiceError(source, SOURCES)
+        subset = time_range is not None or variables is not None
+        if subset and revalidate:
+            raise ValueError("revalidate can not be used with time_range or variables")
+        in_process = _check_executor(executor, engine=engine, rate_limit=rate_limit)
+
+        scheduler = AdaptiveScheduler(
+            max_concurrency=max_concurrency, rate_limit=rate_limit
+        )
+
+        cache_index = CacheIndex(folder, index_dir=index_dir)
+        if subset:
+            names = {
+                url: subset_file_part(
+                    WaveWatch3Downloader.url_file_part(url),
+                    time_range=time_range,
+                    variables=variables,
+                )
+                for url in urls
+            }
+            retreive = partial(
+                _retreive_subset_into,
+                folder,
+                time_range=time_range,
+                variables=variables,
+                force=force,
+                engine=engine,
+                index=cache_index,
+            )
+        else:
+            names = {
+                url: WaveWatch3Downloader.local_file_part(url, storage=storage)
+                for url in urls
+            }
+            retreive = partial(
+                _retreive_into,
+                folder,
+                force=force,
+                engine=engine,
+                revalidate=revalidate,
+                index=cache_index,
+                storage=storage,
+            )
+        if in_process:
+            retreive = partial(_metered, retreive, scheduler.meter)
+
+        cached = set() if force or revalidate else cache_index.lookup(names.values())
+        paths = scheduler.map(
+            retreive,
+            [url for url in urls if names[url] not in cached],
+            executor=executor,
+        )
+
+        if subset:
+            paths = sorted(
+                [folder / name for name in cached]
+                + [folder / path.name for path in paths if path is not None]
+            )
+        else:
+            paths = sorted(folder / names[url] for url in urls)
+
+        if quota is not None:
+            cache_index.evict(quota, keep=[path.name for path in paths])
+
+        if index or index_dir is not None:
+            build_indexes(paths, index_dir=index_dir, executor=executor)
+
+        return paths
+
+    @staticmethod
+    def prefetch(
+        start,
+        end,
+        folder=".",
+        quantities=None,
+        grid="glo_30m",
+        source="multigrid",
+        force=False,
+        engine=None,
+        max_concurrency=8,
+        rate_limit=None,
+        executor=None,
+        storage="plain",
+    ):
+        """Fetch all of the WAVEWATCH III data files for a range of months.
+
+        The files to download are generated month by month, checked
+        against the cache index of *folder* a chunk at a time, and passed
+        on to the downloaders as they are needed so that a range may span
+        many years without building the whole plan in memory.
+
+        Parameters
+        ----------
+        start, end : str
+            First and last (inclusive) months to fetch, as isoformat strings
+            ("YYYY-MM" or "YYYY-MM-DD").
+        folder : str or path-like, optional
+            Destination folder into which to download data.
+        quantities : iterable of str, optional
+            Quantities to fetch. If not provided, fetch all of the
+            quantities of the source.
+        grid : str, optional
+            The WAVEWATCH III grid to download.
+        source : str, optional
+            Source from which to download data from.
+        force : bool, optional
+            If ``True`` download the data even if they are already cached.
+        engine : HttpEngine or UrllibEngine, optional
+            Engine used to download the data.
+        max_concurrency : int, optional
+            Maximum number of simultaneous downloads.
+        rate_limit : float, optional
+            Cap, in bytes per second, on the combined rate of all downloads.
+        executor : Executor, optional
+            Executor that runs the downloads (see :meth:`fetch`).
+        storage : {"plain", "gzip", "zstd"}, optional
+            Format in which to keep the downloaded files.
+
+        Returns
+        -------
+        list of path-like
+            The files that were downloaded. Files that were already cached
+            are not listed.
+
+        Examples
+        --------
+        >>> from bmi_wavewatch3 import WaveWatch3
+        >>> WaveWatch3.prefetch(
+        ...     "2005-02", "2019-05", quantities=["hs"]
+        ... )  # doctest: +SKIP
+        """
+        folder = pathlib.Path(folder)
+        urls = plan_range(start, end, quantities=quantities, grid=grid, source=source)
+        validate_storage(storage)
+        in_process = _check_executor(executor, engine=engine, rate_limit=rate_limit)
 
-        urls = []
-        for date in dates:
-            urls += [
-                Source(date, quantity=quantity, grid=grid)
-                for quantity in Source.QUANTITIES
-            ]
-
-        with as_cwd(folder):
-            Pool().map(
-                partial(WaveWatch3Downloader.retreive, force=force),
-                [str(url) for url in urls],
+        scheduler = AdaptiveScheduler(
+            max_concurrency=max_concurrency, rate_limit=rate_limit
+        )
+        cache_index = CacheIndex(folder)
+        if not force:
+            urls = cache_index.missing(
+                urls,
+                key=partial(WaveWatch3Downloader.local_file_part, storage=storage),
             )
 
-        return sorted(folder / url.filename for url in urls)
+        retreive = partial(
+            _retreive_into,
+            folder,
+            force=force,
+            engine=engine,
+            index=cache_index,
+            storage=storage,
+        )
+        if in_process:
+            retreive = partial(_metered, retreive, scheduler.meter)
+
+        return scheduler.map(retreive, urls, executor=executor)
+
+    @staticmethod
+    async def afetch(
+        date,
+        folder=".",
+        force=False,
+        grid="glo_30m",
+        source="multigrid",
+        engine=None,
+        max_per_host=4,
+        revalidate=False,
+        storage="plain",
+    ):
+        """Fetch WAVEWATCH III data by date without blocking the event loop.
+
+        This is the asynchronous version of :meth:`fetch`. Downloads run in
+        worker threads, with at most *max_per_host* requests in flight to
+        any one host.
+
+        Parameters
+        ----------
+        date : str or iterable of str
+            Date or list of dates isoformat strings ("YYYY-MM-DD").
+        folder : str or path-like, optional
+            Destination folder into which to download data.
+        force : bool, optional
+            If ``True`` download the data even if the file to be downloaded
+            already exists in the destination folder.
+        revalidate : bool, optional
+            If ``True``, check with the server whether files that already
+            exist in the destination folder have changed (using the validators
+            saved when they were downloaded) and download them again if they
+            have.
+        grid : str, optional
+            The WAVEWATCH III grid to download.
+        source : str, optional
+            Source from which to download data from.
+        engine : HttpEngine or UrllibEngine, optional
+            Engine used to download the data.
+        max_per_host : int, optional
+            Maximum number of simultaneous downloads from a single host.
+        storage : {"plain", "gzip", "zstd"}, optional
+            Format in which to keep the downloaded files.
+
+        Returns
+        -------
+        list of path-like
+            The downloaded (or cached) data files. Each file is downloaded,
+            and listed, just once even if it holds data for several dates.
+        """
+        folder = pathlib.Path(folder)
+        urls = list(plan_downloads(date, grid=grid, source=source))
+
+        validate_storage(storage)
+        names = {
+            url: WaveWatch3Downloader.local_file_part(url, storage=storage)
+            for url in urls
+        }
+
+        index = CacheIndex(folder)
+        cached = set() if force or revalidate else index.lookup(names.values())
+        await gather_per_host(
+            lambda url: WaveWatch3Downloader.retreive(
+                url,
+                filename=folder / WaveWatch3Downloader.url_file_part(url),
+                force=force,
+                engine=engine,
+                revalidate=revalidate,
+                index=index,
+                storage=storage,
+            ),
+            [url for url in urls if names[url] not in cached],
+            max_per_host=max_per_host,
+        )
+
+        return sorted(folder / name for name in names.values())
+
+
+def _retreive_into(folder, url, **kwds):
+    """Download a url into a folder."""
+    return WaveWatch3Downloader.retreive(
+        url,
+        filename=pathlib.Path(folder) / WaveWatch3Downloader.url_file_part(url),
+        **kwds,
+    )
+
+
+def _retreive_subset_into(folder, url, time_range=None, variables=None, **kwds):
+    """Download part of a url into a folder."""
+    filename = pathlib.Path(folder) / subset_file_part(
+        WaveWatch3Downloader.url_file_part(url),
+        time_range=time_range,
+        variables=variables,
+    )
+    return WaveWatch3Downloader.retreive_subset(
+        url, filename=filename, time_range=time_range, variables=variables, **kwds
+    )
+
+
+def _check_executor(executor, engine=None, rate_limit=None):
+    """Check that downloads can be run by an executor.
+
+    Returns
+    -------
+    bool
+        ``True`` if the downloads run within this process.
+    """
+    in_process = executor is None or executor.backend != "process"
+    if not in_process and (engine is not None or rate_limit is not None):
+        raise ValueError(
+            "engine and rate_limit can not be used with a process executor"
+        )
+    return in_process
+
+
+def _metered(func, meter, url):
+    """Call a download function with a new reporthook from *meter*."""
+    return func(url, reporthook=meter())
 
 
 @contextlib.contextmanager
@@ -224,3 +1040,15 @@ def as_cwd(path):
     os.chdir(path)
     yield prev_cwd
     os.chdir(prev_cwd)
+
+
+def _release_all(keys, close=False):
+    """Hand datasets back to the cache of open datasets."""
+    while keys:
+        get_dataset_cache().release(keys.pop(), close=close)
+
+
+def _closing(ww3, items):
+    """Generate items, closing a WaveWatch3 instance once they are done."""
+    with ww3:
+        yield from items
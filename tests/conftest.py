@@ -0,0 +1,44 @@
+import pytest
+
+from bmi_wavewatch3.testing import StandInServer, encode_grib2
+
+
+@pytest.fixture
+def http_server(tmp_path):
+    """A local HTTP/1.1 server that serves files from a temporary folder.
+
+    Files placed in ``server.root`` can be downloaded from ``server.url``.
+    Set ``server.faults`` to the number of responses that should be cut off
+    half-way through, ``server.ranges`` to ``False`` to ignore ``Range``
+    requests and ``server.validators`` to ``False`` to not send (or check)
+    ``ETag`` and ``Last-Modified`` headers.
+    """
+    root = tmp_path / "www"
+    root.mkdir()
+
+    with StandInServer(root) as server:
+        yield server
+
+
+@pytest.fixture
+def noaa_server(http_server, monkeypatch):
+    """A stand-in for the NOAA servers.
+
+    Requests for WAVEWATCH III data are directed to the ``http_server``,
+    which serves the synthetic files created with ``server.populate``.
+    """
+    monkeypatch.setenv("WAVEWATCH3_MIRROR", http_server.url)
+    return http_server
+
+
+@pytest.fixture
+def grib2():
+    """Encode arrays as GRIB2 messages.
+
+    The fixture is a function, ``grib2(values, reference_time, step=0,
+    parameter=(10, 0, 3))``, that returns the bytes of a GRIB2 message that
+    holds the 2D array *values* valid *step* hours after *reference_time*.
+    *parameter* is the ``(discipline, category, number)`` of the field,
+    which by default is significant wave height.
+    """
+    return encode_grib2
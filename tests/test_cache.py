@@ -0,0 +1,458 @@
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from bmi_wavewatch3 import WaveWatch3
+from bmi_wavewatch3.cache import (
+    INDEX_NAME,
+    CacheIndex,
+    parse_name,
+    parse_size,
+    source_of,
+)
+from bmi_wavewatch3.errors import ChoiceError
+from bmi_wavewatch3.storage import SCRATCH_DIR
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "multi_1.glo_30m.hs.201005.grb2.validators.json",
+        "multi_1.glo_30m.hs.201005.grb2.part",
+        "multi_1.glo_30m.hs.201005.grb2.4cc40.idx",
+        "multi_1.glo_30m.hs.2010.grb2",
+        INDEX_NAME,
+    ],
+)
+def test_parse_name_not_data(name):
+    assert parse_name(name) is None
+
+
+def test_parse_name_subset():
+    assert parse_name("multi_1.glo_30m.hs.201005.20100501T00-20100503T00.swh.grb2") == (
+        "glo_30m",
+        "hs",
+        "2010-05",
+    )
+
+
+@pytest.mark.parametrize(
+    "url,source",
+    [
+        (
+            "https://polar.ncep.noaa.gov/waves/hindcasts/multi_1/201005/gribs"
+            "/multi_1.glo_30m.hs.201005.grb2",
+            "multigrid",
+        ),
+        (
+            "http://127.0.0.1:8000/waves/hindcasts/nopp-phase2/197901/gribs"
+            "/multi_reanal.glo_30m.hs.197901.grb2",
+            "phase2",
+        ),
+        ("https://example.com/multi_1.glo_30m.hs.201005.grb2", None),
+    ],
+)
+def test_source_of(url, source):
+    assert source_of(url) == source
+
+
+def test_index_is_seeded_from_folder(tmp_path):
+    (tmp_path / "multi_1.glo_30m.hs.201005.grb2").write_bytes(b"1234")
+    (tmp_path / "multi_1.glo_30m.hs.201005.grb2.validators.json").write_text("{}")
+    (tmp_path / "notes.txt").write_text("")
+
+    index = CacheIndex(tmp_path)
+    assert not index.path.exists()
+
+    (entry,) = index.entries()
+    assert index.path.is_file()
+    assert entry.name == "multi_1.glo_30m.hs.201005.grb2"
+    assert (entry.grid, entry.quantity, entry.month) == ("glo_30m", "hs", "2010-05")
+    assert entry.size == 4
+    assert entry.checksum is None
+
+
+def test_record(tmp_path):
+    path = tmp_path / "multi_1.glo_30m.tp.201006.grb2"
+    path.write_bytes(b"data")
+
+    index = CacheIndex(tmp_path)
+    entry = index.record(
+        path,
+        url="https://polar.ncep.noaa.gov/waves/hindcasts/multi_1/201006/gribs"
+        f"/{path.name}",
+    )
+    assert entry.source == "multigrid"
+    assert entry.checksum == (
+        "3a6eb0790f39ac87c94f3856b2dd2c5d110e6811602261a9a923d3bb23adc8b7"
+    )
+    assert index.entries() == [entry]
+    assert index.record(tmp_path / "notes.txt") is None
+
+
+def test_lookup_marks_access(tmp_path):
+    path = tmp_path / "multi_1.glo_30m.tp.201006.grb2"
+    path.write_bytes(b"data")
+    os.utime(path, (0, 0))
+
+    index = CacheIndex(tmp_path)
+    assert index.entries()[0].accessed == 0
+
+    assert index.lookup([path.name, "multi_1.glo_30m.tp.201007.grb2"]) == {path.name}
+    assert index.entries()[0].accessed == pytest.approx(time.time(), abs=60)
+
+
+def test_lookup_many(tmp_path):
+    index = CacheIndex(tmp_path)
+    names = [
+        f"multi_1.glo_30m.hs.{2000 + n // 12}{n % 12 + 1:02d}.grb2" for n in range(1200)
+    ]
+    for name in names[::2]:
+        (tmp_path / name).write_bytes(b"")
+    index.sync()
+
+    assert index.lookup(names) == set(names[::2])
+
+
+def test_lookup_drops_removed_files(tmp_path):
+    index = _fill(tmp_path, ["201005", "201006"])
+    (tmp_path / "multi_1.glo_30m.hs.201005.grb2").unlink()
+
+    names = ["multi_1.glo_30m.hs.201005.grb2", "multi_1.glo_30m.hs.201006.grb2"]
+    assert index.lookup(names) == {"multi_1.glo_30m.hs.201006.grb2"}
+    assert [entry.name for entry in index.entries()] == [
+        "multi_1.glo_30m.hs.201006.grb2"
+    ]
+    assert list(index.missing(names)) == ["multi_1.glo_30m.hs.201005.grb2"]
+
+
+def test_entries_and_usage(tmp_path):
+    for name in (
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.tp.201005.grb2",
+        "multi_1.glo_30m.hs.201006.grb2",
+        "multi_1.ak_4m.hs.201006.grb2",
+    ):
+        (tmp_path / name).write_bytes(b"x" * len(name))
+    index = CacheIndex(tmp_path)
+
+    assert [entry.name for entry in index.entries(quantity="hs", month="2010-06")] == [
+        "multi_1.ak_4m.hs.201006.grb2",
+        "multi_1.glo_30m.hs.201006.grb2",
+    ]
+    assert [entry.name for entry in index.entries(grid="glo_*", quantity="tp")] == [
+        "multi_1.glo_30m.tp.201005.grb2"
+    ]
+    assert index.usage(by="quantity") == [("hs", 3, 88), ("tp", 1, 30)]
+    assert index.usage(by="grid", month="2010-05") == [("glo_30m", 2, 60)]
+
+    with pytest.raises(ChoiceError):
+        index.usage(by="size")
+    with pytest.raises(ChoiceError):
+        index.entries(size="10")
+
+
+def test_sync(tmp_path):
+    index = CacheIndex(tmp_path)
+    assert index.entries() == []
+
+    (tmp_path / "multi_1.glo_30m.hs.201005.grb2").write_bytes(b"")
+    (tmp_path / "multi_1.glo_30m.tp.201005.grb2").write_bytes(b"")
+    assert index.sync() == (
+        ["multi_1.glo_30m.hs.201005.grb2", "multi_1.glo_30m.tp.201005.grb2"],
+        [],
+    )
+
+    (tmp_path / "multi_1.glo_30m.hs.201005.grb2").unlink()
+    assert index.sync() == ([], ["multi_1.glo_30m.hs.201005.grb2"])
+    assert [entry.name for entry in index.entries()] == [
+        "multi_1.glo_30m.tp.201005.grb2"
+    ]
+
+
+def test_remove(tmp_path):
+    (tmp_path / "multi_1.glo_30m.hs.201005.grb2").write_bytes(b"")
+    index = CacheIndex(tmp_path)
+    index.remove(["multi_1.glo_30m.hs.201005.grb2"])
+    assert index.entries() == []
+    assert (tmp_path / "multi_1.glo_30m.hs.201005.grb2").is_file()
+
+
+def test_sidecars(tmp_path):
+    for name in (
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.hs.201005.grb2.4cc40.idx",
+        "multi_1.glo_30m.hs.201005.grb2.validators.json",
+        "multi_1.glo_30m.tp.201005.grb2.part",
+        "nww3.hs.200501.grb.validators.json",
+        "notes.txt",
+    ):
+        (tmp_path / name).write_bytes(b"")
+    index = CacheIndex(tmp_path)
+
+    assert [path.name for path in index.sidecars()] == [
+        "multi_1.glo_30m.hs.201005.grb2.4cc40.idx",
+        "multi_1.glo_30m.hs.201005.grb2.validators.json",
+        "multi_1.glo_30m.tp.201005.grb2.part",
+        "nww3.hs.200501.grb.validators.json",
+    ]
+    assert [
+        path.name for path in index.sidecars(["multi_1.glo_30m.tp.201005.grb2"])
+    ] == ["multi_1.glo_30m.tp.201005.grb2.part"]
+
+
+def test_sidecars_scratch_copies(tmp_path):
+    (tmp_path / "multi_1.glo_30m.hs.201005.grb2.gz").write_bytes(b"x")
+    (tmp_path / SCRATCH_DIR).mkdir()
+    for name in (
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.tp.201005.grb2.part",
+        "notes.txt",
+    ):
+        (tmp_path / SCRATCH_DIR / name).write_bytes(b"")
+    index = CacheIndex(tmp_path)
+
+    assert [path.name for path in index.sidecars()] == [
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.tp.201005.grb2.part",
+    ]
+    assert index.sidecars(["multi_1.glo_30m.hs.201005.grb2.gz"]) == [
+        tmp_path / SCRATCH_DIR / "multi_1.glo_30m.hs.201005.grb2"
+    ]
+    assert index.evict(0) == ["multi_1.glo_30m.hs.201005.grb2.gz"]
+    assert not (tmp_path / SCRATCH_DIR / "multi_1.glo_30m.hs.201005.grb2").exists()
+
+
+def test_sidecars_index_dir(tmp_path):
+    index_dir = tmp_path / "index"
+    (index_dir / SCRATCH_DIR).mkdir(parents=True)
+    (tmp_path / "data").mkdir()
+    _fill(tmp_path / "data", ["201005"])
+    index = CacheIndex(tmp_path / "data", index_dir=index_dir)
+    for name in (
+        "multi_1.glo_30m.hs.201005.grb2.4cc40.idx",
+        "multi_1.glo_30m.hs.201006.grb2.4cc40.idx",
+        "multi_1.glo_30m.hs.201005.grb2.validators.json",
+        f"{SCRATCH_DIR}/multi_1.glo_30m.hs.201005.grb2",
+    ):
+        (index_dir / name).write_bytes(b"x" * 10)
+
+    expected = [
+        index_dir / SCRATCH_DIR / "multi_1.glo_30m.hs.201005.grb2",
+        index_dir / "multi_1.glo_30m.hs.201005.grb2.4cc40.idx",
+    ]
+    assert index.sidecars() == expected
+    assert index.sidecars(["multi_1.glo_30m.hs.201005.grb2"]) == expected
+    assert index.sidecars(["multi_1.glo_30m.hs.201007.grb2"]) == []
+
+    assert index.evict(15) == ["multi_1.glo_30m.hs.201005.grb2"]
+    assert not any(path.exists() for path in expected)
+    assert (index_dir / "multi_1.glo_30m.hs.201006.grb2.4cc40.idx").is_file()
+
+
+def test_fetch_records_downloads(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"], quantities=["hs", "tp", "dp", "wind"])
+    WaveWatch3.fetch("2010-05-01", folder=tmp_path)
+
+    entries = CacheIndex(tmp_path).entries()
+    assert len(entries) == 4
+    assert all(entry.source == "multigrid" for entry in entries)
+    assert all(entry.checksum is not None for entry in entries)
+
+
+def test_fetch_uses_index(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"])
+    first = WaveWatch3.fetch("2010-05-01", folder=tmp_path)
+    noaa_server.reset()
+
+    assert WaveWatch3.fetch("2010-05-01", folder=tmp_path) == first
+    assert noaa_server.requests == []
+    assert noaa_server.connections == 0
+
+
+def test_fetch_replaces_removed_files(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"])
+    first = WaveWatch3.fetch("2010-05-01", folder=tmp_path)
+    first[0].unlink()
+    noaa_server.reset()
+
+    assert WaveWatch3.fetch("2010-05-01", folder=tmp_path) == first
+    assert all(path.is_file() for path in first)
+    assert len(noaa_server.requests) == 1
+
+
+def test_data_marks_access(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"], interval=24)
+    WaveWatch3("2010-05-01", cache=tmp_path).data
+
+    index = CacheIndex(tmp_path)
+    with sqlite3.connect(index.path) as connection:
+        connection.execute("UPDATE files SET accessed = 0")
+    assert all(entry.accessed == 0 for entry in index.entries())
+
+    WaveWatch3("2010-05-01", cache=tmp_path).data
+    assert all(entry.accessed > 0 for entry in index.entries())
+
+
+@pytest.mark.parametrize(
+    "size,nbytes",
+    [(0, 0), ("100", 100), ("2K", 2048), ("1.5M", 1572864), ("2GiB", 2**31)],
+)
+def test_parse_size(size, nbytes):
+    assert parse_size(size) == nbytes
+
+
+@pytest.mark.parametrize("size", ["", "1X", "M", "-1K"])
+def test_parse_size_bad(size):
+    with pytest.raises(ValueError):
+        parse_size(size)
+
+
+def _fill(folder, months, size=10):
+    index = CacheIndex(folder)
+    for n, month in enumerate(months):
+        path = folder / f"multi_1.glo_30m.hs.{month}.grb2"
+        path.write_bytes(b"x" * size)
+        index.record(path)
+        with sqlite3.connect(index.path) as connection:
+            connection.execute(
+                "UPDATE files SET accessed = ? WHERE name = ?", (n, path.name)
+            )
+    return index
+
+
+def test_evict_least_recently_used(tmp_path):
+    index = _fill(tmp_path, ["201005", "201006", "201007", "201008"])
+    index.lookup(["multi_1.glo_30m.hs.201005.grb2"])
+    (tmp_path / "multi_1.glo_30m.hs.201006.grb2.4cc40.idx").write_bytes(b"")
+
+    assert index.evict(25) == [
+        "multi_1.glo_30m.hs.201006.grb2",
+        "multi_1.glo_30m.hs.201007.grb2",
+    ]
+    assert sorted(path.name for path in tmp_path.glob("*.grb2*")) == [
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.hs.201008.grb2",
+    ]
+    assert [entry.name for entry in index.entries()] == [
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.hs.201008.grb2",
+    ]
+    assert index.evict("1K") == []
+
+
+def test_evict_counts_sidecars(tmp_path):
+    index = _fill(tmp_path, ["201005", "201006", "201007"])
+    assert index.evict(30) == []
+
+    (tmp_path / "multi_1.glo_30m.hs.201007.grb2.4cc40.idx").write_bytes(b"x" * 20)
+    (tmp_path / "multi_1.glo_30m.201007.hs.decoded.zarr").mkdir()
+    (tmp_path / "multi_1.glo_30m.201007.hs.decoded.zarr" / "swh").write_bytes(b"x" * 5)
+    assert index.evict(40) == [
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.hs.201006.grb2",
+    ]
+
+
+def test_evict_credits_sidecars(tmp_path):
+    index = _fill(tmp_path, ["201005", "201006", "201007"])
+    (tmp_path / "multi_1.glo_30m.hs.201005.grb2.4cc40.idx").write_bytes(b"x" * 20)
+    (tmp_path / SCRATCH_DIR).mkdir()
+    (tmp_path / SCRATCH_DIR / "multi_1.glo_30m.hs.201005.grb2").write_bytes(b"x" * 5)
+
+    assert index.evict(30) == ["multi_1.glo_30m.hs.201005.grb2"]
+    assert index.sidecars() == []
+
+
+def test_evict_dry_run(tmp_path):
+    index = _fill(tmp_path, ["201005", "201006"])
+    assert index.evict(10, dry_run=True) == ["multi_1.glo_30m.hs.201005.grb2"]
+    assert len(index.entries()) == 2
+    assert len(list(tmp_path.glob("*.grb2"))) == 2
+
+
+def test_evict_keeps_pinned(tmp_path):
+    index = _fill(tmp_path, ["201005", "201006", "201007"])
+    index.pin("a", ["multi_1.glo_30m.hs.201005.grb2"])
+
+    assert index.evict(0, keep=["multi_1.glo_30m.hs.201006.grb2"]) == [
+        "multi_1.glo_30m.hs.201007.grb2"
+    ]
+    assert index.pinned() == {"multi_1.glo_30m.hs.201005.grb2"}
+
+    index.unpin("a")
+    assert index.pinned() == set()
+    assert index.evict(0) == [
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.hs.201006.grb2",
+    ]
+
+
+def test_pin_replaces(tmp_path):
+    index = CacheIndex(tmp_path)
+    index.pin("a", ["x.grb2", "y.grb2"])
+    index.pin("b", ["y.grb2", "z.grb2"])
+    index.pin("a", ["w.grb2"])
+    assert index.pinned() == {"w.grb2", "y.grb2", "z.grb2"}
+
+
+@pytest.mark.skipif(os.name == "nt", reason="pins of dead processes are kept")
+def test_pins_of_dead_processes_are_ignored(tmp_path):
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+
+    index = _fill(tmp_path, ["201005"])
+    with sqlite3.connect(index.path) as connection:
+        connection.execute(
+            "INSERT INTO pins VALUES (?, ?, ?, ?)",
+            ("a", "multi_1.glo_30m.hs.201005.grb2", process.pid, socket.gethostname()),
+        )
+    assert index.pinned() == set()
+    assert index.evict(0) == ["multi_1.glo_30m.hs.201005.grb2"]
+
+
+def test_evict_removes_decoded(tmp_path):
+    index = _fill(tmp_path, ["201005", "201006"])
+    (tmp_path / "multi_1.glo_30m.201005.hs.decoded.zarr").mkdir()
+    (tmp_path / "multi_1.glo_30m.201005.hs.decoded.zarr" / ".zattrs").write_text("{}")
+    (tmp_path / "multi_1.glo_30m.201005.dp-hs.decoded.nc").write_bytes(b"")
+    (tmp_path / "multi_1.glo_30m.201005.dp.decoded.nc").write_bytes(b"")
+    (tmp_path / "multi_1.glo_30m.201006.hs.decoded.nc").write_bytes(b"")
+
+    assert [path.name for path in index.sidecars()] == [
+        "multi_1.glo_30m.201005.dp-hs.decoded.nc",
+        "multi_1.glo_30m.201005.dp.decoded.nc",
+        "multi_1.glo_30m.201005.hs.decoded.zarr",
+        "multi_1.glo_30m.201006.hs.decoded.nc",
+    ]
+    assert index.sync() == ([], [])
+
+    assert index.evict(10) == ["multi_1.glo_30m.hs.201005.grb2"]
+    assert sorted(path.name for path in tmp_path.glob("multi_1.*")) == [
+        "multi_1.glo_30m.201005.dp.decoded.nc",
+        "multi_1.glo_30m.201006.hs.decoded.nc",
+        "multi_1.glo_30m.hs.201006.grb2",
+    ]
+
+
+def test_missing(tmp_path):
+    index = _fill(tmp_path, ["201005", "201007"])
+    names = (f"multi_1.glo_30m.hs.2010{month:02d}.grb2" for month in range(4, 9))
+    assert list(index.missing(names, chunksize=2)) == [
+        "multi_1.glo_30m.hs.201004.grb2",
+        "multi_1.glo_30m.hs.201006.grb2",
+        "multi_1.glo_30m.hs.201008.grb2",
+    ]
+
+
+def test_missing_with_key(tmp_path):
+    index = _fill(tmp_path, ["201005"])
+    urls = [f"https://example.com/multi_1.glo_30m.hs.20100{m}.grb2" for m in "56"]
+    assert list(index.missing(urls, key=lambda url: url.rsplit("/", 1)[-1])) == [
+        urls[1]
+    ]
@@ -1,9 +1,12 @@
+import csv
+import os
 import pathlib
 
 import pytest
 from click.testing import CliRunner
 
-from bmi_wavewatch3.cli import ww3
+from bmi_wavewatch3 import cli
+from bmi_wavewatch3.cli import validate_rate_limit, ww3
 
 try:
     import tomllib
@@ -54,7 +57,9 @@ def test_bad_grid(subcommand):
     assert result.exit_code != 0
 
 
-@pytest.mark.parametrize("subcommand", ("url", "fetch", "clean"))
+@pytest.mark.parametrize(
+    "subcommand", ("url", "fetch", "clean", "cache", "prefetch", "extract")
+)
 def test_subcommand_help(subcommand):
     runner = CliRunner()
     result = runner.invoke(ww3, [subcommand, "--help"])
@@ -98,3 +103,363 @@ def test_clean(tmpdir):
 
         runner.invoke(ww3, ["clean", "--cache-dir=.", "--yes"])
         assert not data_file.is_file()
+
+
+def test_fetch_async_noop():
+    runner = CliRunner()
+    result = runner.invoke(ww3, ["fetch", "--async", "--max-per-host=2"])
+    assert result.exit_code == 0
+
+
+def test_fetch_rate_limit_noop():
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3, ["fetch", "--max-concurrency=2", "--rate-limit=2.5M", "--dry-run"]
+    )
+    assert result.exit_code == 0
+
+
+@pytest.mark.parametrize(
+    "rate,expected",
+    [("2.5M", 2.5 * 2**20), ("500KiB/s", 500 * 2**10), ("1G", 2**30)],
+)
+def test_validate_rate_limit(rate, expected):
+    assert validate_rate_limit(None, None, rate) == expected
+
+
+@pytest.mark.parametrize("rate", ("fast", "-1M", "2X", "0"))
+def test_fetch_bad_rate_limit(rate):
+    runner = CliRunner()
+    result = runner.invoke(ww3, ["fetch", f"--rate-limit={rate}"])
+    assert result.exit_code != 0
+
+
+def test_fetch_dedupes_dates(tmp_path, monkeypatch):
+    lines = []
+    monkeypatch.setattr(cli, "out", lambda line, **kwds: lines.append(line))
+
+    dates = tmp_path / "dates.txt"
+    dates.write_text("\n".join(f"2010-05-{day:02d}" for day in range(1, 32)) + "\n")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3, ["-v", "fetch", "--dry-run", "-q", "hs", f"--file={dates}", "2010-06-01"]
+    )
+    assert result.exit_code == 0
+    assert lines == [
+        "https://polar.ncep.noaa.gov/waves/hindcasts/multi_1/201006/gribs"
+        "/multi_1.glo_30m.hs.201006.grb2 (1 date)",
+        "https://polar.ncep.noaa.gov/waves/hindcasts/multi_1/201005/gribs"
+        "/multi_1.glo_30m.hs.201005.grb2 (31 dates)",
+    ]
+
+
+def test_fetch_from_mirror(tmp_path, monkeypatch, http_server):
+    monkeypatch.setenv("WAVEWATCH3_MIRROR", "http://127.0.0.1:9")
+    http_server.populate(["2010-05-01"], quantities=["hs"])
+
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3,
+        [
+            f"--cd={tmp_path}",
+            f"--mirror={http_server.url}",
+            "-s",
+            "fetch",
+            "-q",
+            "hs",
+            "2010-05-01",
+            "2010-05-22",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == [
+        str(tmp_path / "multi_1.glo_30m.hs.201005.grb2")
+    ]
+    assert len(http_server.requests) == 1
+    assert os.environ["WAVEWATCH3_MIRROR"] == "http://127.0.0.1:9"
+
+
+def test_mirror_is_restored(tmp_path, monkeypatch):
+    monkeypatch.delenv("WAVEWATCH3_MIRROR", raising=False)
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3, [f"--cd={tmp_path}", "--mirror=http://127.0.0.1:9", "info"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "WAVEWATCH3_MIRROR" not in os.environ
+
+
+def test_clean_uses_index(tmp_path):
+    for name in (
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.hs.201005.grb2.validators.json",
+        "nww3.hs.200501.grb",
+        "notes.txt",
+    ):
+        (tmp_path / name).write_bytes(b"data")
+
+    runner = CliRunner()
+    result = runner.invoke(ww3, ["clean", f"--cache-dir={tmp_path}", "--yes"])
+    assert result.exit_code == 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        ".wavewatch3-index.sqlite",
+        "notes.txt",
+    ]
+
+    result = runner.invoke(ww3, ["cache", f"--cache-dir={tmp_path}", "ls"])
+    assert result.output == ""
+
+
+def test_cache_ls_du_sync(tmp_path):
+    for name in (
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.tp.201005.grb2",
+        "multi_1.glo_30m.hs.201006.grb2",
+    ):
+        (tmp_path / name).write_bytes(b"x" * 10)
+
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3, ["cache", f"--cache-dir={tmp_path}", "--quantity=hs", "ls"]
+    )
+    assert result.exit_code == 0
+    assert [line.split()[-1] for line in result.output.splitlines()] == [
+        str(tmp_path / "multi_1.glo_30m.hs.201005.grb2"),
+        str(tmp_path / "multi_1.glo_30m.hs.201006.grb2"),
+    ]
+
+    result = runner.invoke(
+        ww3, ["-s", "cache", f"--cache-dir={tmp_path}", "--by=month", "du"]
+    )
+    assert result.exit_code == 0
+    assert result.output.splitlines() == ["2010-05\t2\t20", "2010-06\t1\t10"]
+
+    (tmp_path / "multi_1.glo_30m.tp.201005.grb2").unlink()
+    (tmp_path / "multi_1.glo_30m.tp.201006.grb2").write_bytes(b"")
+    result = runner.invoke(ww3, ["-s", "cache", f"--cache-dir={tmp_path}", "sync"])
+    assert result.exit_code == 0
+    assert result.output.splitlines() == [
+        f"+ {tmp_path / 'multi_1.glo_30m.tp.201006.grb2'}",
+        f"- {tmp_path / 'multi_1.glo_30m.tp.201005.grb2'}",
+    ]
+
+
+def test_cache_missing_folder(tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(ww3, ["cache", f"--cache-dir={tmp_path / 'missing'}", "du"])
+    assert result.exit_code == 0
+    assert not (tmp_path / "missing").exists()
+
+
+def test_fetch_uses_index(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"], quantities=["hs"])
+
+    runner = CliRunner()
+    args = [f"--cd={tmp_path}", "-s", "fetch", "-q", "hs", "2010-05-01"]
+    assert runner.invoke(ww3, args).exit_code == 0
+    noaa_server.reset()
+
+    result = runner.invoke(ww3, args)
+    assert result.exit_code == 0
+    assert result.output.splitlines() == [
+        str(tmp_path / "multi_1.glo_30m.hs.201005.grb2")
+    ]
+    assert noaa_server.requests == []
+
+    (tmp_path / "multi_1.glo_30m.hs.201005.grb2").unlink()
+    result = runner.invoke(ww3, args)
+    assert result.exit_code == 0
+    assert (tmp_path / "multi_1.glo_30m.hs.201005.grb2").is_file()
+    assert len(noaa_server.requests) == 1
+
+
+def test_clean_max_size(tmp_path):
+    for n, month in enumerate(("201005", "201006", "201007")):
+        path = tmp_path / f"multi_1.glo_30m.hs.{month}.grb2"
+        path.write_bytes(b"x" * 1024)
+        os.utime(path, (n, n))
+
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3, ["clean", f"--cache-dir={tmp_path}", "--max-size=1.5K", "--dry-run"]
+    )
+    assert result.exit_code == 0
+    assert len(list(tmp_path.glob("*.grb2"))) == 3
+
+    result = runner.invoke(
+        ww3, ["clean", f"--cache-dir={tmp_path}", "--max-size=1.5K", "--yes"]
+    )
+    assert result.exit_code == 0
+    assert [path.name for path in tmp_path.glob("*.grb2")] == [
+        "multi_1.glo_30m.hs.201007.grb2"
+    ]
+
+
+def test_clean_index_dir(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "index").mkdir()
+    (tmp_path / "data" / "multi_1.glo_30m.hs.201005.grb2").write_bytes(b"x")
+    (tmp_path / "index" / "multi_1.glo_30m.hs.201005.grb2.4cc40.idx").write_bytes(b"")
+    (tmp_path / "index" / "multi_1.glo_30m.hs.201006.grb2.4cc40.idx").write_bytes(b"")
+    monkeypatch.setenv("WAVEWATCH3_INDEX_DIR", str(tmp_path / "index"))
+
+    runner = CliRunner()
+    result = runner.invoke(ww3, ["clean", f"--cache-dir={tmp_path / 'data'}", "--yes"])
+    assert result.exit_code == 0, result.output
+    assert list((tmp_path / "data").glob("*.grb2")) == []
+    assert [path.name for path in (tmp_path / "index").glob("*.idx")] == [
+        "multi_1.glo_30m.hs.201006.grb2.4cc40.idx"
+    ]
+
+
+def test_clean_bad_max_size(tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(ww3, ["clean", f"--cache-dir={tmp_path}", "--max-size=1X"])
+    assert result.exit_code != 0
+
+
+def test_fetch_index_dir(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"], quantities=["hs"])
+
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3,
+        [
+            f"--cd={tmp_path}",
+            "-s",
+            "fetch",
+            "-q",
+            "hs",
+            f"--index-dir={tmp_path / 'index'}",
+            "2010-05-01",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert list(tmp_path.glob("*.idx")) == []
+    assert len(list((tmp_path / "index").glob("*.hs.201005.grb2.*.idx"))) == 1
+
+
+def test_fetch_storage(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"], quantities=["hs"])
+
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3,
+        [f"--cd={tmp_path}", "-s", "fetch", "-q", "hs", "--storage=gzip", "2010-05-01"],
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == [
+        str(tmp_path / "multi_1.glo_30m.hs.201005.grb2.gz")
+    ]
+
+
+def test_prefetch(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01", "2010-06-01"], quantities=["hs"])
+    (tmp_path / "multi_1.glo_30m.hs.201005.grb2").write_bytes(b"GRIB")
+
+    runner = CliRunner()
+    args = [f"--cd={tmp_path}", "-s", "prefetch", "--start=2010-05", "--end=2010-06"]
+
+    result = runner.invoke(ww3, args + ["-q", "hs", "--dry-run"])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == [
+        f"{noaa_server.url}/waves/hindcasts/multi_1/201006/gribs/"
+        "multi_1.glo_30m.hs.201006.grb2"
+    ]
+
+    result = runner.invoke(ww3, args + ["-q", "hs"])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == [
+        str(tmp_path / "multi_1.glo_30m.hs.201006.grb2")
+    ]
+    assert len(noaa_server.requests) == 1
+
+
+def test_prefetch_dry_run(tmp_path, noaa_server):
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3,
+        [
+            f"--cd={tmp_path}",
+            "prefetch",
+            "--start=2010-05",
+            "--end=2010-06",
+            "--dry-run",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert len(lines) == 8
+    assert all(line.startswith(noaa_server.url) for line in lines)
+    assert noaa_server.requests == []
+
+
+@pytest.mark.parametrize("start", ["2004-01", "2010-13"])
+def test_prefetch_bad_range(tmp_path, start):
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3, [f"--cd={tmp_path}", "prefetch", f"--start={start}", "--end=2010-06"]
+    )
+    assert result.exit_code != 0
+
+
+def test_plot_fetches_one_quantity(tmp_path, noaa_server, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setattr(cli.plt, "show", lambda: None)
+    noaa_server.populate(["2010-05-01"], interval=24)
+
+    runner = CliRunner()
+    result = runner.invoke(ww3, ["-s", "plot", "--data-var=swh", "2010-05-01"])
+    assert result.exit_code == 0, result.output
+    assert [path.rsplit("/", 1)[-1] for path, _ in noaa_server.requests] == [
+        "multi_1.glo_30m.hs.201005.grb2"
+    ]
+
+
+def test_extract(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"], quantities=["hs"], interval=24)
+    points = tmp_path / "points.csv"
+    points.write_text("name,latitude,longitude\nbuoy,2,3\n")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3,
+        [
+            "-s",
+            "extract",
+            "--start=2010-05",
+            "--end=2010-05",
+            f"--points={points}",
+            "--point=0,7",
+            "--data-var=swh",
+            f"--cache-dir={tmp_path}",
+            f"--output={tmp_path / 'out.csv'}",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    with open(tmp_path / "out.csv", newline="") as fp:
+        rows = list(csv.reader(fp))
+    assert rows[0] == ["time", "point", "latitude", "longitude", "swh"]
+    assert len(rows) == 1 + 31 * 2
+    assert [row[1] for row in rows[1:3]] == ["buoy", "0,7"]
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        [],
+        ["--point=0"],
+        ["--point=0,7", "--format=xlsx"],
+        ["--point=0,7", "--data-var=foo"],
+        ["--point=0,7", "--method=cubic"],
+    ],
+)
+def test_extract_bad_args(tmp_path, args):
+    runner = CliRunner()
+    result = runner.invoke(
+        ww3,
+        ["extract", "--start=2010-05", "--end=2010-05", f"--cache-dir={tmp_path}"]
+        + args,
+    )
+    assert result.exit_code != 0
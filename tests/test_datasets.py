@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+import xarray as xr
+
+from bmi_wavewatch3.datasets import DatasetCache, get_dataset_cache
+
+
+class Opener:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.opened = []
+        self.closed = []
+
+    def __call__(self, key):
+        def _open():
+            time.sleep(self.delay)
+            ds = xr.Dataset(attrs={"key": key})
+            ds.set_close(lambda: self.closed.append(key))
+            self.opened.append(key)
+            return ds
+
+        return _open
+
+
+def test_bad_maxsize():
+    with pytest.raises(ValueError):
+        DatasetCache(maxsize=-1)
+    with pytest.raises(ValueError):
+        DatasetCache().maxsize = -1
+
+
+def test_acquire_reuses():
+    opener, cache = Opener(), DatasetCache(maxsize=2)
+    ds = cache.acquire("a", opener("a"))
+    cache.release("a")
+    assert cache.acquire("a", opener("a")) is ds
+    assert opener.opened == ["a"]
+
+
+def test_least_recently_used_are_closed():
+    opener, cache = Opener(), DatasetCache(maxsize=2)
+    for key in ("a", "b", "a", "c"):
+        cache.acquire(key, opener(key))
+        cache.release(key)
+    assert opener.opened == ["a", "b", "c"]
+    assert opener.closed == ["b"]
+    assert "a" in cache and "c" in cache and len(cache) == 2
+
+
+def test_in_use_are_not_closed():
+    opener, cache = Opener(), DatasetCache(maxsize=0)
+    cache.acquire("a", opener("a"))
+    cache.acquire("a", opener("a"))
+    cache.release("a")
+    assert opener.closed == []
+    cache.release("a")
+    assert opener.closed == ["a"]
+    assert len(cache) == 0
+
+
+def test_release_and_close():
+    opener, cache = Opener(), DatasetCache(maxsize=2)
+    cache.acquire("a", opener("a"))
+    cache.acquire("a", opener("a"))
+    cache.release("a", close=True)
+    assert opener.closed == []
+    cache.release("a", close=True)
+    assert opener.closed == ["a"]
+    assert "a" not in cache
+
+
+def test_maxsize_and_clear():
+    opener, cache = Opener(), DatasetCache(maxsize=3)
+    for key in ("a", "b", "c"):
+        cache.acquire(key, opener(key))
+        cache.release(key)
+    cache.maxsize = 1
+    assert opener.closed == ["a", "b"]
+
+    cache.acquire("d", opener("d"))
+    cache.clear()
+    assert opener.closed == ["a", "b", "c"]
+    assert list(cache._entries) == ["d"]
+
+
+def test_acquire_is_single_flight():
+    opener, cache = Opener(delay=0.2), DatasetCache()
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.acquire("a", opener("a"))))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert opener.opened == ["a"]
+    assert all(ds is results[0] for ds in results)
+    assert cache._entries["a"][1] == 4
+
+
+def test_failed_open_is_not_cached():
+    cache = DatasetCache()
+
+    def _fail():
+        raise OSError("unreadable")
+
+    with pytest.raises(OSError):
+        cache.acquire("a", _fail)
+    assert "a" not in cache
+    assert cache.acquire("a", Opener()("a")).attrs == {"key": "a"}
+
+
+def test_get_dataset_cache():
+    assert get_dataset_cache() is get_dataset_cache()
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from bmi_wavewatch3 import decoded
+from bmi_wavewatch3.decoded import (
+    decoded_path,
+    is_decoded_from,
+    open_decoded,
+    validate_format,
+)
+from bmi_wavewatch3.errors import ChoiceError, WaveWatch3Error
+
+
+@pytest.mark.parametrize(
+    "names,expected",
+    [
+        (
+            ["multi_1.glo_30m.hs.201005.grb2", "multi_1.glo_30m.tp.201005.grb2"],
+            "multi_1.glo_30m.201005.hs-tp.decoded.zarr",
+        ),
+        (
+            ["multi_1.glo_30m.tp.201005.grb2.gz", "multi_1.glo_30m.hs.201005.grb2"],
+            "multi_1.glo_30m.201005.hs-tp.decoded.zarr",
+        ),
+        (["multi_1.glo_30m.hs.201005.grb2"], "multi_1.glo_30m.201005.hs.decoded.zarr"),
+        (["nww3.hs.200501.grb"], "nww3.200501.hs.decoded.zarr"),
+    ],
+)
+def test_decoded_path(tmp_path, names, expected):
+    path = decoded_path([tmp_path / name for name in names])
+    assert path == tmp_path / expected
+
+
+def test_decoded_path_netcdf(tmp_path):
+    path = decoded_path([tmp_path / "multi_1.ak_4m.hs.201005.grb2"], format="netcdf")
+    assert path.name == "multi_1.ak_4m.201005.hs.decoded.nc"
+
+
+@pytest.mark.parametrize(
+    "name,expected",
+    [
+        ("multi_1.glo_30m.hs.201005.grb2", True),
+        ("multi_1.glo_30m.tp.201005.grb2.zst", True),
+        ("multi_1.glo_30m.dp.201005.grb2", False),
+        ("multi_1.glo_30m.hs.201006.grb2", False),
+        ("multi_1.glo_30m.hs.201005.20100501T00-20100501T06.swh.grb2", False),
+        ("multi_1.ak_4m.hs.201005.grb2", False),
+    ],
+)
+def test_is_decoded_from(name, expected):
+    assert is_decoded_from("multi_1.glo_30m.201005.hs-tp.decoded.nc", name) is expected
+
+
+def test_validate_format_bad_format():
+    with pytest.raises(ChoiceError):
+        validate_format("hdf4")
+
+
+@pytest.mark.parametrize("format", ["netcdf", "zarr"])
+def test_validate_format_not_installed(monkeypatch, format):
+    monkeypatch.setattr(decoded, "_has", lambda package: False)
+    with pytest.raises(WaveWatch3Error, match="require"):
+        validate_format(format)
+
+
+def _write_gribs(folder, month="201005"):
+    paths = []
+    for quantity in ("hs", "tp"):
+        paths.append(folder / f"multi_1.glo_30m.{quantity}.{month}.grb2")
+        paths[-1].write_bytes(quantity.encode())
+    return paths
+
+
+class _OpenGrib:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, paths):
+        self.calls += 1
+        return xr.Dataset(
+            {
+                "swh": (("step", "latitude"), np.full((10, 3), float(self.calls))),
+                "perpw": (("step", "latitude"), np.zeros((10, 3))),
+            },
+            coords={"step": np.arange(10), "latitude": [0.0, 0.5, 1.0]},
+            attrs={"GRIB_centre": "kwbc"},
+        )
+
+
+@pytest.mark.parametrize("format,package", [("zarr", "zarr"), ("netcdf", "netCDF4")])
+def test_open_decoded(tmp_path, format, package):
+    pytest.importorskip(package)
+    paths = _write_gribs(tmp_path)
+    open_grib = _OpenGrib()
+
+    with open_decoded(paths, format=format, open_grib=open_grib) as ds:
+        assert open_grib.calls == 1
+        assert ds.attrs == {"GRIB_centre": "kwbc"}
+        assert ds.swh.chunks is not None
+        np.testing.assert_array_equal(ds.swh, 1.0)
+    assert decoded_path(paths, format=format).exists()
+
+    with open_decoded(paths, format=format, open_grib=open_grib) as ds:
+        assert open_grib.calls == 1
+        np.testing.assert_array_equal(ds.swh, 1.0)
+
+
+@pytest.mark.parametrize("format,package", [("zarr", "zarr"), ("netcdf", "netCDF4")])
+def test_open_decoded_rewrites_stale(tmp_path, format, package):
+    pytest.importorskip(package)
+    paths = _write_gribs(tmp_path)
+    open_grib = _OpenGrib()
+
+    open_decoded(paths, format=format, open_grib=open_grib).close()
+    paths[0].write_bytes(b"changed")
+
+    with open_decoded(paths, format=format, open_grib=open_grib) as ds:
+        assert open_grib.calls == 2
+        np.testing.assert_array_equal(ds.swh, 2.0)
+    assert not list(tmp_path.glob("*.part"))
@@ -0,0 +1,40 @@
+import asyncio
+import threading
+import time
+
+from bmi_wavewatch3 import WaveWatch3Downloader
+from bmi_wavewatch3.downloader import gather_per_host
+
+
+def test_aretreive(tmp_path, http_server):
+    name = "multi_1.glo_30m.hs.201005.grb2"
+    (http_server.root / name).write_bytes(b"GRIB" * 1024)
+
+    path = asyncio.run(
+        WaveWatch3Downloader.aretreive(
+            f"{http_server.url}/{name}", filename=tmp_path / name
+        )
+    )
+    assert path == tmp_path / name
+    assert path.read_bytes() == b"GRIB" * 1024
+
+
+def test_gather_per_host_limits_requests():
+    lock = threading.Lock()
+    in_flight, max_in_flight = {}, {}
+
+    def download(url):
+        host = url.split("/")[2]
+        with lock:
+            in_flight[host] = in_flight.get(host, 0) + 1
+            max_in_flight[host] = max(max_in_flight.get(host, 0), in_flight[host])
+        time.sleep(0.01)
+        with lock:
+            in_flight[host] -= 1
+        return url
+
+    urls = [f"https://{host}/{n}" for n in range(16) for host in ("foo", "bar")]
+    results = asyncio.run(gather_per_host(download, urls, max_per_host=3))
+
+    assert results == urls
+    assert max(max_in_flight.values()) <= 3
@@ -0,0 +1,301 @@
+import gzip
+import http.client
+import os
+import urllib.error
+from multiprocessing.pool import ThreadPool
+
+import pytest
+
+from bmi_wavewatch3 import HttpEngine, UrllibEngine, WaveWatch3Downloader
+from bmi_wavewatch3.engine import part_file, read_validators, validators_file
+
+
+@pytest.fixture
+def data_files(http_server):
+    names = [f"multi_1.glo_30m.hs.2010{month:02d}.grb2" for month in range(1, 13)]
+    for month, name in enumerate(names):
+        (http_server.root / name).write_bytes(bytes([month]) * (2**16 + month))
+    return names
+
+
+@pytest.mark.parametrize("engine", (HttpEngine, UrllibEngine))
+def test_download(tmp_path, http_server, data_files, engine):
+    name = data_files[0]
+    path = engine().download(f"{http_server.url}/{name}", tmp_path / name)
+    assert path == tmp_path / name
+    assert path.read_bytes() == (http_server.root / name).read_bytes()
+
+
+def test_download_reuses_connection(tmp_path, http_server, data_files):
+    with HttpEngine() as engine:
+        for name in data_files:
+            engine.download(f"{http_server.url}/{name}", tmp_path / name)
+    assert http_server.connections == 1
+
+    for name in data_files:
+        assert (tmp_path / name).read_bytes() == (http_server.root / name).read_bytes()
+
+
+def test_download_shared_by_threads(tmp_path, http_server, data_files):
+    with HttpEngine(maxsize=4) as engine, ThreadPool(4) as pool:
+        pool.map(
+            lambda name: engine.download(f"{http_server.url}/{name}", tmp_path / name),
+            data_files * 4,
+        )
+    assert http_server.connections <= 4
+
+
+def test_download_reporthook(tmp_path, http_server, data_files):
+    name = data_files[-1]
+    calls = []
+    HttpEngine(blocksize=1024).download(
+        f"{http_server.url}/{name}",
+        tmp_path / name,
+        reporthook=lambda *args: calls.append(args),
+    )
+    size = (http_server.root / name).stat().st_size
+    assert calls[0] == (0, 1024, size)
+    assert calls[-1][0] * 1024 >= size
+
+
+def test_download_missing(tmp_path, http_server):
+    engine = HttpEngine()
+    with pytest.raises(urllib.error.HTTPError):
+        engine.download(f"{http_server.url}/not-a-file.grb2", tmp_path / "foo")
+
+    with pytest.raises(urllib.error.URLError):
+        engine.download("ftp://127.0.0.1/not-a-file.grb2", tmp_path / "foo")
+
+
+def test_retreive_with_engine(tmp_path, http_server, data_files):
+    name = data_files[0]
+    with HttpEngine() as engine:
+        path = WaveWatch3Downloader.retreive(
+            f"{http_server.url}/{name}", filename=tmp_path / name, engine=engine
+        )
+    assert path == tmp_path / name
+    assert path.read_bytes() == (http_server.root / name).read_bytes()
+
+
+def test_download_resumes_after_fault(tmp_path, http_server, data_files):
+    name = data_files[-1]
+    http_server.faults = 2
+
+    path = HttpEngine(backoff=0.0).download(
+        f"{http_server.url}/{name}", tmp_path / name
+    )
+    assert path.read_bytes() == (http_server.root / name).read_bytes()
+    assert not part_file(path).exists()
+
+    ranges = [headers.get("Range") for _, headers in http_server.requests]
+    assert ranges[0] is None
+    assert all(r.startswith("bytes=") for r in ranges[1:])
+    assert len(ranges) == 3
+
+
+def test_download_restarts_without_range_support(tmp_path, http_server, data_files):
+    name = data_files[-1]
+    http_server.faults, http_server.ranges = 1, False
+
+    path = HttpEngine(backoff=0.0).download(
+        f"{http_server.url}/{name}", tmp_path / name
+    )
+    assert path.read_bytes() == (http_server.root / name).read_bytes()
+
+
+def test_download_failure_leaves_part_file(tmp_path, http_server, data_files):
+    name = data_files[-1]
+    http_server.faults = 2
+
+    with pytest.raises((http.client.HTTPException, urllib.error.URLError)):
+        HttpEngine(retries=1, backoff=0.0).download(
+            f"{http_server.url}/{name}", tmp_path / name
+        )
+    assert not (tmp_path / name).exists()
+    assert part_file(tmp_path / name).is_file()
+    offset = part_file(tmp_path / name).stat().st_size
+
+    assert validators_file(part_file(tmp_path / name)).is_file()
+
+    path = HttpEngine().download(f"{http_server.url}/{name}", tmp_path / name)
+    assert path.read_bytes() == (http_server.root / name).read_bytes()
+    assert http_server.requests[-1][1]["Range"] == f"bytes={offset}-"
+    assert http_server.requests[-1][1]["If-Range"].startswith('"')
+    assert not validators_file(part_file(path)).exists()
+    assert validators_file(path).is_file()
+
+
+def test_download_restarts_changed_part_file(tmp_path, http_server, data_files):
+    name, url = data_files[-1], f"{http_server.url}/{data_files[-1]}"
+    http_server.faults = 1
+    with pytest.raises((http.client.HTTPException, urllib.error.URLError)):
+        HttpEngine(retries=0).download(url, tmp_path / name)
+    assert part_file(tmp_path / name).is_file()
+
+    (http_server.root / name).write_bytes(b"updated" * 2**14)
+    os.utime(http_server.root / name, (0, 0))
+
+    path = HttpEngine().download(url, tmp_path / name)
+    assert path.read_bytes() == b"updated" * 2**14
+    assert "If-Range" in http_server.requests[-1][1]
+
+
+def test_download_discards_part_file_without_validators(
+    tmp_path, http_server, data_files
+):
+    name = data_files[0]
+    part_file(tmp_path / name).write_bytes(b"stale")
+
+    path = HttpEngine().download(f"{http_server.url}/{name}", tmp_path / name)
+    assert path.read_bytes() == (http_server.root / name).read_bytes()
+    assert "Range" not in http_server.requests[-1][1]
+
+
+def test_download_completed_part_file(tmp_path, http_server, data_files):
+    name, url = data_files[0], f"{http_server.url}/{data_files[0]}"
+    path = HttpEngine().download(url, tmp_path / name)
+    os.replace(path, part_file(path))
+    os.replace(validators_file(path), validators_file(part_file(path)))
+
+    path = HttpEngine().download(url, tmp_path / name)
+    assert path.read_bytes() == (http_server.root / name).read_bytes()
+    assert http_server.requests[-1][1]["Range"].startswith("bytes=")
+    assert read_validators(path, url).keys() == {"etag", "last_modified"}
+
+
+@pytest.fixture
+def gzipped_file(http_server):
+    name = "multi_reanal.glo_30m.hs.200901.grb2.gz"
+    data = os.urandom(2**15) * 8
+    (http_server.root / name).write_bytes(
+        gzip.compress(data[: len(data) // 2]) + gzip.compress(data[len(data) // 2 :])
+    )
+    return name, data
+
+
+@pytest.mark.parametrize("engine", (HttpEngine, UrllibEngine))
+def test_download_decompress(tmp_path, http_server, gzipped_file, engine):
+    name, data = gzipped_file
+    path = engine().download(
+        f"{http_server.url}/{name}", tmp_path / "data.grb2", decompress=True
+    )
+    assert path.read_bytes() == data
+    assert not (tmp_path / "data.grb2.gz").exists()
+    assert not part_file(path).exists()
+
+
+def test_download_decompress_resumes_after_fault(tmp_path, http_server, gzipped_file):
+    name, data = gzipped_file
+    http_server.faults = 2
+
+    path = HttpEngine(backoff=0.0).download(
+        f"{http_server.url}/{name}", tmp_path / "data.grb2", decompress=True
+    )
+    assert path.read_bytes() == data
+    assert http_server.requests[-1][1]["Range"].startswith("bytes=")
+
+
+def test_download_decompress_ignores_part_file(tmp_path, http_server, gzipped_file):
+    name, data = gzipped_file
+    part_file(tmp_path / "data.grb2").write_bytes(b"stale")
+
+    path = HttpEngine().download(
+        f"{http_server.url}/{name}", tmp_path / "data.grb2", decompress=True
+    )
+    assert path.read_bytes() == data
+    assert "Range" not in http_server.requests[-1][1]
+
+
+def test_retreive_gzipped(tmp_path, http_server, gzipped_file):
+    name, data = gzipped_file
+
+    path = WaveWatch3Downloader.retreive(
+        f"{http_server.url}/{name}", filename=tmp_path / name
+    )
+    assert path == tmp_path / WaveWatch3Downloader.local_file_part(name)
+    assert path.read_bytes() == data
+    assert not (tmp_path / name).exists()
+
+
+@pytest.mark.parametrize("engine", (HttpEngine, UrllibEngine))
+def test_revalidate_not_modified(tmp_path, http_server, data_files, engine):
+    name, url = data_files[0], f"{http_server.url}/{data_files[0]}"
+    engine = engine()
+
+    path = engine.download(url, tmp_path / name)
+    assert read_validators(path, url).keys() == {"etag", "last_modified"}
+    mtime = path.stat().st_mtime_ns
+
+    engine.download(url, tmp_path / name, revalidate=True)
+    assert path.stat().st_mtime_ns == mtime
+    assert "If-None-Match" in http_server.requests[-1][1]
+    assert not part_file(path).exists()
+
+
+@pytest.mark.parametrize("engine", (HttpEngine, UrllibEngine))
+def test_revalidate_modified(tmp_path, http_server, data_files, engine):
+    name, url = data_files[0], f"{http_server.url}/{data_files[0]}"
+    engine = engine()
+
+    path = engine.download(url, tmp_path / name)
+    (http_server.root / name).write_bytes(b"updated")
+    os.utime(http_server.root / name, (0, 0))
+
+    engine.download(url, tmp_path / name, revalidate=True)
+    assert path.read_bytes() == b"updated"
+    assert len(http_server.requests) == 2
+    assert read_validators(path, url) != {}
+
+
+@pytest.mark.parametrize("engine", (HttpEngine, UrllibEngine))
+def test_revalidate_with_validators(tmp_path, http_server, data_files, engine):
+    name, url = data_files[0], f"{http_server.url}/{data_files[0]}"
+    engine = engine()
+    validators = read_validators(engine.download(url, tmp_path / name), url)
+
+    other = tmp_path / "other" / name
+    other.parent.mkdir()
+    engine.download(url, other, revalidate=True, validators=validators)
+    assert "If-None-Match" in http_server.requests[-1][1]
+    assert not other.exists()
+    assert not part_file(other).exists()
+
+    engine.download(url, other, revalidate=True, validators={"etag": '"stale"'})
+    assert other.read_bytes() == (tmp_path / name).read_bytes()
+    assert len(http_server.requests) == 3
+
+
+def test_revalidate_retries_keep_conditional_headers(tmp_path, http_server, data_files):
+    name, url = data_files[0], f"{http_server.url}/{data_files[0]}"
+    engine = HttpEngine(backoff=0.0)
+    path = engine.download(url, tmp_path / name)
+
+    http_server.errors = [503]
+    engine.download(url, tmp_path / name, revalidate=True)
+    assert "If-None-Match" in http_server.requests[-1][1]
+    assert len(http_server.requests) == 2
+    assert not part_file(path).exists()
+
+
+def test_revalidate_without_validators(tmp_path, http_server, data_files):
+    name, url = data_files[0], f"{http_server.url}/{data_files[0]}"
+    http_server.validators = False
+
+    path = HttpEngine().download(url, tmp_path / name)
+    assert not validators_file(path).exists()
+
+    (http_server.root / name).write_bytes(b"updated")
+    HttpEngine().download(url, tmp_path / name, revalidate=True)
+    assert path.read_bytes() == b"updated"
+
+
+def test_retreive_revalidate(tmp_path, http_server, data_files):
+    name, url = data_files[0], f"{http_server.url}/{data_files[0]}"
+
+    WaveWatch3Downloader.retreive(url, filename=tmp_path / name)
+    WaveWatch3Downloader.retreive(url, filename=tmp_path / name)
+    assert len(http_server.requests) == 1
+
+    WaveWatch3Downloader.retreive(url, filename=tmp_path / name, revalidate=True)
+    assert len(http_server.requests) == 2
+    assert "If-None-Match" in http_server.requests[-1][1]
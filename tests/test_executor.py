@@ -0,0 +1,103 @@
+import os
+import threading
+
+import pytest
+
+from bmi_wavewatch3 import (
+    AdaptiveScheduler,
+    BmiWaveWatch3,
+    ChoiceError,
+    Executor,
+    WaveWatch3,
+)
+from bmi_wavewatch3.errors import WaveWatch3Error
+from bmi_wavewatch3.executor import get_executor, set_executor
+
+
+def _pid(_):
+    return os.getpid()
+
+
+@pytest.mark.parametrize("backend", ("thread", "process", "none"))
+def test_map(backend):
+    with Executor(backend, max_workers=2) as executor:
+        assert executor.map(abs, [-1, 2, -3]) == [1, 2, 3]
+        assert executor.submit(abs, -4).result() == 4
+
+
+def test_none_runs_in_calling_thread():
+    with Executor("none") as executor:
+        assert executor.submit(threading.get_ident).result() == threading.get_ident()
+        future = executor.submit(int, "not an int")
+        with pytest.raises(ValueError):
+            future.result()
+
+
+def test_process_backend():
+    with Executor("process", max_workers=2) as executor:
+        pids = set(executor.map(_pid, range(8)))
+    assert os.getpid() not in pids
+    assert len(pids) <= 2
+
+
+def test_pool_is_reused():
+    with Executor("thread", max_workers=2) as executor:
+        executor.map(abs, range(4))
+        pool = executor._pool
+        executor.map(abs, range(4))
+        assert executor._pool is pool
+
+
+@pytest.mark.parametrize("backend", ("thread", "none"))
+def test_closed(backend):
+    executor = Executor(backend)
+    executor.map(abs, range(4))
+    executor.close()
+    assert executor.closed
+    assert executor._pool is None
+    with pytest.raises(WaveWatch3Error):
+        executor.map(abs, range(4))
+
+
+def test_bad_backend():
+    with pytest.raises(ChoiceError):
+        Executor("fibers")
+    with pytest.raises(ValueError):
+        Executor(max_workers=0)
+
+
+def test_default_executor():
+    executor = get_executor()
+    assert get_executor() is executor
+
+    mine = Executor("none")
+    prev = set_executor(mine)
+    try:
+        assert get_executor() is mine
+    finally:
+        set_executor(prev)
+
+    executor.close()
+    assert get_executor() is not executor
+
+
+def test_scheduler_with_executor():
+    with Executor("thread", max_workers=4) as executor:
+        results = AdaptiveScheduler(max_concurrency=4).map(
+            abs, range(-5, 5), executor=executor
+        )
+        assert results == [abs(x) for x in range(-5, 5)]
+        assert not executor.closed
+
+
+def test_fetch_process_executor_rejects_rate_limit():
+    with Executor("process") as executor:
+        with pytest.raises(ValueError):
+            WaveWatch3.fetch("2010-05-01", executor=executor, rate_limit=2**20)
+
+
+def test_bmi_finalize_closes_executor():
+    executor = Executor("thread")
+    bmi = BmiWaveWatch3(executor=executor)
+    bmi.finalize()
+    assert executor.closed
@@ -0,0 +1,118 @@
+import datetime
+import os
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from bmi_wavewatch3 import Executor
+from bmi_wavewatch3.gribindex import (
+    build_index,
+    build_indexes,
+    index_template,
+    open_grib,
+)
+
+
+@pytest.fixture
+def gribs(tmp_path, grib2):
+    folder = tmp_path / "data"
+    folder.mkdir()
+    time = datetime.datetime(2010, 5, 1)
+    paths = []
+    for quantity, parameter in (("hs", (10, 0, 3)), ("tp", (10, 0, 11))):
+        paths.append(folder / f"multi_1.glo_30m.{quantity}.201005.grb2")
+        paths[-1].write_bytes(
+            b"".join(
+                grib2(np.full((2, 3), step), time, step=step, parameter=parameter)
+                for step in range(0, 12, 3)
+            )
+        )
+    return paths
+
+
+def test_index_template(tmp_path):
+    assert index_template(tmp_path / "a.grb2") == "{path}.{short_hash}.idx"
+    assert index_template(tmp_path / "a{b}.grb2", index_dir=tmp_path) == os.path.join(
+        str(tmp_path), "a{{b}}.grb2.{short_hash}.idx"
+    )
+
+
+def test_build_index(tmp_path, gribs):
+    assert build_index(gribs[0]) == gribs[0]
+    assert len(list(gribs[0].parent.glob(f"{gribs[0].name}.*.idx"))) == 1
+
+
+def test_build_index_relocated(tmp_path, gribs):
+    build_index(gribs[0], index_dir=tmp_path / "index")
+    assert list(gribs[0].parent.glob("*.idx")) == []
+    assert len(list((tmp_path / "index").glob(f"{gribs[0].name}.*.idx"))) == 1
+
+
+@pytest.mark.parametrize("backend", ["thread", "none"])
+def test_build_indexes(tmp_path, gribs, backend):
+    with Executor(backend, max_workers=2) as executor:
+        paths = build_indexes(gribs, index_dir=tmp_path / "index", executor=executor)
+    assert paths == gribs
+    assert len(list((tmp_path / "index").glob("*.idx"))) == 2
+
+
+def test_open_grib_relocated(tmp_path, gribs):
+    index_dir = tmp_path / "index"
+    with open_grib(gribs, index_dir=index_dir) as ds:
+        assert sorted(ds.data_vars) == ["perpw", "swh"]
+        assert ds.swh.shape == (4, 2, 3)
+        np.testing.assert_array_equal(ds.swh[:, 0, 0], [0, 3, 6, 9])
+    assert list(gribs[0].parent.glob("*.idx")) == []
+
+    mtimes = {path: path.stat().st_mtime_ns for path in index_dir.glob("*.idx")}
+    assert len(mtimes) == 2
+    with open_grib(gribs, index_dir=index_dir) as ds:
+        assert sorted(ds.data_vars) == ["perpw", "swh"]
+    assert {path: path.stat().st_mtime_ns for path in index_dir.glob("*.idx")} == (
+        mtimes
+    )
+
+
+def test_open_grib_matches_default(tmp_path, gribs):
+    with open_grib(gribs) as expected, open_grib(
+        gribs, index_dir=tmp_path / "index"
+    ) as actual:
+        xr.testing.assert_identical(actual.load(), expected.load())
+
+
+@pytest.mark.skipif(
+    os.name == "nt" or os.geteuid() == 0, reason="folders are always writable"
+)
+def test_open_grib_read_only(tmp_path, gribs):
+    gribs[0].parent.chmod(0o555)
+    try:
+        with open_grib(gribs, index_dir=tmp_path / "index") as ds:
+            assert ds.swh.shape == (4, 2, 3)
+    finally:
+        gribs[0].parent.chmod(0o755)
+    assert len(list((tmp_path / "index").glob("*.idx"))) == 2
+
+
+@pytest.mark.parametrize("index_dir", [None, "index"])
+def test_open_grib_chunks_messages(tmp_path, gribs, index_dir):
+    if index_dir is not None:
+        index_dir = tmp_path / index_dir
+    with open_grib(gribs, index_dir=index_dir, chunks="messages") as ds:
+        assert ds.swh.chunks == ((1, 1, 1, 1), (2,), (3,))
+
+
+def test_open_grib_chunks_tiles(tmp_path, gribs):
+    with open_grib(gribs, chunks={"longitude": 2}) as ds:
+        assert ds.swh.chunks == ((1, 1, 1, 1), (2,), (2, 1))
+        np.testing.assert_array_equal(ds.swh[:, 0, 0], [0, 3, 6, 9])
+
+
+@pytest.mark.parametrize("index_dir", [None, "index"])
+def test_open_grib_parallel(tmp_path, gribs, index_dir):
+    if index_dir is not None:
+        index_dir = tmp_path / index_dir
+    with open_grib(gribs) as expected, open_grib(
+        gribs, index_dir=index_dir, parallel=True
+    ) as actual:
+        xr.testing.assert_identical(actual.load(), expected.load())
@@ -0,0 +1,186 @@
+import datetime
+import os
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from bmi_wavewatch3 import HttpEngine, UrllibEngine, WaveWatch3Downloader
+from bmi_wavewatch3.errors import WaveWatch3Error
+from bmi_wavewatch3.inventory import (
+    inventory_file,
+    parse_idx,
+    read_inventory,
+    scan_messages,
+    select_messages,
+)
+
+REFERENCE_TIME = datetime.datetime(2010, 5, 1)
+NAME = "multi_1.glo_30m.hs.201005.grb2"
+
+
+@pytest.fixture
+def grib_file(http_server, grib2):
+    messages = [
+        grib2(np.full((3, 4), step / 10), REFERENCE_TIME, step=step)
+        for step in range(0, 72, 3)
+    ]
+    (http_server.root / NAME).write_bytes(b"".join(messages))
+    return [len(message) for message in messages]
+
+
+def _idx(lengths):
+    offsets = np.cumsum([0] + lengths[:-1])
+    return "".join(
+        f"{n + 1}:{offset}:d=2010050100:HTSGW:surface:"
+        f"{'anl' if n == 0 else f'{3 * n} hour fcst'}:\n"
+        for n, offset in enumerate(offsets)
+    )
+
+
+def test_parse_idx_submessages():
+    messages = parse_idx(
+        "1:0:d=2010050100:UGRD:surface:anl:\n"
+        "1.2:0:d=2010050100:VGRD:surface:anl:\n"
+        "2:100:d=2010050100:UGRD:surface:1 hour fcst:\n",
+        size=250,
+    )
+    assert [(m.offset, m.length, m.variable) for m in messages] == [
+        (0, 100, "UGRD"),
+        (0, 100, "VGRD"),
+        (100, 150, "UGRD"),
+    ]
+
+
+def test_parse_idx_bad_line():
+    with pytest.raises(WaveWatch3Error):
+        parse_idx("not an inventory")
+
+
+def test_scan_messages(http_server, grib_file):
+    data = (http_server.root / NAME).read_bytes()
+    messages = scan_messages(lambda start, end: data[start:end])
+
+    assert [m.length for m in messages] == grib_file
+    assert [m.offset for m in messages] == list(np.cumsum([0] + grib_file[:-1]))
+    assert [m.step for m in messages] == list(range(0, 72, 3))
+    assert {m.variable for m in messages} == {"HTSGW"}
+    assert {m.reference_time for m in messages} == {REFERENCE_TIME}
+
+
+def test_scan_messages_not_grib2():
+    with pytest.raises(WaveWatch3Error):
+        scan_messages(lambda start, end: b"GRIB\0\0\0\1" + bytes(8))
+
+
+@pytest.mark.parametrize("engine", (HttpEngine, UrllibEngine))
+def test_read_inventory_from_idx(tmp_path, http_server, grib_file, engine):
+    (http_server.root / f"{NAME}.idx").write_text(_idx(grib_file))
+
+    messages = read_inventory(f"{http_server.url}/{NAME}", engine())
+    assert [m.step for m in messages] == list(range(0, 72, 3))
+    assert [m.length for m in messages[:-1]] == grib_file[:-1]
+    assert messages[-1].length is None
+    assert [path for path, _ in http_server.requests] == [f"/{NAME}.idx"]
+
+
+def test_read_inventory_without_idx(tmp_path, http_server, grib_file):
+    messages = read_inventory(f"{http_server.url}/{NAME}", HttpEngine())
+    assert [m.length for m in messages] == grib_file
+    assert all("Range" in headers for _, headers in http_server.requests)
+
+
+def test_read_inventory_cache(tmp_path, http_server, grib_file):
+    cache = inventory_file(tmp_path / NAME)
+    url = f"{http_server.url}/{NAME}"
+
+    messages = read_inventory(url, HttpEngine(), cache=cache)
+    assert cache.is_file()
+
+    http_server.requests.clear()
+    assert read_inventory(url, HttpEngine(), cache=cache) == messages
+    assert http_server.requests == []
+
+
+@pytest.mark.parametrize("idx", (True, False))
+def test_retreive_subset(tmp_path, http_server, grib_file, idx):
+    if idx:
+        (http_server.root / f"{NAME}.idx").write_text(_idx(grib_file))
+    http_server.requests.clear()
+
+    path = WaveWatch3Downloader.retreive_subset(
+        f"{http_server.url}/{NAME}",
+        filename=tmp_path / "subset.grb2",
+        time_range=("2010-05-01T06", "2010-05-02T00"),
+        engine=HttpEngine(),
+    )
+    assert path.stat().st_size == sum(grib_file[2:9])
+    assert not os.path.exists(f"{path}.part")
+    assert [path for path, _ in http_server.requests if path == f"/{NAME}"]
+
+    ds = xr.open_dataset(path, engine="cfgrib", indexpath="")
+    np.testing.assert_array_equal(
+        ds.step.values.astype("timedelta64[h]").astype(int), range(6, 25, 3)
+    )
+    np.testing.assert_array_almost_equal(
+        ds.swh.values[:, 0, 0], np.arange(6, 25, 3) / 10
+    )
+
+
+def test_retreive_subset_coalesces_ranges(tmp_path, http_server, grib_file):
+    url = f"{http_server.url}/{NAME}"
+    messages = read_inventory(url, HttpEngine())
+    ranges = [
+        (m.offset, m.offset + m.length) for m in messages if m.step in (0, 6, 12, 24)
+    ]
+
+    http_server.requests.clear()
+    HttpEngine().download_ranges(url, tmp_path / "subset.grb2", ranges, max_gap=0)
+    assert len(http_server.requests) == 4
+
+    http_server.requests.clear()
+    HttpEngine().download_ranges(
+        url, tmp_path / "subset.grb2", ranges, max_gap=max(grib_file)
+    )
+    assert len(http_server.requests) == 2
+
+    data = (http_server.root / NAME).read_bytes()
+    assert (tmp_path / "subset.grb2").read_bytes() == b"".join(
+        data[start:end] for start, end in ranges
+    )
+
+
+def test_retreive_subset_nothing_selected(tmp_path, http_server, grib_file):
+    path = WaveWatch3Downloader.retreive_subset(
+        f"{http_server.url}/{NAME}",
+        filename=tmp_path / "subset.grb2",
+        variables=["u"],
+        engine=HttpEngine(),
+    )
+    assert path is None
+    assert not (tmp_path / "subset.grb2").exists()
+
+
+def test_retreive_subset_gzipped(tmp_path):
+    with pytest.raises(WaveWatch3Error):
+        WaveWatch3Downloader.retreive_subset(
+            f"http://example.com/{NAME}.gz", filename=tmp_path / "subset.grb2"
+        )
+
+
+def test_download_ranges_without_range_support(tmp_path, http_server, grib_file):
+    http_server.ranges = False
+    with pytest.raises(WaveWatch3Error):
+        HttpEngine().download_ranges(
+            f"{http_server.url}/{NAME}", tmp_path / "subset.grb2", [(0, 10)]
+        )
+
+
+def test_select_messages_valid_time():
+    messages = parse_idx(
+        "1:0:d=2010043018:HTSGW:surface:6 hour fcst:\n"
+        "2:10:d=2010050100:HTSGW:surface:anl:\n"
+        "3:20:d=2010050100:HTSGW:surface:6 hour fcst:\n"
+    )
+    selected = select_messages(messages, time_range=("2010-05-01", "2010-05-01"))
+    assert [m.offset for m in selected] == [0, 10]
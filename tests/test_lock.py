@@ -0,0 +1,121 @@
+import multiprocessing
+import subprocess
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import pytest
+
+from bmi_wavewatch3 import WaveWatch3Downloader
+from bmi_wavewatch3.lock import LOCK_DIR, FileLock, lock_path
+
+
+def test_lock_path(tmp_path):
+    assert lock_path(tmp_path / "a.grb2") == tmp_path / LOCK_DIR / "a.grb2.lock"
+
+
+def test_lock_excludes(tmp_path):
+    path = tmp_path / "a.lock"
+    with FileLock(path) as lock:
+        assert lock.locked
+        with pytest.raises(TimeoutError):
+            FileLock(path, timeout=0.1).acquire()
+    assert not lock.locked
+
+    with FileLock(path, timeout=0.1) as other:
+        assert other.locked
+
+
+def test_lock_is_not_reentrant(tmp_path):
+    with FileLock(tmp_path / "a.lock") as lock:
+        with pytest.raises(RuntimeError):
+            lock.acquire()
+
+
+def test_lock_waits(tmp_path):
+    path = tmp_path / "a.lock"
+    events = []
+
+    lock = FileLock(path).acquire()
+    thread = threading.Thread(
+        target=lambda: (FileLock(path).acquire(), events.append("acquired"))
+    )
+    thread.start()
+    thread.join(0.2)
+    assert events == []
+
+    lock.release()
+    thread.join(5.0)
+    assert events == ["acquired"]
+
+
+def test_lock_excludes_other_processes(tmp_path):
+    path = tmp_path / "a.lock"
+    holder = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import sys; from bmi_wavewatch3.lock import FileLock;"
+            f" lock = FileLock({str(path)!r}).acquire();"
+            " print('locked', flush=True); sys.stdin.read()",
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        with pytest.raises(TimeoutError):
+            FileLock(path, timeout=0.1).acquire()
+    finally:
+        holder.stdin.close()
+        holder.wait()
+
+    with FileLock(path, timeout=5.0):
+        pass
+
+
+def _retreive(url, filename):
+    return WaveWatch3Downloader.retreive(url, filename=filename)
+
+
+@pytest.mark.parametrize(
+    "Pool",
+    [
+        ThreadPoolExecutor,
+        partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("spawn")),
+    ],
+)
+def test_retreive_is_single_flight(tmp_path, http_server, Pool):
+    http_server.latency = 0.1
+    (http_server.root / "multi_1.glo_30m.hs.201005.grb2").write_bytes(b"x" * 2**16)
+    url = f"{http_server.url}/multi_1.glo_30m.hs.201005.grb2"
+    filename = tmp_path / "multi_1.glo_30m.hs.201005.grb2"
+
+    with Pool(max_workers=4) as pool:
+        paths = list(pool.map(_retreive, [url] * 8, [filename] * 8))
+
+    assert paths == [filename] * 8
+    assert filename.read_bytes() == b"x" * 2**16
+    assert len(http_server.requests) == 1
+
+
+def test_retreive_subset_is_single_flight(tmp_path, noaa_server):
+    noaa_server.latency = 0.01
+    (url,) = noaa_server.populate(["2010-05-01"], quantities=["hs"], interval=24)
+
+    def _subset(_):
+        return WaveWatch3Downloader.retreive_subset(
+            url,
+            filename=tmp_path / "subset.grb2",
+            time_range=("2010-05-01", "2010-05-02"),
+        )
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        paths = list(pool.map(_subset, range(4)))
+    assert len(set(paths)) == 1
+
+    noaa_server.reset()
+    _subset(0)
+    assert noaa_server.requests == []
@@ -0,0 +1,81 @@
+import datetime
+
+import pytest
+
+from bmi_wavewatch3 import SOURCES
+from bmi_wavewatch3.errors import ChoiceError, DateValueError
+from bmi_wavewatch3.plan import iter_months, plan_downloads, plan_range
+
+
+def test_plan_dedupes_dates_in_a_month():
+    dates = [f"2010-05-{day:02d}" for day in range(1, 32)]
+    plan = plan_downloads(dates, quantities=["hs", "tp"])
+
+    assert len(plan) == 2
+    assert all(value == dates for value in plan.values())
+
+
+def test_plan_many_dates():
+    start = datetime.date(2005, 2, 1)
+    dates = [(start + datetime.timedelta(days=n)).isoformat() for n in range(3000)]
+    plan = plan_downloads(dates)
+
+    months = {date[:7] for date in dates}
+    assert len(plan) == len(months) * len(SOURCES["multigrid"].QUANTITIES)
+    assert sum(len(value) for value in plan.values()) == 3000 * 4
+
+
+def test_plan_keeps_order():
+    plan = plan_downloads(["2010-06-01", "2010-05-01", "2010-06-15"], ["hs"])
+    assert [url.rsplit(".", 2)[-2] for url in plan] == ["201006", "201005"]
+    assert list(plan.values()) == [["2010-06-01", "2010-06-15"], ["2010-05-01"]]
+
+
+def test_plan_repeated_date():
+    plan = plan_downloads(["2010-05-01", "2010-05-01"], ["hs"])
+    assert list(plan.values()) == [["2010-05-01"]]
+
+
+def test_plan_single_date():
+    assert len(plan_downloads("2010-05-01")) == 4
+
+
+def test_plan_bad_source():
+    with pytest.raises(ChoiceError):
+        plan_downloads("2010-05-01", source="not-a-source")
+
+
+def test_iter_months_single():
+    assert list(iter_months("2010-05-22", "2010-05")) == ["2010-05-01"]
+    assert list(iter_months("2010-06", "2010-05")) == []
+
+
+def test_plan_range_whole_campaign():
+    urls = plan_range("2005-02", "2019-05")
+    assert not isinstance(urls, (list, tuple))
+
+    urls = list(urls)
+    assert len(urls) == len(set(urls)) == (12 * 14 + 4) * 4
+    assert urls[0].endswith("multi_1.glo_30m.dp.200502.grb2")
+    assert urls[-1].endswith("multi_1.glo_30m.wind.201905.grb2")
+
+
+def test_plan_range_matches_plan_downloads():
+    dates = [f"2010-{month:02d}-01" for month in range(3, 8)]
+    assert list(plan_range("2010-03", "2010-07", quantities=["hs"])) == list(
+        plan_downloads(dates, quantities=["hs"])
+    )
+
+
+@pytest.mark.parametrize(
+    "start,end", [("2004-01", "2005-05"), ("2010-01", "2020-01"), ("2010-13", "2011")]
+)
+def test_plan_range_bad_dates(start, end):
+    with pytest.raises(DateValueError):
+        plan_range(start, end)
+
+
+@pytest.mark.parametrize("kwds", [{"quantities": ["foo"]}, {"grid": "foo"}])
+def test_plan_range_bad_choice(kwds):
+    with pytest.raises(ChoiceError):
+        plan_range("2010-01", "2010-02", **kwds)
@@ -0,0 +1,163 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bmi_wavewatch3 import ChoiceError, WaveWatch3, WaveWatch3Error
+from bmi_wavewatch3.points import (
+    PointIndex,
+    _nearest_wet,
+    read_points,
+    validate_output_format,
+    write_points,
+)
+
+LATITUDE = np.arange(10.0, -10.5, -0.5)
+LONGITUDE = np.arange(0.0, 360.0, 0.5)
+
+
+@pytest.fixture
+def field():
+    lat, lon = np.meshgrid(LATITUDE, LONGITUDE, indexing="ij")
+    return lat * 1000.0 + lon
+
+
+def test_nearest(field):
+    index = PointIndex([1.1, -2.3], [10.2, -0.1], LATITUDE, LONGITUDE)
+    np.testing.assert_allclose(index.sample(field), [1000.0 + 10.0, -2500.0 + 0.0])
+    assert not index.snapped.any()
+
+
+def test_bilinear(field):
+    index = PointIndex(
+        [1.1, -2.3], [10.2, 359.8], LATITUDE, LONGITUDE, method="bilinear"
+    )
+    np.testing.assert_allclose(
+        index.sample(field), [1100.0 + 10.2, -2300.0 + 0.4 * 359.5 + 0.6 * 0.0]
+    )
+
+
+def test_sample_many_messages(field):
+    index = PointIndex([1.1, -2.3], [10.2, 20.0], LATITUDE, LONGITUDE)
+    values = index.sample(np.stack([field, field + 1.0]))
+    assert values.shape == (2, 2)
+    np.testing.assert_allclose(values[1] - values[0], 1.0)
+
+
+def test_dry_points_snap_to_wet(field):
+    wet = np.ones(field.shape, dtype=bool)
+    wet[:, :40] = False
+    index = PointIndex([0.0, 0.0], [5.0, 30.0], LATITUDE, LONGITUDE, wet=wet)
+    np.testing.assert_array_equal(index.snapped, [True, False])
+    np.testing.assert_allclose(index.sample(field), [359.5, 30.0])
+
+
+def test_nearest_wet_in_chunks(field):
+    wet = np.ones(field.shape, dtype=bool)
+    wet[10:30, :40] = False
+    lats, lons = np.linspace(5.0, -5.0, 7), np.linspace(0.5, 19.0, 7)
+    expected = _nearest_wet(lats, lons, LATITUDE, LONGITUDE, wet)
+    for max_size in (1, wet.sum() * 2):
+        actual = _nearest_wet(lats, lons, LATITUDE, LONGITUDE, wet, max_size=max_size)
+        np.testing.assert_array_equal(actual, expected)
+    assert wet[expected].all()
+
+
+def test_bilinear_leaves_out_dry_corners(field):
+    wet = np.ones(field.shape, dtype=bool)
+    wet[:, 20] = False
+    index = PointIndex([0.0], [10.2], LATITUDE, LONGITUDE, wet=wet, method="bilinear")
+    np.testing.assert_allclose(index.sample(field), [10.5])
+    assert not index.snapped.any()
+
+
+def test_outside_grid():
+    with pytest.raises(WaveWatch3Error):
+        PointIndex([20.0], [0.0], LATITUDE, LONGITUDE)
+    with pytest.raises(WaveWatch3Error):
+        PointIndex([0.0], [20.0], [1.0, 0.0], [0.0, 1.0, 2.0])
+
+
+def test_bad_points():
+    with pytest.raises(ChoiceError):
+        PointIndex([0.0], [0.0], LATITUDE, LONGITUDE, method="cubic")
+    with pytest.raises(WaveWatch3Error):
+        PointIndex([0.0, 1.0], [0.0], LATITUDE, LONGITUDE)
+    with pytest.raises(WaveWatch3Error):
+        PointIndex([0.0], [0.0], LATITUDE, LONGITUDE, wet=np.zeros((2, 2), dtype=bool))
+
+
+def test_read_points():
+    lats, lons, names = read_points(io.StringIO("name,lat,lon\na,1.5,2\nb,3,-4\n"))
+    np.testing.assert_array_equal(lats, [1.5, 3.0])
+    np.testing.assert_array_equal(lons, [2.0, -4.0])
+    assert list(names) == ["a", "b"]
+
+    lats, lons, names = read_points(io.StringIO("Latitude,Longitude\n1,2\n"))
+    assert names is None
+    with pytest.raises(WaveWatch3Error):
+        read_points(io.StringIO("x,y\n1,2\n"))
+
+
+def test_validate_output_format():
+    assert validate_output_format(None, "points.csv") == "csv"
+    assert validate_output_format("csv", "points.txt") == "csv"
+    with pytest.raises(ChoiceError):
+        validate_output_format("xlsx")
+
+
+def _frames():
+    for month in range(3):
+        yield pd.DataFrame({"point": [0, 1], "swh": [month, month + 0.5]})
+
+
+def test_write_points_csv(tmp_path):
+    assert write_points(_frames(), tmp_path / "points.csv") == 6
+    table = pd.read_csv(tmp_path / "points.csv")
+    assert list(table.columns) == ["point", "swh"]
+    np.testing.assert_array_equal(table.swh, [0, 0.5, 1, 1.5, 2, 2.5])
+
+    buffer = io.StringIO()
+    assert write_points(_frames(), buffer) == 6
+    assert buffer.getvalue() == (tmp_path / "points.csv").read_text()
+
+
+def test_write_points_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    assert write_points(_frames(), tmp_path / "points.parquet") == 6
+    table = pd.read_parquet(tmp_path / "points.parquet")
+    np.testing.assert_array_equal(table.swh, [0, 0.5, 1, 1.5, 2, 2.5])
+
+
+def test_extract_points(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01", "2010-06-01"], quantities=["hs"], interval=24)
+    frames = WaveWatch3.extract_points(
+        [2.0, 0.4],
+        [3.0, -353.2],
+        "2010-05",
+        "2010-06",
+        names=["a", "b"],
+        cache=tmp_path,
+        quantities=["hs"],
+    )
+    may, june = list(frames)
+    assert list(may.columns) == ["time", "point", "latitude", "longitude", "swh"]
+    assert len(may) == 31 * 2 and len(june) == 30 * 2
+    assert list(may.point[:4]) == ["a", "b", "a", "b"]
+    assert may.time.iloc[-1] == pd.Timestamp("2010-05-31")
+
+    with WaveWatch3("2010-05-01", cache=tmp_path, quantities=["hs"]) as ww3:
+        expected = ww3.data.swh.sel(latitude=[2.0, 0.0], longitude=[3.0, 7.0])
+        np.testing.assert_array_equal(
+            may.swh.to_numpy().reshape((-1, 2)),
+            np.stack([expected.values[:, 0, 0], expected.values[:, 1, 1]], axis=1),
+        )
+
+
+def test_extract_points_outside_grid(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"], quantities=["hs"], interval=24)
+    with pytest.raises(WaveWatch3Error):
+        WaveWatch3.extract_points(
+            [45.0], [3.0], "2010-05", "2010-05", cache=tmp_path, quantities=["hs"]
+        )
@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from bmi_wavewatch3 import AdaptiveScheduler, HttpEngine
+from bmi_wavewatch3.scheduler import TokenBucket
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(10000)
+
+    start = time.monotonic()
+    bucket.consume(10000)
+    assert time.monotonic() - start < 0.1
+
+    bucket.consume(2500)
+    assert time.monotonic() - start == pytest.approx(0.25, abs=0.1)
+
+
+def test_token_bucket_bad_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_scheduler_bad_limits():
+    with pytest.raises(ValueError):
+        AdaptiveScheduler(max_concurrency=2, min_concurrency=3)
+
+
+def test_map_keeps_order():
+    def square(x):
+        time.sleep(0.001 * (10 - x))
+        return x**2
+
+    assert AdaptiveScheduler().map(square, range(10)) == [x**2 for x in range(10)]
+
+
+def test_map_consumes_items_lazily():
+    taken = []
+    lock = threading.Lock()
+
+    def items():
+        for item in range(20):
+            taken.append(item)
+            yield item
+
+    def func(item):
+        with lock:
+            assert len(taken) - item <= 8
+        time.sleep(0.001)
+        return item
+
+    assert AdaptiveScheduler(max_concurrency=8).map(func, items()) == list(range(20))
+
+
+def test_map_limits_concurrency():
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def func(item):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.005)
+        with lock:
+            active -= 1
+
+    scheduler = AdaptiveScheduler(max_concurrency=4, interval=0.0)
+    scheduler.map(func, range(100))
+    assert peak <= 4
+
+
+def test_concurrency_grows_with_throughput():
+    scheduler = AdaptiveScheduler(max_concurrency=6, interval=0.02)
+    assert scheduler.concurrency == 2
+
+    scheduler.map(lambda item: time.sleep(0.01), range(200))
+    assert scheduler.concurrency >= 5
+
+
+def test_failures_reduce_concurrency():
+    scheduler = AdaptiveScheduler(max_concurrency=8, interval=0.0)
+    scheduler.map(lambda item: time.sleep(0.001), range(100))
+    before = scheduler.concurrency
+    assert before > 2
+
+    results = scheduler.map(
+        lambda item: item, [-1, -1, -1, -1], failed=lambda result: result < 0
+    )
+    assert results == [-1] * 4
+    assert scheduler.concurrency < before
+
+
+def test_map_reraises_first_error():
+    def func(item):
+        if item in (3, 5):
+            raise ValueError(item)
+        return item
+
+    scheduler = AdaptiveScheduler()
+    with pytest.raises(ValueError, match="3"):
+        scheduler.map(func, range(10))
+    assert scheduler.concurrency == 1
+
+
+def test_meter_limits_rate(tmp_path, http_server):
+    (http_server.root / "data.grb2").write_bytes(b"x" * 2**18)
+
+    calls = []
+    scheduler = AdaptiveScheduler(rate_limit=2**18)
+    start = time.monotonic()
+    HttpEngine(blocksize=2**14).download(
+        f"{http_server.url}/data.grb2",
+        tmp_path / "data.grb2",
+        reporthook=scheduler.meter(lambda *args: calls.append(args)),
+    )
+    elapsed = time.monotonic() - start
+
+    assert calls[-1][0] * calls[-1][1] == 2**18
+    assert elapsed < 0.5
+
+    start = time.monotonic()
+    HttpEngine(blocksize=2**14).download(
+        f"{http_server.url}/data.grb2",
+        tmp_path / "data.grb2",
+        reporthook=scheduler.meter(),
+    )
+    assert time.monotonic() - start > 0.7
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from bmi_wavewatch3.series import month_times
+
+
+def _month(reference, steps):
+    return xr.Dataset(
+        coords={
+            "time": np.datetime64(reference, "ns"),
+            "step": np.asarray(steps, dtype="timedelta64[h]").astype("m8[ns]"),
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "month,count", [("2010-02-01", 28 * 8), ("2010-05-01", 31 * 8)]
+)
+def test_month_times_continues_steps(month, count):
+    template = _month("2010-04-01", range(0, 30 * 24, 3))
+    times = month_times(template, month)
+    assert len(times) == count
+    assert times[0] == np.datetime64(month, "ns")
+    assert np.all(np.diff(times) == np.timedelta64(3, "h"))
+
+
+def test_month_times_drops_next_month():
+    template = _month("2010-04-01", range(0, 30 * 24 + 1, 3))
+    times = month_times(template, "2010-05-01")
+    assert times[-1] == np.datetime64("2010-05-31T21", "ns")
+
+
+def test_month_times_keeps_offsets():
+    template = _month("2010-04-01T06", [0, 3, 6])
+    times = month_times(template, "2010-05-01")
+    np.testing.assert_array_equal(
+        times,
+        np.array(["2010-05-01T06", "2010-05-01T09", "2010-05-01T12"], dtype="M8[ns]"),
+    )
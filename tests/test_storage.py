@@ -0,0 +1,211 @@
+import os
+import urllib
+
+import numpy as np
+import pytest
+
+from bmi_wavewatch3 import WaveWatch3, WaveWatch3Downloader
+from bmi_wavewatch3.cache import CacheIndex
+from bmi_wavewatch3.engine import validators_file
+from bmi_wavewatch3.errors import ChoiceError
+from bmi_wavewatch3.gribindex import open_grib
+from bmi_wavewatch3.lock import SHARED_LOCKS
+from bmi_wavewatch3.source import SOURCES
+from bmi_wavewatch3.storage import (
+    SCRATCH_DIR,
+    compress,
+    decompress,
+    is_compressed,
+    open_stored,
+    plain_name,
+    stored_path,
+    validate_storage,
+)
+
+
+def _needs(storage):
+    if storage == "zstd":
+        pytest.importorskip("zstandard")
+
+
+def test_validate_storage():
+    assert validate_storage("gzip") == "gzip"
+    with pytest.raises(ChoiceError):
+        validate_storage("bz2")
+
+
+@pytest.mark.parametrize(
+    "name,plain",
+    [
+        ("multi_1.glo_30m.hs.201005.grb2.gz", "multi_1.glo_30m.hs.201005.grb2"),
+        ("multi_1.glo_30m.hs.201005.grb2.zst", "multi_1.glo_30m.hs.201005.grb2"),
+        ("multi_1.glo_30m.hs.201005.grb2", "multi_1.glo_30m.hs.201005.grb2"),
+    ],
+)
+def test_plain_name(name, plain):
+    assert plain_name(name) == plain
+    assert is_compressed(name) == (name != plain)
+
+
+@pytest.mark.parametrize("storage", ["gzip", "zstd"])
+def test_compress_decompress(tmp_path, storage):
+    _needs(storage)
+    data = os.urandom(1024) * 64
+    filepath = tmp_path / "multi_1.glo_30m.hs.201005.grb2"
+    filepath.write_bytes(data)
+
+    stored = compress(filepath, storage)
+    assert stored == stored_path(filepath, storage)
+    assert not filepath.exists()
+    assert stored.stat().st_size < len(data)
+    with open_stored(stored) as fp:
+        assert fp.read() == data
+
+    copy = decompress(stored, tmp_path / "copy.grb2")
+    assert copy.read_bytes() == data
+    assert copy.stat().st_mtime_ns == stored.stat().st_mtime_ns
+
+
+def test_compress_plain(tmp_path):
+    filepath = tmp_path / "multi_1.glo_30m.hs.201005.grb2"
+    filepath.write_bytes(b"GRIB")
+    assert compress(filepath, "plain") == filepath
+    assert filepath.read_bytes() == b"GRIB"
+
+
+@pytest.mark.parametrize("storage", ["gzip", "zstd"])
+def test_retreive_compressed(tmp_path, noaa_server, storage):
+    _needs(storage)
+    noaa_server.populate(["2010-05-01"], quantities=["hs"])
+    url = str(SOURCES["multigrid"]("2010-05-01", "hs"))
+    filename = tmp_path / WaveWatch3Downloader.url_file_part(url)
+    index = CacheIndex(tmp_path)
+
+    path = WaveWatch3Downloader.retreive(
+        url, filename=filename, storage=storage, index=index
+    )
+    assert path == stored_path(filename, storage)
+    assert sorted(p.name for p in tmp_path.glob("multi_1.*")) == [
+        path.name,
+        validators_file(path).name,
+    ]
+    assert [entry.name for entry in index.entries()] == [path.name]
+    with open_stored(path) as fp:
+        assert fp.read(4) == b"GRIB"
+
+    WaveWatch3Downloader.retreive(url, filename=filename, storage=storage)
+    assert len(noaa_server.requests) == 1
+
+    mtime = path.stat().st_mtime_ns
+    WaveWatch3Downloader.retreive(
+        url, filename=filename, storage=storage, revalidate=True
+    )
+    assert path.stat().st_mtime_ns == mtime
+    assert len(noaa_server.requests) == 2
+
+    served = noaa_server.root / urllib.parse.urlsplit(url).path.lstrip("/")
+    served.write_bytes(b"GRIB-updated")
+    os.utime(served, (0, 0))
+    WaveWatch3Downloader.retreive(
+        url, filename=filename, storage=storage, revalidate=True, index=index
+    )
+    assert len(noaa_server.requests) == 3
+    with open_stored(path) as fp:
+        assert fp.read() == b"GRIB-updated"
+    assert not filename.exists()
+    assert [entry.name for entry in index.entries()] == [path.name]
+
+
+def test_retreive_gzip_as_served(tmp_path, noaa_server):
+    noaa_server.populate(["2005-01-01"], quantities=["hs"], source="phase1")
+    url = str(SOURCES["phase1"]("2005-01-01", "hs"))
+    assert url.endswith(".gz")
+
+    name = WaveWatch3Downloader.url_file_part(url)
+    path = WaveWatch3Downloader.retreive(url, filename=tmp_path / name, storage="gzip")
+    assert path.name == name
+    served = noaa_server.root / urllib.parse.urlsplit(url).path.lstrip("/")
+    assert path.read_bytes() == served.read_bytes()
+
+
+@pytest.mark.parametrize("storage", ["gzip", "zstd"])
+def test_open_grib_compressed(tmp_path, noaa_server, storage):
+    _needs(storage)
+    noaa_server.populate(["2010-05-01"], interval=24)
+    plain = WaveWatch3.fetch("2010-05-01", folder=tmp_path / "plain")
+    stored = WaveWatch3.fetch("2010-05-01", folder=tmp_path / "stored", storage=storage)
+    assert all(is_compressed(path) for path in stored)
+
+    scratch = tmp_path / "stored" / SCRATCH_DIR
+    with open_grib(plain) as expected, open_grib(stored) as actual:
+        np.testing.assert_array_equal(actual.swh, expected.swh)
+        np.testing.assert_array_equal(actual.perpw, expected.perpw)
+        assert sorted(p.name for p in scratch.glob("*.grb2")) == [
+            plain_name(path.name) for path in sorted(stored)
+        ]
+    assert len(list((tmp_path / "stored").glob("*.grb2.*.idx"))) == 4
+    if SHARED_LOCKS:
+        assert list(scratch.glob("*.grb2")) == []
+
+
+@pytest.mark.skipif(not SHARED_LOCKS, reason="copies are kept without shared locks")
+def test_scratch_copy_removed_by_last_reader(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"], interval=24)
+    stored = WaveWatch3.fetch("2010-05-01", folder=tmp_path, storage="gzip")
+    copy = tmp_path / SCRATCH_DIR / plain_name(stored[0].name)
+
+    first = open_grib(stored)
+    with open_grib(stored, chunks="messages") as second:
+        assert second.swh.shape == (31, 4, 8)
+    assert copy.is_file()
+    assert first.swh.shape == (31, 4, 8)
+    first.close()
+    assert not copy.exists()
+
+
+@pytest.mark.skipif(not SHARED_LOCKS, reason="copies are kept without shared locks")
+def test_index_compressed_leaves_no_copy(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"], interval=24)
+    stored = WaveWatch3.fetch("2010-05-01", folder=tmp_path, storage="gzip", index=True)
+    assert len(list(tmp_path.glob("*.grb2.*.idx"))) == len(stored)
+    assert list((tmp_path / SCRATCH_DIR).glob("*.grb2")) == []
+
+
+@pytest.mark.parametrize("index_dir", [None, "index"])
+def test_open_grib_compressed_reuses_index(tmp_path, noaa_server, caplog, index_dir):
+    noaa_server.populate(["2010-05-01"], interval=24)
+    index_dir = None if index_dir is None else tmp_path / index_dir
+    stored = WaveWatch3.fetch(
+        "2010-05-01",
+        folder=tmp_path / "data",
+        storage="gzip",
+        index=True,
+        index_dir=index_dir,
+    )
+    indexes = sorted((index_dir or tmp_path / "data").glob("*.idx"))
+    assert len(indexes) == 4
+    mtimes = [path.stat().st_mtime_ns for path in indexes]
+
+    with caplog.at_level("WARNING"):
+        for _ in range(2):
+            with open_grib(stored, index_dir=index_dir) as ds:
+                assert ds.swh.shape == (31, 4, 8)
+    assert "Ignoring index file" not in caplog.text
+    assert [path.stat().st_mtime_ns for path in indexes] == mtimes
+
+
+def test_wavewatch3_storage(tmp_path, noaa_server):
+    pytest.importorskip("zstandard")
+    noaa_server.populate(["2010-05-01"], interval=24)
+
+    with WaveWatch3("2010-05-01", cache=tmp_path, storage="zstd") as ww3:
+        assert ww3.data.swh.shape == (31, 4, 8)
+    assert len(list(tmp_path.glob("*.201005.grb2.zst"))) == 4
+    assert list(tmp_path.glob("*.201005.grb2")) == []
+
+    with WaveWatch3("2010-05-01", cache=tmp_path, storage="zstd") as ww3:
+        assert ww3.data.swh.shape == (31, 4, 8)
+        assert len(list((tmp_path / SCRATCH_DIR).glob("*.grb2"))) == 4
+    assert len(noaa_server.requests) == 4
+    if SHARED_LOCKS:
+        assert list((tmp_path / SCRATCH_DIR).glob("*.grb2")) == []
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from bmi_wavewatch3 import BmiWaveWatch3, WaveWatch3, WaveWatch3Error
+from bmi_wavewatch3.subset import subset_bbox, validate_bbox
+
+
+@pytest.fixture
+def ds():
+    lat = np.arange(10.0, -10.5, -0.5)
+    lon = np.arange(0.0, 360.0, 0.5)
+    return xr.Dataset(
+        {"swh": (("latitude", "longitude"), np.zeros((len(lat), len(lon))))},
+        coords={"latitude": lat, "longitude": lon},
+    )
+
+
+@pytest.mark.parametrize(
+    "bbox",
+    [(0, 1), (0, 1, 2, "a"), (0, 2, 1, 1), (0, -100, 1, 0), None],
+)
+def test_validate_bbox_bad(bbox):
+    with pytest.raises(WaveWatch3Error):
+        validate_bbox(bbox)
+
+
+def test_subset_bbox(ds):
+    subset = subset_bbox(ds, (10, -1, 11.2, 1))
+    np.testing.assert_array_equal(subset.latitude, [1.0, 0.5, 0.0, -0.5, -1.0])
+    np.testing.assert_array_equal(subset.longitude, [10.0, 10.5, 11.0])
+
+
+def test_subset_bbox_wraps_longitude(ds):
+    subset = subset_bbox(ds, (-124.5, 0, -123.5, 0))
+    np.testing.assert_array_equal(subset.longitude, [235.5, 236.0, 236.5])
+
+
+@pytest.mark.parametrize("bbox", [(-1, 0, 1, 0), (10, 20, 11, 30), (1.1, 0, 1.2, 0)])
+def test_subset_bbox_empty_or_crossing(ds, bbox):
+    with pytest.raises(WaveWatch3Error):
+        subset_bbox(ds, bbox)
+
+
+def test_wavewatch3_bbox(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"], quantities=["hs"], interval=24)
+    with WaveWatch3(
+        "2010-05-01", cache=tmp_path, quantities=["hs"], bbox=(2, 1, 4, 2)
+    ) as ww3:
+        assert ww3.bbox == (2.0, 1.0, 4.0, 2.0)
+        np.testing.assert_array_equal(ww3.data.latitude, [2.0, 1.0])
+        np.testing.assert_array_equal(ww3.data.longitude, [2.0, 3.0, 4.0])
+        assert ww3.data.swh.shape == (31, 2, 3)
+
+
+def test_bmi_grid_of_bbox(tmp_path, noaa_server, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    noaa_server.populate(["2010-05-01"], quantities=["hs"], interval=24)
+    config = tmp_path / "wavewatch3.toml"
+    config.write_text(
+        """\
+[wavewatch3]
+date = "2010-05-01"
+grid = "glo_30m"
+source = "multigrid"
+quantities = ["hs"]
+bbox = [2, 1, 4, 2]
+"""
+    )
+
+    bmi = BmiWaveWatch3()
+    bmi.initialize(str(config))
+    try:
+        grid = bmi.get_var_grid("wave_height")
+        assert bmi.get_grid_shape(grid, np.empty(2, dtype=int)).tolist() == [2, 3]
+        assert bmi.get_grid_origin(grid, np.empty(2)).tolist() == [1.0, 2.0]
+        assert bmi.get_grid_spacing(grid, np.empty(2)).tolist() == [1.0, 1.0]
+        assert bmi.get_grid_size(grid) == 6
+        assert bmi.get_value("wave_height", np.empty(6)).shape == (6,)
+        assert bmi.get_current_time() == 0.0
+        assert bmi.get_end_time() == 30 * 24.0
+        bmi.update()
+        assert bmi.get_current_time() == 24.0
+    finally:
+        bmi.finalize()
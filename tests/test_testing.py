@@ -0,0 +1,105 @@
+import gzip
+import os
+import time
+import urllib.request
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from bmi_wavewatch3.testing import StandInServer, synthetic_month
+
+
+def _get(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    with urllib.request.urlopen(request) as response:
+        return response.status, response.read()
+
+
+def test_synthetic_month(tmp_path):
+    path = tmp_path / "hs.grb2"
+    path.write_bytes(synthetic_month(2010, 2, "hs", shape=(3, 5), interval=24))
+
+    ds = xr.open_dataset(path, engine="cfgrib", indexpath="")
+    assert ds.swh.shape == (28, 3, 5)
+    assert ds.time.data == np.datetime64("2010-02-01")
+
+
+def test_synthetic_month_wind(tmp_path):
+    path = tmp_path / "wind.grb2"
+    path.write_bytes(synthetic_month(2010, 12, "wind", interval=24))
+
+    ds = xr.open_dataset(path, engine="cfgrib", indexpath="")
+    assert set(ds.data_vars) == {"u", "v"}
+    assert ds.step.size == 31
+
+
+def test_populate():
+    with StandInServer() as server:
+        urls = server.populate(["2010-05-01", "2010-05-22", "2010-06-01"])
+        assert len(urls) == 8
+        assert all(url.startswith(server.url) for url in urls)
+
+        status, data = _get(urls[0])
+        assert status == 200
+        assert data.startswith(b"GRIB")
+
+
+def test_populate_gz():
+    with StandInServer() as server:
+        (url,) = server.populate(["1999-01-01"], quantities=["hs"], source="phase1")
+        assert url.endswith(".grb2.gz")
+        assert gzip.decompress(_get(url)[1]).startswith(b"GRIB")
+
+
+def test_errors():
+    with StandInServer(errors=[503]) as server:
+        server.add("/a.txt", b"hello")
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            _get(server.url + "/a.txt")
+        assert excinfo.value.code == 503
+        assert _get(server.url + "/a.txt") == (200, b"hello")
+
+
+def test_latency():
+    with StandInServer(latency=0.2) as server:
+        server.add("/a.txt", b"hello")
+        start = time.monotonic()
+        _get(server.url + "/a.txt")
+        assert time.monotonic() - start >= 0.2
+        assert server.timings[0][1] >= 0.2
+
+
+def test_bandwidth():
+    with StandInServer(bandwidth=2**16) as server:
+        server.add("/a.bin", bytes(2**14))
+        start = time.monotonic()
+        assert _get(server.url + "/a.bin") == (200, bytes(2**14))
+        assert time.monotonic() - start >= 0.2
+
+
+def test_range():
+    with StandInServer() as server:
+        server.add("/a.txt", b"0123456789")
+        assert _get(server.url + "/a.txt", {"Range": "bytes=2-4"}) == (206, b"234")
+
+
+def test_reset():
+    with StandInServer() as server:
+        server.add("/a.txt", b"hello")
+        _get(server.url + "/a.txt")
+        assert server.connections == 1
+        assert len(server.requests) == 1
+
+        server.reset()
+        assert server.connections == 0
+        assert server.requests == []
+        assert server.timings == []
+
+
+def test_mirrored(monkeypatch):
+    monkeypatch.delenv("WAVEWATCH3_MIRROR", raising=False)
+    with StandInServer() as server:
+        with server.mirrored():
+            assert os.environ["WAVEWATCH3_MIRROR"] == server.url
+    assert "WAVEWATCH3_MIRROR" not in os.environ
@@ -0,0 +1,65 @@
+import datetime
+import json
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from bmi_wavewatch3.timeindex import TIMES_NAME, TimeIndex
+
+
+def _month(reference, hours):
+    return xr.Dataset(
+        coords={
+            "time": np.datetime64(reference, "ns"),
+            "step": np.asarray(hours, dtype="timedelta64[h]").astype("m8[ns]"),
+        }
+    )
+
+
+def test_nominal_layout(tmp_path):
+    times = TimeIndex(tmp_path, "multigrid/glo_30m")
+    assert times.count(2010, 5) == 31 * 8
+    np.testing.assert_array_equal(times.hours(2010, 5)[:3], [0, 3, 6])
+    assert times.time(2010, 5, 9) == datetime.datetime(2010, 5, 2, 3)
+    with pytest.raises(IndexError):
+        times.time(2010, 5, 31 * 8)
+    assert not (tmp_path / TIMES_NAME).exists()
+
+
+@pytest.mark.parametrize(
+    "date,expected",
+    [
+        ("2010-05-02T03", (2010, 5, 9)),
+        ("2010-05-02T04", (2010, 5, 10)),
+        (datetime.datetime(2010, 5, 31, 22), (2010, 6, 0)),
+        (datetime.date(2010, 12, 31), (2010, 12, 30 * 8)),
+        ("2010-12-31T22", (2011, 1, 0)),
+        (np.datetime64("2010-05-01T01"), (2010, 5, 1)),
+    ],
+)
+def test_locate(tmp_path, date, expected):
+    assert TimeIndex(tmp_path, "multigrid/glo_30m").locate(date) == expected
+
+
+def test_advance(tmp_path):
+    times = TimeIndex(tmp_path, "multigrid/glo_30m")
+    assert times.advance(2010, 5, 2) == (2010, 5, 2)
+    assert times.advance(2010, 5, 31 * 8 + 30 * 8 + 1) == (2010, 7, 1)
+
+
+def test_record_is_persisted(tmp_path):
+    times = TimeIndex(tmp_path, "multigrid/glo_30m")
+    times.record(2010, 5, _month("2010-05-01", [0, 24, 48]))
+    times.record(2010, 6, _month("2010-06-01", [0, 1, 5]))
+
+    times = TimeIndex(tmp_path, "multigrid/glo_30m")
+    assert times.layout(2010, 5) == {"start": 0.0, "interval": 24.0, "count": 3}
+    assert times.layout(2010, 6) == {"hours": [0.0, 1.0, 5.0]}
+    assert times.locate("2010-05-01T12") == (2010, 5, 1)
+    assert times.locate("2010-05-03T01") == (2010, 6, 0)
+    assert times.locate("2010-06-01T02") == (2010, 6, 2)
+    assert times.time(2010, 6, 2) == datetime.datetime(2010, 6, 1, 5)
+
+    assert TimeIndex(tmp_path, "multigrid/wc_4m").count(2010, 5) == 31 * 8
+    assert set(json.loads((tmp_path / TIMES_NAME).read_text())) == {"multigrid/glo_30m"}
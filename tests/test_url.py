@@ -107,6 +107,16 @@ def test_url_str(source):
     assert str(url).startswith(source.SCHEME)
 
 
+@pytest.mark.parametrize("mirror", ["http://127.0.0.1:8000", "http://mirror/noaa/"])
+@pytest.mark.parametrize("source", ww3.SOURCES.values())
+def test_url_mirror(source, mirror, monkeypatch):
+    url = source(source.MIN_DATE, "wind")
+    path = urllib.parse.urlsplit(str(url)).path
+
+    monkeypatch.setenv("WAVEWATCH3_MIRROR", mirror)
+    assert str(url) == mirror.rstrip("/") + path
+
+
 @pytest.mark.parametrize("source", ww3.SOURCES.values())
 def test_url_repr(source):
     import bmi_wavewatch3  # noqa
@@ -1,6 +1,15 @@
+import datetime
+import pathlib
+import threading
+import time
+import urllib.error
+
 import numpy as np
+import pytest
 
-from bmi_wavewatch3 import WaveWatch3
+from bmi_wavewatch3 import Executor, WaveWatch3, WaveWatch3Downloader
+from bmi_wavewatch3.errors import ChoiceError, DateValueError
+from bmi_wavewatch3.testing import QUANTITY_PARAMETERS
 
 
 def test_wavewatch3():
@@ -55,3 +64,483 @@ def test_issue_17():
     ww3 = WaveWatch3("2009-11-08")
     data = ww3.data
     assert data.time.data == np.datetime64("2009-11-01")
+
+
+@pytest.fixture
+def fake_retreive(monkeypatch, grib2):
+    """Replace downloads with writing small, synthetic, monthly files.
+
+    The fixture is the list of the urls that have been "downloaded", each
+    added once its file has been written.
+    """
+    calls = []
+
+    def _retreive(url, filename=None, index=None, **kwds):
+        _, _, quantity, month, _ = pathlib.Path(filename).name.split(".")
+        time = datetime.datetime(int(month[:4]), int(month[4:]), 1)
+        pathlib.Path(filename).write_bytes(
+            b"".join(
+                grib2(np.zeros((2, 3)), time, step=step, parameter=parameter)
+                for step in range(0, 12, 3)
+                for parameter in QUANTITY_PARAMETERS[quantity]
+            )
+        )
+        if index is not None:
+            index.record(filename, url=url)
+        calls.append(url)
+        return pathlib.Path(filename).absolute()
+
+    monkeypatch.setattr(WaveWatch3Downloader, "retreive", _retreive)
+    return calls
+
+
+def _months(calls):
+    return {url.rsplit(".", 2)[-2] for url in calls}
+
+
+def _wait_for(condition, timeout=10.0):
+    """Wait for background downloads to make a condition true."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("timed out waiting for prefetched data")
+        time.sleep(0.01)
+
+
+def test_prefetch(tmp_path, fake_retreive):
+    with WaveWatch3("2010-05-01", cache=tmp_path, prefetch=2) as ww3:
+        assert ww3.data.time == np.datetime64("2010-05-01")
+        _wait_for(lambda: len(fake_retreive) >= 12)
+        assert len(fake_retreive) == 12
+        assert _months(fake_retreive) == {"201005", "201006", "201007"}
+        assert _cached_months(tmp_path) == {"201005", "201006", "201007"}
+
+        fake_retreive.clear()
+        ww3.inc()
+        assert ww3.data.time == np.datetime64("2010-06-01")
+        _wait_for(lambda: len(fake_retreive) >= 4)
+        assert _months(fake_retreive) == {"201008"}
+
+
+def test_prefetch_crossing_month_with_step(tmp_path, fake_retreive):
+    with WaveWatch3("2010-05-01", cache=tmp_path, prefetch=1) as ww3:
+        ww3.step = 3
+        ww3.data
+        _wait_for(lambda: len(fake_retreive) >= 8)
+
+        fake_retreive.clear()
+        ww3.step = 4
+        assert ww3.date == "2010-06-01T00"
+        assert fake_retreive == []
+        ww3.data
+        _wait_for(lambda: len(fake_retreive) >= 4)
+        assert _months(fake_retreive) == {"201007"}
+
+
+def test_prefetch_failure_falls_back(tmp_path, fake_retreive, monkeypatch):
+    retreive, failed = WaveWatch3Downloader.retreive, []
+
+    def _fail_once(url, **kwds):
+        if ".201006." in url and not failed:
+            failed.append(url)
+            raise urllib.error.URLError("connection refused")
+        return retreive(url, **kwds)
+
+    monkeypatch.setattr(WaveWatch3Downloader, "retreive", _fail_once)
+    with WaveWatch3("2010-05-01", cache=tmp_path, prefetch=1) as ww3:
+        ww3.data
+        _wait_for(lambda: failed)
+
+        fake_retreive.clear()
+        ww3.inc()
+        assert ww3.data.time == np.datetime64("2010-06-01")
+        _wait_for(lambda: _months(fake_retreive) == {"201006", "201007"})
+    assert len(failed) == 1
+    assert len(list(tmp_path.glob("*.201006.grb2"))) == 4
+
+
+def test_prefetch_off(tmp_path, fake_retreive):
+    with WaveWatch3("2010-05-01", cache=tmp_path) as ww3:
+        ww3.data
+    assert _months(fake_retreive) == {"201005"}
+    assert _cached_months(tmp_path) == {"201005"}
+
+
+def test_prefetch_stops_at_max_date(tmp_path, fake_retreive):
+    with WaveWatch3("2019-05-01", cache=tmp_path, prefetch=3) as ww3:
+        ww3.data
+    assert _months(fake_retreive) == {"201905"}
+    assert _cached_months(tmp_path) == {"201905"}
+
+
+def test_prefetch_negative():
+    with pytest.raises(ValueError):
+        WaveWatch3("2010-05-01", prefetch=-1)
+
+
+def test_prefetch_index(tmp_path, fake_retreive):
+    with WaveWatch3(
+        "2010-05-01", cache=tmp_path, prefetch=1, prefetch_index=True
+    ) as ww3:
+        ww3.data
+        _wait_for(lambda: len(list(tmp_path.glob("*.201006.grb2.*.idx"))) == 4)
+    assert list(tmp_path.glob("*.201005.grb2.*.idx")) != []
+
+
+def test_executor_is_used(tmp_path, fake_retreive):
+    workers = set()
+
+    class _Recording(Executor):
+        def map(self, func, items):
+            return super().map(
+                lambda item: workers.add(threading.current_thread()) or func(item),
+                items,
+            )
+
+    with _Recording("thread", max_workers=2) as executor:
+        ww3 = WaveWatch3("2010-05-01", cache=tmp_path, executor=executor)
+        ww3.data
+    assert workers and threading.current_thread() not in workers
+    assert _months(fake_retreive) == {"201005"}
+
+
+def _cached_months(folder):
+    return {path.name.split(".")[3] for path in pathlib.Path(folder).glob("*.grb2")}
+
+
+def test_cache_quota(tmp_path, fake_retreive):
+    with WaveWatch3("2010-05-01", cache=tmp_path, cache_quota=1) as ww3:
+        ww3.data
+        assert _cached_months(tmp_path) == {"201005"}
+
+        ww3.inc()
+        ww3.data
+        assert _cached_months(tmp_path) == {"201006"}
+
+
+@pytest.mark.parametrize(
+    "quota,months", [("1", {"201006"}), ("", {"201005", "201006"})]
+)
+def test_cache_quota_from_env(tmp_path, fake_retreive, monkeypatch, quota, months):
+    monkeypatch.setenv("WAVEWATCH3_CACHE_QUOTA", quota)
+    with WaveWatch3("2010-05-01", cache=tmp_path) as ww3:
+        ww3.data
+        ww3.inc()
+        ww3.data
+        assert _cached_months(tmp_path) == months
+
+
+def test_cache_quota_keeps_pinned(tmp_path, fake_retreive):
+    first = WaveWatch3("2010-05-01", cache=tmp_path)
+    first.data
+
+    with WaveWatch3("2010-05-01", cache=tmp_path, cache_quota=1) as second:
+        second.inc()
+        second.data
+        assert _cached_months(tmp_path) == {"201005", "201006"}
+
+        first.close()
+        second.inc()
+        second.data
+        assert _cached_months(tmp_path) == {"201007"}
+
+
+def test_cache_quota_keeps_prefetched(tmp_path, fake_retreive):
+    with WaveWatch3("2010-05-01", cache=tmp_path, cache_quota=1, prefetch=1) as ww3:
+        ww3.data
+        _wait_for(lambda: len(fake_retreive) >= 8)
+        assert _cached_months(tmp_path) == {"201005", "201006"}
+
+        fake_retreive.clear()
+        ww3.inc()
+        ww3.data
+        _wait_for(lambda: _cached_months(tmp_path) == {"201006", "201007"})
+        assert _months(fake_retreive) == {"201007"}
+
+
+def test_fetch_quota(tmp_path, fake_retreive):
+    WaveWatch3.fetch("2010-05-01", folder=tmp_path)
+    WaveWatch3.fetch("2010-06-01", folder=tmp_path, quota=1)
+    assert _cached_months(tmp_path) == {"201006"}
+
+
+def test_data_from_mirror(tmp_path, noaa_server):
+    noaa_server.populate(["2009-11-08"], interval=24)
+
+    ww3 = WaveWatch3("2009-11-08", cache=tmp_path)
+    assert ww3.data.time.data == np.datetime64("2009-11-01")
+    assert ww3.data.swh.shape == (30, 4, 8)
+    assert sorted(path for path, _ in noaa_server.requests) == sorted(
+        f"/waves/hindcasts/multi_1/200911/gribs/multi_1.glo_30m.{quantity}.200911.grb2"
+        for quantity in ("dp", "hs", "tp", "wind")
+    )
+
+
+def test_fetch_from_mirror(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01", "2010-06-01"])
+
+    files = WaveWatch3.fetch(
+        ["2010-05-01", "2010-05-15", "2010-06-01"], folder=tmp_path
+    )
+    assert len(files) == 8
+    assert all(path.is_file() for path in files)
+
+    paths = [path for path, _ in noaa_server.requests]
+    assert len(paths) == 8
+    assert len(set(paths)) == 8
+
+
+def test_fetch_subset_from_mirror(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01"], interval=24)
+
+    files = WaveWatch3.fetch(
+        "2010-05-01",
+        folder=tmp_path,
+        time_range=("2010-05-01", "2010-05-01T06"),
+        variables=["swh"],
+    )
+    assert [path.name for path in files] == [
+        "multi_1.glo_30m.hs.201005.20100501T00-20100501T06.swh.grb2"
+    ]
+    assert (
+        files[0].stat().st_size
+        < (
+            noaa_server.root
+            / "waves/hindcasts/multi_1/201005/gribs/multi_1.glo_30m.hs.201005.grb2"
+        )
+        .stat()
+        .st_size
+    )
+
+
+def test_decoded_cache_bad_format(tmp_path):
+    with pytest.raises(ChoiceError):
+        WaveWatch3("2010-05-01", cache=tmp_path, decoded_cache="hdf4")
+
+
+def test_decoded_cache(tmp_path, fake_retreive):
+    pytest.importorskip("zarr")
+    with WaveWatch3("2010-05-01", cache=tmp_path, decoded_cache="zarr") as ww3:
+        expected = ww3.data.swh.values
+    assert (tmp_path / "multi_1.glo_30m.201005.dp-hs-tp-wind.decoded.zarr").is_dir()
+
+    with WaveWatch3("2010-05-01", cache=tmp_path, decoded_cache="zarr") as ww3:
+        np.testing.assert_array_equal(ww3.data.swh, expected)
+
+
+def test_decoded_cache_by_quantities(tmp_path, fake_retreive):
+    pytest.importorskip("zarr")
+    with WaveWatch3(
+        "2010-05-01", cache=tmp_path, decoded_cache="zarr", quantities=["hs"]
+    ) as ww3:
+        expected = ww3.data.swh.values
+    copy = tmp_path / "multi_1.glo_30m.201005.hs.decoded.zarr"
+    mtime = copy.stat().st_mtime_ns
+
+    with WaveWatch3(
+        "2010-05-01", cache=tmp_path, decoded_cache="zarr", quantities=["dp", "hs"]
+    ) as ww3:
+        np.testing.assert_array_equal(ww3.data.swh, expected)
+    assert (tmp_path / "multi_1.glo_30m.201005.dp-hs.decoded.zarr").is_dir()
+    assert copy.stat().st_mtime_ns == mtime
+
+
+def test_chunks(tmp_path, fake_retreive):
+    with WaveWatch3(
+        "2010-05-01", cache=tmp_path, chunks="messages", parallel=True
+    ) as ww3:
+        assert ww3.data.swh.chunks[0] == (1, 1, 1, 1)
+
+
+def test_index_dir(tmp_path, fake_retreive):
+    with WaveWatch3(
+        "2010-05-01", cache=tmp_path / "data", index_dir=tmp_path / "index"
+    ) as ww3:
+        assert ww3.data.swh.shape[0] == 4
+    assert list((tmp_path / "data").glob("*.idx")) == []
+    assert len(list((tmp_path / "index").glob("*.201005.grb2.*.idx"))) == 4
+
+
+def test_index_dir_from_env(tmp_path, fake_retreive, monkeypatch):
+    monkeypatch.setenv("WAVEWATCH3_INDEX_DIR", str(tmp_path / "index"))
+    with WaveWatch3("2010-05-01", cache=tmp_path / "data") as ww3:
+        assert ww3.data.swh.shape[0] == 4
+    assert list((tmp_path / "data").glob("*.idx")) == []
+    assert len(list((tmp_path / "index").glob("*.201005.grb2.*.idx"))) == 4
+
+
+@pytest.mark.parametrize(
+    "subset", [{"time_range": ("2010-05-01", "2010-05-02")}, {"variables": ["swh"]}]
+)
+def test_fetch_subset_rejects_revalidate(tmp_path, noaa_server, subset):
+    noaa_server.populate(["2010-05-01"], quantities=["hs"])
+    folder = tmp_path / "data"
+    with pytest.raises(ValueError):
+        WaveWatch3.fetch("2010-05-01", folder=folder, revalidate=True, **subset)
+    assert noaa_server.requests == []
+    assert not folder.exists()
+
+
+@pytest.mark.parametrize("index_dir", [None, "index"])
+def test_fetch_index(tmp_path, noaa_server, index_dir):
+    noaa_server.populate(["2010-05-01"])
+    index_dir = index_dir and tmp_path / index_dir
+    paths = WaveWatch3.fetch(
+        "2010-05-01", folder=tmp_path / "data", index=True, index_dir=index_dir
+    )
+    idx_files = list((index_dir or tmp_path / "data").glob("*.grb2.*.idx"))
+    assert len(idx_files) == len(paths)
+
+
+def test_prefetch_range(tmp_path, noaa_server):
+    noaa_server.populate(["2010-05-01", "2010-06-01", "2010-07-01"], ["hs", "tp"])
+    WaveWatch3.prefetch("2010-06", "2010-06", folder=tmp_path, quantities=["hs", "tp"])
+
+    paths = WaveWatch3.prefetch(
+        "2010-05", "2010-07", folder=tmp_path, quantities=["hs", "tp"]
+    )
+    assert [path.name for path in paths] == [
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.tp.201005.grb2",
+        "multi_1.glo_30m.hs.201007.grb2",
+        "multi_1.glo_30m.tp.201007.grb2",
+    ]
+    assert (
+        WaveWatch3.prefetch(
+            "2010-05", "2010-07", folder=tmp_path, quantities=["hs", "tp"]
+        )
+        == []
+    )
+    assert len(noaa_server.requests) == 6
+
+
+def test_variables(tmp_path, fake_retreive):
+    with WaveWatch3("2010-05-01", cache=tmp_path, variables=["swh"]) as ww3:
+        assert ww3.quantities == ("hs",)
+        assert list(ww3.data.data_vars) == ["swh"]
+    assert [url.rsplit("/", 1)[-1] for url in fake_retreive] == [
+        "multi_1.glo_30m.hs.201005.grb2"
+    ]
+
+
+def test_quantities_and_variables(tmp_path, fake_retreive):
+    with WaveWatch3(
+        "2010-05-01", cache=tmp_path, quantities=["tp"], variables=["u", "v"]
+    ) as ww3:
+        assert ww3.quantities == ("tp", "wind")
+        assert sorted(ww3.data.data_vars) == ["perpw", "u", "v"]
+    assert len(fake_retreive) == 2
+
+
+def test_variables_prefetch(tmp_path, fake_retreive):
+    with WaveWatch3("2010-05-01", cache=tmp_path, prefetch=1, variables=["swh"]) as ww3:
+        ww3.data
+        _wait_for(lambda: len(fake_retreive) >= 2)
+    assert sorted(url.rsplit("/", 1)[-1] for url in fake_retreive) == [
+        "multi_1.glo_30m.hs.201005.grb2",
+        "multi_1.glo_30m.hs.201006.grb2",
+    ]
+
+
+@pytest.mark.parametrize("kwds", [{"variables": ["foo"]}, {"quantities": ["phs"]}])
+def test_bad_quantities(kwds):
+    with pytest.raises(ChoiceError):
+        WaveWatch3("2010-05-01", **kwds)
+
+
+def test_open_range(tmp_path, noaa_server):
+    noaa_server.populate(
+        ["2010-04-01", "2010-05-01", "2010-06-01"], quantities=["hs"], interval=24
+    )
+    with WaveWatch3.open_range(
+        "2010-04", "2010-06", cache=tmp_path, quantities=["hs"]
+    ) as ds:
+        assert len(noaa_server.requests) == 1
+        assert ds.swh.dims == ("time", "latitude", "longitude")
+        assert ds.swh.shape == (30 + 31 + 30, 4, 8)
+        np.testing.assert_array_equal(
+            ds.time, np.arange("2010-04-01", "2010-07-01", dtype="datetime64[D]")
+        )
+
+        may = ds.swh.sel(time="2010-05").values
+        assert len(noaa_server.requests) == 2
+    with WaveWatch3("2010-05-01", cache=tmp_path, quantities=["hs"]) as ww3:
+        np.testing.assert_array_equal(may, ww3.data.swh.values)
+
+
+def test_open_range_is_continuous(tmp_path, fake_retreive):
+    with WaveWatch3.open_range("2010-12", "2011-01", cache=tmp_path) as ds:
+        assert len(_months(fake_retreive)) == 1
+        assert ds.time.to_index().is_monotonic_increasing
+        assert ds.swh.shape == (8, 2, 3)
+        ds.load()
+    assert _months(fake_retreive) == {"201012", "201101"}
+
+
+def test_open_range_end_before_start(tmp_path):
+    with pytest.raises(DateValueError):
+        WaveWatch3.open_range("2010-06", "2010-05", cache=tmp_path)
+
+
+@pytest.fixture
+def count_opens(monkeypatch):
+    """Count the months of data that are opened."""
+    opened = []
+    open_month = WaveWatch3._open_month
+
+    def _open_month(self, paths):
+        opened.append(self.date[:7])
+        return open_month(self, paths)
+
+    monkeypatch.setattr(WaveWatch3, "_open_month", _open_month)
+    return opened
+
+
+def test_step_keeps_data_open(tmp_path, fake_retreive, count_opens):
+    with WaveWatch3("2010-05-01", cache=tmp_path) as ww3:
+        data = ww3.data
+        ww3.step = 2
+        assert ww3.date == "2010-05-01T06"
+        assert ww3.data is data
+        ww3.date = "2010-05-01T03"
+        assert ww3.step == 1
+        assert ww3.data is data
+    assert count_opens == ["2010-05"]
+
+
+def test_revisited_months_are_not_reopened(tmp_path, noaa_server, count_opens):
+    noaa_server.populate(["2010-05-01", "2010-06-01"], quantities=["hs"], interval=24)
+    with WaveWatch3("2010-05-01", cache=tmp_path, quantities=["hs"]) as ww3:
+        may = ww3.data
+        ww3.inc()
+        assert ww3.data.time == np.datetime64("2010-06-01")
+        ww3.inc(-1)
+        assert ww3.data is may
+    with WaveWatch3("2010-05-01", cache=tmp_path, quantities=["hs"]) as ww3:
+        assert ww3.data is may
+    assert count_opens == ["2010-05", "2010-06"]
+
+
+def test_seek_does_not_load(tmp_path, fake_retreive):
+    with WaveWatch3("2010-05-01", cache=tmp_path) as ww3:
+        assert ww3.seek("2010-07-04T10") == 28
+        assert ww3.date == "2010-07-04T12"
+        assert fake_retreive == []
+
+        assert ww3.data.time == np.datetime64("2010-07-01")
+        assert ww3.step == 4
+        assert ww3.seek("2010-07-01T04") == 2
+        assert ww3.date == "2010-07-01T06"
+        assert ww3.seek("2010-07-01T10") == 0
+        assert ww3.date == "2010-08-01T00"
+
+    with WaveWatch3("2010-05-01", cache=tmp_path) as ww3:
+        assert ww3.seek("2010-07-01T10") == 0
+        assert ww3.date == "2010-08-01T00"
+
+
+def test_step_does_not_load(tmp_path, fake_retreive):
+    with WaveWatch3("2010-05-01", cache=tmp_path) as ww3:
+        ww3.step = 31 * 8 + 2
+        assert ww3.date == "2010-06-01T06"
+        assert fake_retreive == []